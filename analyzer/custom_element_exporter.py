@@ -4,19 +4,47 @@ Custom Block Counter
 =====================
 This script reads a sitemap.xml file, fetches pages listed in the sitemap,
 counts occurrences of custom-block-element on each page, and exports the data to a CSV file.
+
+Sites are processed concurrently and each finished site is appended to the
+output CSV in one block, so an interrupted run can be continued with --resume:
+
+    python custom_element_exporter.py --websites websites.csv --output counts.csv --workers 16 --resume
 """
 
+import argparse
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
-import pandas as pd
 from bs4 import BeautifulSoup
 from xml.etree import ElementTree as ET
 import csv
 
+OUTPUT_FIELDS = ['Site', 'URL', 'CustomBlockCount', 'ChildCustomBlockCount', 'HelixChildCount']
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# One pooled HTTP session per worker thread
+_thread_local = threading.local()
+
+
+def get_session():
+    """Return this thread's requests session, so connections are reused across pages."""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        _thread_local.session = session
+    return session
+
 def fetch_sitemap_urls(sitemap_url):
     """Fetch all URLs from the given sitemap.xml"""
     urls = []
     try:
-        response = requests.get(sitemap_url, timeout=15)
+        response = get_session().get(sitemap_url, timeout=15)
         response.raise_for_status()
         root = ET.fromstring(response.content)
 
@@ -50,10 +78,7 @@ def fetch_sitemap_urls(sitemap_url):
 def fetch_page(url):
     """Fetch webpage content using requests"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_session().get(url, timeout=30)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
         return soup, None
@@ -78,97 +103,147 @@ def count_custom_blocks(soup, class_filter="custom-block-element"):
         print(f"Error counting custom blocks: {e}")
         return []
 
-def process_sitemap(sitemap_url, output_path):
-    """Process sitemap.xml and count custom-block-element occurrences with child counts and helix components, avoiding duplicates"""
+def read_websites(websites_file):
+    """Return the unique site URLs in the first column of websites_file, in file order (header rows are skipped)."""
+    sites = []
+    with open(websites_file, mode='r', newline='', encoding='utf-8-sig') as file:
+        for row in csv.reader(file):
+            if row and row[0].strip().startswith(('http://', 'https://')):
+                site = row[0].strip().rstrip('/')
+                if site not in sites:
+                    sites.append(site)
+    return sites
+
+
+class IncompatibleOutput(Exception):
+    """The output file to resume was written with other columns (e.g. by an older version without 'Site')."""
+
+
+def read_completed_sites(output_path):
+    """
+    Return the sites already written to output_path by an earlier run.
+    Raises IncompatibleOutput if the file's header isn't OUTPUT_FIELDS, since appending
+    to it would mix rows of different shapes.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames is None:
+            return set()  # Empty file: the writer adds the header
+        if reader.fieldnames != OUTPUT_FIELDS:
+            raise IncompatibleOutput(
+                f"{output_path} has the columns {', '.join(reader.fieldnames)} instead of {', '.join(OUTPUT_FIELDS)}; "
+                f"it can't be resumed. Write to a new --output file instead."
+            )
+        return {row['Site'] for row in reader if row.get('Site')}
+
+
+def count_page(site, url):
+    """Fetch one page and return its output row, or None if it couldn't be fetched."""
+    soup, error = fetch_page(url)
+    if error:
+        print(f"Error fetching page {url}: {error}")
+        return None
+    blocks = count_custom_blocks(soup)
+    return {
+        'Site': site,
+        'URL': url,
+        'CustomBlockCount': len(blocks),
+        'ChildCustomBlockCount': sum(block['child_count'] for block in blocks),
+        'HelixChildCount': sum(block['helix_child_count'] for block in blocks),
+    }
+
+
+def process_site(site, page_pool):
+    """Count the custom blocks on every page of one site, fetching pages on page_pool. Returns the rows sorted by URL."""
+    sitemap_url = f"{site}/sitemap.xml"
+    print(f"Processing sitemap: {sitemap_url}")
+    urls = sorted(set(fetch_sitemap_urls(sitemap_url)))  # Remove duplicate URLs
+    print(f"Found {len(urls)} unique URLs in sitemap.")
+    futures = [page_pool.submit(count_page, site, url) for url in urls]
+    rows = [future.result() for future in futures]
+    return [row for row in rows if row is not None]
+
+
+class SiteBlockWriter:
+    """
+    Append-only CSV output. Each site's rows are written with a single write and
+    flushed to disk, so a site is either fully present in the file or not at all.
+    """
+
+    def __init__(self, output_path, append):
+        mode = 'a' if append else 'w'
+        self.file = open(output_path, mode=mode, newline='', encoding='utf-8')
+        self.lock = threading.Lock()
+        if self.file.tell() == 0:
+            self._write_rows([], header=True)
+
+    def _write_rows(self, rows, header=False):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS)
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+        with self.lock:
+            self.file.write(buffer.getvalue())
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def write_site(self, rows):
+        self._write_rows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def run(websites_file, output_path, workers=8, site_workers=4, resume=False):
+    """Process every site in websites_file concurrently and append the results to output_path."""
+    sites = read_websites(websites_file)
+    if resume:
+        completed = read_completed_sites(output_path)
+        pending = [site for site in sites if site not in completed]
+        print(f"Resuming: {len(sites) - len(pending)} of {len(sites)} sites already in {output_path}")
+    else:
+        pending = sites
+
+    writer = SiteBlockWriter(output_path, append=resume)
     try:
-        print(f"Fetching URLs from sitemap: {sitemap_url}")
-        urls = list(set(fetch_sitemap_urls(sitemap_url)))  # Remove duplicate URLs
-        print(f"Found {len(urls)} unique URLs in sitemap.")
+        with ThreadPoolExecutor(max_workers=workers) as page_pool, \
+                ThreadPoolExecutor(max_workers=site_workers) as site_pool:
+            futures = {site_pool.submit(process_site, site, page_pool): site for site in pending}
+            for future in as_completed(futures):
+                site = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    print(f"Error processing site {site}: {e}")
+                    continue
+                if rows:
+                    writer.write_site(rows)
+                    print(f"Completed {site}: {len(rows)} pages")
+                else:
+                    # Nothing is recorded, so --resume retries the site
+                    print(f"No pages processed for {site}")
+    finally:
+        writer.close()
+    print(f"Processing completed. Results are saved in {output_path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Count custom-block-element usage on every page of the listed websites.')
+    parser.add_argument('--websites', default='websites.csv', help='CSV file with a website URL in the first column')
+    parser.add_argument('--output', default='custom_block_counts.csv', help='CSV file the results are appended to')
+    parser.add_argument('--workers', type=int, default=8, help='Number of pages fetched concurrently')
+    parser.add_argument('--site-workers', type=int, default=4, help='Number of sites processed concurrently')
+    parser.add_argument('--resume', action='store_true',
+                        help='Keep the existing output and skip the sites already present in it')
+    return parser.parse_args(argv)
 
-        results = []
-        for url in urls:
-            print(f"Processing URL: {url}")
-            soup, error = fetch_page(url)
-            if error:
-                print(f"Error fetching page {url}: {error}")
-                continue
-
-            blocks = count_custom_blocks(soup)
-            results.append({
-                'URL': url,
-                'CustomBlockCount': len(blocks),
-                'ChildCustomBlockCount': sum(block['child_count'] for block in blocks),
-                'HelixChildCount': sum(block['helix_child_count'] for block in blocks)
-            })
-
-        # Export results to CSV
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_path, index=False)
-        print(f"Results exported to {output_path}")
-    except Exception as e:
-        print(f"Error processing sitemap: {e}")
 
 if __name__ == "__main__":
-    # Read URLs from websites.csv and append sitemap.xml to each URL
-    websites_file = "websites.csv"  # Replace with your websites.csv file path
-    sitemap_urls = []
-
+    args = parse_args()
     try:
-        with open(websites_file, mode='r') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if row:  # Ensure the row is not empty
-                    sitemap_urls.append(f"{row[0].strip()}/sitemap.xml")
-    except Exception as e:
-        print(f"Error reading websites file: {e}")
-        exit(1)
-
-    # Initialize results list
-    results = []
-
-    # Process each sitemap URL and combine results into a single CSV file
-    output_csv = "custom_block_counts-dommaster-25july-new.csv"  # Replace with your desired output file
-    with open(output_csv, mode='a', newline='', encoding='utf-8') as csvfile:  # Open in append mode
-        fieldnames = ['URL', 'CustomBlockCount', 'ChildCustomBlockCount', 'HelixChildCount']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # Write header only if the file is empty
-        if csvfile.tell() == 0:
-            writer.writeheader()
-
-        for sitemap_url in sitemap_urls:
-            print(f"Processing sitemap: {sitemap_url}")
-            try:
-                urls = list(set(fetch_sitemap_urls(sitemap_url)))  # Remove duplicate URLs
-                print(f"Found {len(urls)} unique URLs in sitemap.")
-
-                for url in urls:
-                    print(f"Processing URL: {url}")
-                    soup, error = fetch_page(url)
-                    if error:
-                        print(f"Error fetching page {url}: {error}")
-                        continue
-
-                    blocks = count_custom_blocks(soup)
-                    record = {
-                        'URL': url,
-                        'CustomBlockCount': len(blocks),
-                        'ChildCustomBlockCount': sum(block['child_count'] for block in blocks),
-                        'HelixChildCount': sum(block['helix_child_count'] for block in blocks)
-                    }
-                    writer.writerow(record)
-                    print(f"Processed {url}: {record}")
-                    results.append(record)  # Append to results list
-                    print(f"Appended record for {url}: {record}")
-            except Exception as e:
-                print(f"Error processing sitemap {sitemap_url}: {e}")
-
-    # Export combined results to a single CSV file
-    try:
-        results_df = pd.DataFrame(results)
-        results_df.to_csv(output_csv, index=False)
-        print(f"Combined results exported to {output_csv}")
-    except Exception as e:
-        print(f"Error exporting results to CSV: {e}")
-    # Ensure results are exported only once
-    print("Processing completed. Results are saved in the output CSV file.")
+        run(args.websites, args.output, workers=args.workers, site_workers=args.site_workers, resume=args.resume)
+    except IncompatibleOutput as e:
+        sys.exit(f"Error: {e}")
@@ -11,7 +11,7 @@ with CSV export functionality.
 from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for, Response
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 import re
 import json
 import time
@@ -43,6 +43,11 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # Global storage for progress tracking
 progress_sessions = {}
 
+# BeautifulSoup tree builder for fetched pages. 'lxml' parses several times faster;
+# 'html.parser' (the default) keeps self-closing custom tags like <helix-icon/> empty,
+# which the structure metrics in the exports rely on.
+HTML_PARSER = os.environ.get('ANALYZER_HTML_PARSER', 'html.parser')
+
 # Define a custom HTML parser class
 class SimpleHTMLParser(HTMLParser):
     def __init__(self):
@@ -577,6 +582,15 @@ def scrape_multiple_urls(urls, class_filter="custom-block-element", max_pages=No
     return results
 
 
+def parse_html(content):
+    """Parse a page with the HTML_PARSER tree builder, falling back to html.parser if it isn't installed."""
+    try:
+        return BeautifulSoup(content, HTML_PARSER)
+    except FeatureNotFound:
+        logger.warning(f"Parser {HTML_PARSER!r} is not available, using html.parser")
+        return BeautifulSoup(content, 'html.parser')
+
+
 def fetch_page(url):
     """Fetch webpage content using requests"""
     try:
@@ -586,7 +600,7 @@ def fetch_page(url):
         response = requests.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = parse_html(response.content)
         return soup, response.text, None
         
     except Exception as e:
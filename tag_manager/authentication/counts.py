@@ -0,0 +1,67 @@
+from django.core.cache import caches
+from django.db.models import Count, Q
+
+# Counts are cached under their own alias; invalidated by the signals in authentication/signals.py
+COUNTS_CACHE_ALIAS = 'counts'
+SITE_COUNTS_KEY = 'counts:sites'
+DASHBOARD_COUNTS_KEY = 'counts:dashboard'
+# Per-site complexity inputs used by the what-if simulation (site_manager/complexity.py)
+SITE_FEATURES_KEY = 'counts:site_features'
+
+COMPLEXITY_LEVELS = ['simple', 'medium', 'complex']
+
+# Sites with an empty, null or unknown complexity
+UNIDENTIFIED_COMPLEXITY = Q(complexity__isnull=True) | Q(complexity='') | ~Q(complexity__in=COMPLEXITY_LEVELS)
+
+
+def get_site_complexity_counts():
+    """
+    Return {'total', 'simple', 'medium', 'complex', 'unidentified'} site counts,
+    computed with a single conditional-aggregation query and cached.
+    """
+    from site_manager.models import SiteListDetails
+
+    cache = caches[COUNTS_CACHE_ALIAS]
+    counts = cache.get(SITE_COUNTS_KEY)
+    if counts is None:
+        counts = SiteListDetails.objects.aggregate(
+            total=Count('id'),
+            unidentified=Count('id', filter=UNIDENTIFIED_COMPLEXITY),
+            **{level: Count('id', filter=Q(complexity=level)) for level in COMPLEXITY_LEVELS},
+        )
+        cache.set(SITE_COUNTS_KEY, counts)
+    return counts
+
+
+def get_dashboard_counts():
+    """
+    Return the totals shown on the tag manager dashboard, cached.
+    Each table is counted once, with conditional aggregation where a table has several counts.
+    """
+    from data_migration_utility.models import DataMigrationUtility
+    from tag_manager_component.models import TagsExtractor, Tag, TagMapper
+
+    cache = caches[COUNTS_CACHE_ALIAS]
+    counts = cache.get(DASHBOARD_COUNTS_KEY)
+    if counts is None:
+        # Since DataMigrationUtility doesn't have a status field, we'll consider complete migrations
+        # as those that have both V1 and V2 content
+        migration_counts = DataMigrationUtility.objects.aggregate(
+            total_migrations=Count('id'),
+            successful_migrations=Count('id', filter=(
+                Q(v1_body__isnull=False, v2_body__isnull=False) & ~Q(v1_body='', v2_body='')
+            )),
+        )
+        counts = {
+            **migration_counts,
+            'total_tags': Tag.objects.count(),
+            'total_extractors': TagsExtractor.objects.count(),
+            'total_tag_mapper_blocks': TagMapper.objects.count(),
+        }
+        cache.set(DASHBOARD_COUNTS_KEY, counts)
+    return counts
+
+
+def invalidate_counts():
+    """Drop the cached counts; call after changes that bypass model signals (queryset update/bulk_update)."""
+    caches[COUNTS_CACHE_ALIAS].delete_many([SITE_COUNTS_KEY, DASHBOARD_COUNTS_KEY, SITE_FEATURES_KEY])
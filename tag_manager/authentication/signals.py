@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from data_migration_utility.models import DataMigrationUtility
+from site_manager.models import SiteListDetails
+from tag_manager_component.models import Tag, TagMapper, TagsExtractor
+
+from .counts import invalidate_counts
+
+
+@receiver([post_save, post_delete], sender=SiteListDetails)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=TagMapper)
+@receiver([post_save, post_delete], sender=TagsExtractor)
+@receiver([post_save, post_delete], sender=DataMigrationUtility)
+def invalidate_cached_counts(sender, **kwargs):
+    invalidate_counts()
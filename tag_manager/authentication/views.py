@@ -3,8 +3,8 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse
-from django.db.models import Q
 from tag_manager_component.models import Tag
+from .counts import get_dashboard_counts, get_site_complexity_counts
 from user_management.models import User
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
@@ -122,54 +122,33 @@ def tag_manager_dashboard(request):
     
     # Get context data for dashboard
     from data_migration_utility.models import DataMigrationUtility
-    from tag_manager_component.models import TagsExtractor, Tag, TagMapper
-    from site_manager.models import SiteListDetails
-    
-    total_migrations = DataMigrationUtility.objects.count()
-    # Since DataMigrationUtility doesn't have a status field, we'll consider complete migrations
-    # as those that have both V1 and V2 content
-    successful_migrations = DataMigrationUtility.objects.filter(
-        v1_body__isnull=False, v2_body__isnull=False
-    ).exclude(v1_body='', v2_body='').count()
-    total_tags = Tag.objects.count()
-    total_extractors = TagsExtractor.objects.count()
+    from tag_manager_component.models import TagsExtractor
+    
+    counts = get_dashboard_counts()
+    site_counts = get_site_complexity_counts()
     recent_migrations = DataMigrationUtility.objects.order_by('-created_at')[:5]
     recent_extractors = TagsExtractor.objects.order_by('-created_at')[:3]
     
-    # Get counts for sites and tag mapper blocks
-    total_sites = SiteListDetails.objects.count()
-    total_tag_mapper_blocks = TagMapper.objects.count()
-    
-    # Get complexity counts
-    simple_sites = SiteListDetails.objects.filter(complexity='simple').count()
-    medium_sites = SiteListDetails.objects.filter(complexity='medium').count()
-    complex_sites = SiteListDetails.objects.filter(complexity='complex').count()
-    unidentified_sites = SiteListDetails.objects.filter(
-        Q(complexity__isnull=True) | 
-        Q(complexity='') | 
-        ~Q(complexity__in=['simple', 'medium', 'complex'])
-    ).count()
-    
     # Calculate completion percentage
     completion_percentage = 0
-    if total_migrations > 0:
-        completion_percentage = round((successful_migrations / total_migrations) * 100, 1)
+    if counts['total_migrations'] > 0:
+        completion_percentage = round((counts['successful_migrations'] / counts['total_migrations']) * 100, 1)
     
     context = {
-        'total_migrations': total_migrations,
-        'successful_migrations': successful_migrations,
-        'total_tags': total_tags,
-        'total_extractors': total_extractors,
+        'total_migrations': counts['total_migrations'],
+        'successful_migrations': counts['successful_migrations'],
+        'total_tags': counts['total_tags'],
+        'total_extractors': counts['total_extractors'],
         'completion_percentage': completion_percentage,
         'recent_migrations': recent_migrations,
         'recent_extractors': recent_extractors,
         'user': request.user,
-        'total_sites': total_sites,
-        'total_tag_mapper_blocks': total_tag_mapper_blocks,
-        'unidentified_sites': unidentified_sites,
-        'simple_sites': simple_sites,
-        'medium_sites': medium_sites,
-        'complex_sites': complex_sites,
+        'total_sites': site_counts['total'],
+        'total_tag_mapper_blocks': counts['total_tag_mapper_blocks'],
+        'unidentified_sites': site_counts['unidentified'],
+        'simple_sites': site_counts['simple'],
+        'medium_sites': site_counts['medium'],
+        'complex_sites': site_counts['complex'],
     }
     
     return render(request, 'authentication/tag_manager_dashboard.html', context)
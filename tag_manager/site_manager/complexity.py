@@ -0,0 +1,256 @@
+import json
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import caches
+from django.utils import timezone
+
+from authentication.counts import COUNTS_CACHE_ALIAS, SITE_FEATURES_KEY
+from tag_manager_component.complexity import (
+    COMPLEXITY_FEATURES, COMPLEXITY_ORDER, ComplexityEvaluator, get_complexity_evaluator,
+)
+from tag_manager_component.models import Tag
+
+from .models import BatchJobItem, SiteListDetails, SiteMetaComponent
+
+COMPLEXITY_LEVELS = ['simple', 'medium', 'complex']
+
+# Sites are evaluated and written in batches of this size
+RECOMPUTE_BATCH_SIZE = 500
+
+# Site fields read by the complexity calculation
+SITE_COMPLEXITY_INPUT_FIELDS = [
+    'id', 'website_url', 'complexity', 'complexity_configuration', 'total_pages',
+    'v2_compatible_count', 'v2_non_compatible_count', 'custom_component',
+]
+
+
+def load_v2_tag_complexity(names=None):
+    """
+    Return {component_name: complexity} for V2 tags in one query, optionally limited to `names`.
+    When a name exists under several theme types the lowest id wins.
+    """
+    tags = Tag.objects.filter(version='V2')
+    if names is not None:
+        tags = tags.filter(name__in=list(names))
+    return dict(tags.order_by('-id').values_list('name', 'complexity'))
+
+
+def count_components_by_complexity(component_names, tag_complexity):
+    """Count unique V2 components per complexity level using a {name: complexity} map."""
+    complexity_counts = {level: 0 for level in COMPLEXITY_LEVELS}
+    for component_name in component_names:
+        complexity = tag_complexity.get(component_name)
+        if complexity in complexity_counts:
+            complexity_counts[complexity] += 1
+    return complexity_counts
+
+
+def get_v2_components_by_site(site_ids):
+    """Return {site_id: set of unique V2 compatible component names} for the given sites in one query."""
+    components = defaultdict(set)
+    rows = (
+        SiteMetaComponent.objects
+        .filter(site_list_details_id__in=site_ids, component_type='v2_compatible')
+        .values_list('site_list_details_id', 'component_name')
+        .distinct()
+        .order_by()
+    )
+    for site_id, component_name in rows:
+        components[site_id].add(component_name)
+    return components
+
+
+def custom_component_count(site):
+    """Custom component count stored on the site (kept in the text custom_component field)."""
+    try:
+        return int(site.custom_component or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_site_data(site, complexity_counts):
+    """Build the site_data dict that get_website_complexity evaluates."""
+    return {
+        'number_of_pages': site.total_pages,
+        'number_of_helix_v2_compatible': site.v2_compatible_count,
+        'number_of_helix_v2_non_compatible': site.v2_non_compatible_count,
+        'number_of_custom_components': custom_component_count(site),
+        'total_simple_components': complexity_counts['simple'],
+        'total_medium_components': complexity_counts['medium'],
+        'total_complex_components': complexity_counts['complex'],
+    }
+
+
+def build_complexity_configuration(site_data, complexity, config_data):
+    """JSON audit trail stored in SiteListDetails.complexity_configuration."""
+    return json.dumps({
+        'configuration_used': config_data,
+        'site_data_at_calculation': site_data,
+        'calculation_timestamp': timezone.now().isoformat(),
+        'complexity_determined': complexity,
+    })
+
+
+def complexity_inputs_unchanged(site, complexity, site_data, config_data):
+    """True when the site already stores this complexity, computed from the same inputs and thresholds."""
+    if site.complexity != complexity or not site.complexity_configuration:
+        return False
+    try:
+        stored = json.loads(site.complexity_configuration)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return (
+        isinstance(stored, dict)
+        and stored.get('configuration_used') == config_data
+        and stored.get('site_data_at_calculation') == site_data
+    )
+
+
+def recompute_site_complexities(job=None):
+    """
+    Recalculate complexity for every site.
+
+    The V2 tag-complexity map and the compiled thresholds are loaded once. Each
+    batch of sites costs one query for its V2 components, one vectorized
+    evaluation and one bulk_update for the sites whose complexity or inputs
+    changed. With a BatchJob, per-site outcomes and progress are recorded once
+    per batch. Returns the number of sites updated.
+    """
+    evaluator = get_complexity_evaluator()
+    tag_complexity = load_v2_tag_complexity()
+    sites = SiteListDetails.objects.only(*SITE_COMPLEXITY_INPUT_FIELDS).order_by('id')
+    updated_count = 0
+    last_id = 0
+
+    while True:
+        batch = list(sites.filter(id__gt=last_id)[:RECOMPUTE_BATCH_SIZE])
+        if not batch:
+            return updated_count
+        last_id = batch[-1].id
+        components_by_site = get_v2_components_by_site([site.id for site in batch])
+
+        site_data_list = [
+            build_site_data(site, count_components_by_complexity(components_by_site.get(site.id, ()), tag_complexity))
+            for site in batch
+        ]
+        complexities = evaluator.evaluate_many(
+            np.array([ComplexityEvaluator.features(site_data) for site_data in site_data_list])
+        )
+
+        changed_sites = []
+        items = []
+        for site, site_data, calculated_complexity in zip(batch, site_data_list, complexities):
+            if not calculated_complexity:
+                items.append(BatchJobItem(site=site, site_url=site.website_url, status='failed',
+                                          error='Could not determine complexity'))
+                continue
+
+            config_data = evaluator.config_for(calculated_complexity)
+            old_complexity = site.complexity
+            if not complexity_inputs_unchanged(site, calculated_complexity, site_data, config_data):
+                site.complexity = calculated_complexity
+                site.complexity_configuration = build_complexity_configuration(
+                    site_data, calculated_complexity, config_data,
+                )
+                changed_sites.append(site)
+            items.append(BatchJobItem(site=site, site_url=site.website_url, status='completed',
+                                      old_complexity=old_complexity or '',
+                                      new_complexity=calculated_complexity))
+
+        SiteListDetails.objects.bulk_update(changed_sites, ['complexity', 'complexity_configuration'])
+        updated_count += len(changed_sites)
+        if job is not None:
+            job.record_items(items)
+            job.update_fields(current_site=batch[-1].website_url)
+
+
+class SiteFeatureMatrix:
+    """
+    The complexity inputs of every site as one (n_sites x COMPLEXITY_FEATURES) array,
+    alongside each site's id, URL and stored complexity.
+    """
+
+    def __init__(self, site_ids, website_urls, complexities, features):
+        self.site_ids = site_ids
+        self.website_urls = website_urls
+        self.complexities = complexities
+        self.features = features
+
+    def __len__(self):
+        return len(self.site_ids)
+
+
+def build_site_feature_matrix():
+    """Build the SiteFeatureMatrix with one query per RECOMPUTE_BATCH_SIZE sites for their V2 components."""
+    tag_complexity = load_v2_tag_complexity()
+    sites = SiteListDetails.objects.only(*SITE_COMPLEXITY_INPUT_FIELDS).defer('complexity_configuration')
+    site_ids, website_urls, complexities, rows = [], [], [], []
+    last_id = 0
+    while True:
+        batch = list(sites.filter(id__gt=last_id).order_by('id')[:RECOMPUTE_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        components_by_site = get_v2_components_by_site([site.id for site in batch])
+        for site in batch:
+            complexity_counts = count_components_by_complexity(components_by_site.get(site.id, ()), tag_complexity)
+            site_ids.append(site.id)
+            website_urls.append(site.website_url)
+            complexities.append(site.complexity or '')
+            rows.append(ComplexityEvaluator.features(build_site_data(site, complexity_counts)))
+    return SiteFeatureMatrix(
+        np.array(site_ids, dtype=np.int64),
+        website_urls,
+        np.array(complexities, dtype=object),
+        np.array(rows, dtype=np.int64).reshape(len(rows), len(COMPLEXITY_FEATURES)),
+    )
+
+
+def get_site_feature_matrix():
+    """Return the cached SiteFeatureMatrix, building it on a miss (dropped along with the cached counts)."""
+    cache = caches[COUNTS_CACHE_ALIAS]
+    matrix = cache.get(SITE_FEATURES_KEY)
+    if matrix is None:
+        matrix = build_site_feature_matrix()
+        cache.set(SITE_FEATURES_KEY, matrix)
+    return matrix
+
+
+def simulate_complexity(candidate_thresholds, changed_limit=1000):
+    """
+    Classify every site against candidate thresholds without writing anything.
+
+    candidate_thresholds: {complexity_type: {feature: threshold}}; levels and features
+    that aren't given keep their current ComplexityParameter values.
+    Returns the simulated and current distributions and the sites whose class would change
+    (the list is capped at `changed_limit`, `changed_count` is the full number).
+    """
+    current = get_complexity_evaluator()
+    config_data = {level: dict(config) for level, config in current.config_data.items()}
+    for level, thresholds in candidate_thresholds.items():
+        config_data.setdefault(level, {'complexity_type': level}).update(thresholds)
+    evaluator = ComplexityEvaluator(config_data)
+
+    matrix = get_site_feature_matrix()
+    simulated = evaluator.evaluate_many(matrix.features)
+    changed = np.flatnonzero(simulated != matrix.complexities)
+
+    def distribution(values):
+        return {level: int(np.count_nonzero(values == level)) for level in COMPLEXITY_ORDER}
+
+    return {
+        'total_sites': len(matrix),
+        'distribution': distribution(simulated),
+        'current_distribution': distribution(matrix.complexities),
+        'changed_count': int(len(changed)),
+        'changed_sites': [
+            {
+                'id': int(matrix.site_ids[i]),
+                'website_url': matrix.website_urls[i],
+                'current_complexity': matrix.complexities[i],
+                'simulated_complexity': simulated[i],
+            }
+            for i in changed[:changed_limit]
+        ],
+    }
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BatchJob, CrawlTask
+
+# Visibility timeout: a leased task is handed out again if its worker hasn't finished or renewed it by then
+DEFAULT_LEASE_SECONDS = 300
+
+# A failed attempt is retried after RETRY_BACKOFF_SECONDS, doubling with every further attempt
+RETRY_BACKOFF_SECONDS = 60
+
+ENQUEUE_BATCH_SIZE = 1000
+
+
+def enqueue_site_tasks(sites, job=None):
+    """Queue one site task per site. Returns the number of tasks created."""
+    tasks = [CrawlTask(task_type='site', site=site, job=job) for site in sites]
+    CrawlTask.objects.bulk_create(tasks, batch_size=ENQUEUE_BATCH_SIZE)
+    return len(tasks)
+
+
+def enqueue_page_tasks(site_task, page_urls, worker_id):
+    """
+    Split a site task into one page task per URL and park the site task until they are done.
+
+    The site task moves to `waiting` and its page tasks are inserted in one transaction,
+    the status change first and only while `worker_id` still holds the lease: no worker
+    can claim a page task before its parent waits for it, and a site task re-claimed after
+    its lease expired is never split twice. Returns the number of page tasks created, or
+    0 if the lease was lost.
+    """
+    with transaction.atomic():
+        if not _leased_by(site_task, worker_id).update(status='waiting', lease_owner='', lease_expires_at=None):
+            return 0
+        tasks = [
+            CrawlTask(task_type='page', site_id=site_task.site_id, job_id=site_task.job_id,
+                      parent=site_task, page_url=page_url, max_attempts=site_task.max_attempts)
+            for page_url in page_urls
+        ]
+        CrawlTask.objects.bulk_create(tasks, batch_size=ENQUEUE_BATCH_SIZE)
+    return len(tasks)
+
+
+def claimable(now):
+    """Pending tasks that are due, and leased tasks whose lease expired with attempts left."""
+    return (
+        Q(status='pending', available_at__lte=now)
+        | Q(status='leased', lease_expires_at__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def fail_abandoned_tasks(now=None):
+    """Fail leased tasks whose lease expired on their last attempt. Returns the failed tasks."""
+    now = now or timezone.now()
+    abandoned = CrawlTask.objects.filter(status='leased', lease_expires_at__lt=now,
+                                         attempts__gte=F('max_attempts'))
+    tasks = list(abandoned.select_related('site', 'job', 'parent'))
+    failed = []
+    for task in tasks:
+        # Compare-and-set, so a task is only failed once even with several workers reaping
+        if CrawlTask.objects.filter(pk=task.pk, status='leased', lease_expires_at=task.lease_expires_at).update(
+            status='failed', last_error='Lease expired on the last attempt', finished_at=now,
+        ):
+            failed.append(task)
+    return failed
+
+
+def claim_tasks(worker_id, limit=1, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Lease up to `limit` tasks for `worker_id` and return them.
+
+    Each task is claimed with a conditional UPDATE that only succeeds while the
+    task is still claimable, so concurrent workers on any number of hosts never
+    lease the same task twice and no row locks are held.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        CrawlTask.objects.filter(claimable(now))
+        .order_by('available_at', 'id')
+        .values_list('id', flat=True)[:limit * 4]
+    )
+    claimed_ids = []
+    for task_id in candidate_ids:
+        if len(claimed_ids) >= limit:
+            break
+        if CrawlTask.objects.filter(claimable(now), pk=task_id).update(
+            status='leased',
+            lease_owner=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        ):
+            claimed_ids.append(task_id)
+    return list(CrawlTask.objects.filter(pk__in=claimed_ids).select_related('site', 'job', 'parent').order_by('id'))
+
+
+def _leased_by(task, worker_id):
+    return CrawlTask.objects.filter(pk=task.pk, status='leased', lease_owner=worker_id)
+
+
+def extend_lease(task, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Renew the lease of a long-running task. Returns False if the worker no longer holds it."""
+    return bool(_leased_by(task, worker_id).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds),
+    ))
+
+
+def complete_task(task, worker_id):
+    """Mark a leased task completed. Returns False if the lease was lost to another worker."""
+    return bool(_leased_by(task, worker_id).update(status='completed', finished_at=timezone.now()))
+
+
+def fail_task(task, worker_id, error):
+    """
+    Record a failed attempt: the task is retried after a backoff, or marked failed
+    once it has used all its attempts. Returns True if the task failed for good.
+    """
+    now = timezone.now()
+    if task.attempts >= task.max_attempts:
+        _leased_by(task, worker_id).update(status='failed', last_error=error, finished_at=now)
+        return True
+    backoff = RETRY_BACKOFF_SECONDS * 2 ** max(task.attempts - 1, 0)
+    _leased_by(task, worker_id).update(
+        status='pending', last_error=error, lease_owner='', lease_expires_at=None,
+        available_at=now + timedelta(seconds=backoff),
+    )
+    return False
+
+
+def page_tasks_remaining(site_task):
+    """True while any page task split from `site_task` is still pending or leased."""
+    return CrawlTask.objects.filter(parent=site_task, status__in=['pending', 'leased']).exists()
+
+
+def close_waiting_site_task(site_task):
+    """
+    Move a waiting site task to completed once its page tasks are done.
+    Returns True for exactly one caller, which then finalizes the site.
+    """
+    if page_tasks_remaining(site_task):
+        return False
+    return bool(CrawlTask.objects.filter(pk=site_task.pk, status='waiting').update(
+        status='completed', finished_at=timezone.now(),
+    ))
+
+
+def finish_job_if_done(job):
+    """Mark a queued BatchJob completed once every site has been recorded."""
+    if job is None:
+        return
+    BatchJob.objects.filter(pk=job.pk, status='processing', current__gte=F('total')).update(
+        status='completed', current_site='', finished_at=timezone.now(),
+    )
@@ -0,0 +1,69 @@
+import csv
+import io
+import zlib
+
+from django.http import StreamingHttpResponse
+
+EXPORT_BATCH_SIZE = 2000
+
+# Rendered CSV text is sent in chunks of roughly this many characters
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_values_in_batches(queryset, fields, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield value tuples for `fields` ordered by primary key, fetched in keyset batches.
+
+    Each batch is a separate `pk > last_pk` query, so memory stays flat even on
+    backends such as MySQL whose client buffers a whole result set.
+    """
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        rows = list(batch.values_list('pk', *fields)[:batch_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        last_pk = rows[-1][0]
+
+
+def iter_csv(header, rows):
+    """Render CSV rows to text chunks of about STREAM_CHUNK_SIZE characters."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_gzip(chunks):
+    """Gzip-compress a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def streaming_csv_response(filename, header, rows, compress=False):
+    """
+    Return a StreamingHttpResponse that writes `rows` as CSV without holding them in memory.
+    With `compress` the file is sent gzipped as `<filename>.gz`.
+    """
+    chunks = iter_csv(header, rows)
+    if compress:
+        response = StreamingHttpResponse(iter_gzip(chunks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -76,8 +76,20 @@ class SiteMetaDetailsForm(forms.ModelForm):
             'custom_component': 'List any custom components specific to this implementation, separated by commas',
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, site=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.site = site
         # Exclude site_list_details from the form as it should be set programmatically
         if 'site_list_details' in self.fields:
             del self.fields['site_list_details']
+
+    def clean_site_url(self):
+        site_url = self.cleaned_data['site_url']
+        # Pages are unique per site; site_list_details isn't a form field so check it here
+        if self.site is not None:
+            duplicates = SiteMetaDetails.objects.filter(site_list_details=self.site, site_url=site_url)
+            if self.instance.pk:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise forms.ValidationError('This page URL has already been added for this site.')
+        return site_url
@@ -0,0 +1,316 @@
+import functools
+import html
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is in requirements.txt, html.parser is the fallback
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_BLOCK_CLASS = 'custom-block-element'
+
+HELIX_TAG_PATTERN = re.compile(r'<(helix-[a-zA-Z0-9-]+)')
+
+# Byte-level tokens for InventoryScanner, following the rules of the standard library's html.parser
+_COMMENT_CLOSE = re.compile(rb'--\s*>')
+_START_TAG = re.compile(rb"""
+  <([a-zA-Z][^\t\n\r\f />\x00]*)    # tag name
+  ((?:[\s/]*                          # optional whitespace before attribute name
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*  # attribute name
+      (?:\s*=+\s*                      # value indicator
+        (?:'[^']*'                     # LITA-enclosed value
+          |"[^"]*"                     # LIT-enclosed value
+          |(?!['"])[^>\s]*             # bare value
+         )
+        \s*                            # possibly followed by a space
+       )?(?:\s|/(?!>))*
+     )*
+   )?)
+  \s*                                  # trailing whitespace
+""", re.VERBOSE)
+_ATTRIBUTE = re.compile(
+    rb'((?<=[\'"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*'
+    rb'(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?(?:\s|/(?!>))*'
+)
+_TAG_OPENER = re.compile(rb'<[a-zA-Z]')
+# Start tags repeating an attribute the lxml lookups read; html.parser keeps the last value, libxml2 the first.
+# The per-name hints run on the lower-cased page: a quick check that never misses such a tag.
+_ATTRIBUTE_VALUES = rb'(?:[^<>"\']|"[^"]*"|\'[^\']*\')*?'
+_REPEATED_ATTRIBUTE = re.compile(
+    rb'<[a-zA-Z]' + _ATTRIBUTE_VALUES + rb'(?<=[\s/"\'])(class|tag|name)\s*=' + _ATTRIBUTE_VALUES + rb'(?<=[\s/"\'])\1\s*=',
+    re.I,
+)
+_REPEATED_ATTRIBUTE_HINTS = [
+    re.compile(name + rb'\s*=' + _ATTRIBUTE_VALUES + rb'(?<=[\s/"\'])' + name + rb'\s*=')
+    for name in (b'class', b'tag', b'name')
+]
+_RAW_TEXT_END = {
+    b'script': re.compile(rb'</\s*script\s*>', re.I),
+    b'style': re.compile(rb'</\s*style\s*>', re.I),
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _candidate_pattern(filter_bytes):
+    """
+    Pattern for the only places InventoryScanner has to look at: comments, CDATA
+    sections, script/style tags, helix tags and start tags mentioning the class filter.
+    Everything in between is skipped by the regex engine.
+    """
+    return re.compile(
+        rb'<(?:(!--)|(!\[)|(?i:script|style)(?=[\t\n\r\f />\x00])|(?i:helix)'
+        rb'|[a-zA-Z](?:[^<>"\']|"[^"]*"|\'[^\']*\')*?(?:"[^"]*?|\'[^\']*?)?' + re.escape(filter_bytes) + rb')'
+    )
+
+
+def _keep_last_attributes(content):
+    """Rewrite the start tags of `content` (bytes) that repeat an attribute so only its last value is left."""
+    parts = []
+    position = 0
+    for repeated in _REPEATED_ATTRIBUTE.finditer(content):
+        if repeated.start() < position:  # inside a value of the tag just rewritten
+            continue
+        tag = _START_TAG.match(content, repeated.start())
+        attributes = list(_ATTRIBUTE.finditer(content, tag.start(2), tag.end(2)))
+        if len(attributes) < 2:
+            continue
+        last = {match.group(1).lower(): match for match in attributes}
+        kept = [match.group(0).rstrip() for match in attributes if last[match.group(1).lower()] is match]
+        parts += [content[position:attributes[0].start()], b' '.join(kept), content[attributes[-1].end():tag.end()]]
+        position = tag.end()
+    parts.append(content[position:])
+    return b''.join(parts)
+
+
+class SoupParser:
+    """BeautifulSoup on the standard library html.parser; slow, but needs nothing beyond bs4."""
+
+    name = 'html.parser'
+
+    def parse(self, content):
+        return BeautifulSoup(content, 'html.parser')
+
+    def find_custom_class_elements(self, document, class_filter=CUSTOM_BLOCK_CLASS):
+        """Return the tag names of the elements whose class attribute contains `class_filter`."""
+        try:
+            elements = document.select(f'[class*="{class_filter.lower()}"]')
+            return [element.name for element in elements if element.name]
+        except Exception as e:
+            logger.warning(f"Error finding custom elements: {e}")
+            return []
+
+    def find_helix_elements(self, document, page_source):
+        """Return the unique helix-* tag names of the page."""
+        try:
+            helix_elements = set()
+
+            # Elements whose tag/name attribute names a helix component
+            try:
+                for tag in document.select('[tag^="helix"], [name^="helix"]'):
+                    if tag.name.startswith('helix'):
+                        helix_elements.add(tag.name)
+            except Exception:
+                pass
+
+            if not helix_elements:
+                for tag in document.find_all(lambda tag: tag.name and tag.name.startswith('helix')):
+                    helix_elements.add(tag.name)
+
+            # Regex fallback on the raw source (e.g. tags only present inside scripts)
+            if not helix_elements and page_source:
+                helix_elements.update(HELIX_TAG_PATTERN.findall(page_source))
+
+            return list(helix_elements)
+        except Exception as e:
+            logger.warning(f"Error finding helix elements: {e}")
+            return []
+
+
+class LxmlParser:
+    """
+    libxml2's HTML parser with the lookups done as XPath queries.
+    Returns the same names as SoupParser at a fraction of the parse time.
+    libxml2 keeps the first of repeated attributes where html.parser keeps the
+    last, so tags repeating class, tag or name are rewritten before parsing.
+    """
+
+    name = 'lxml'
+
+    def parse(self, content):
+        if not content:
+            return None
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        lowered = data.lower()
+        if any(hint.search(lowered) for hint in _REPEATED_ATTRIBUTE_HINTS):
+            data = _keep_last_attributes(data)
+            content = data.decode('utf-8') if isinstance(content, str) else data
+        # A new parser per document: lxml parser objects can't be shared between threads
+        return etree.fromstring(content, etree.HTMLParser())
+
+    def find_custom_class_elements(self, document, class_filter=CUSTOM_BLOCK_CLASS):
+        """Return the tag names of the elements whose class attribute contains `class_filter`."""
+        if document is None:
+            return []
+        try:
+            return [element.tag for element in document.xpath('//*[contains(@class, $f)]', f=class_filter.lower())]
+        except Exception as e:
+            logger.warning(f"Error finding custom elements: {e}")
+            return []
+
+    def find_helix_elements(self, document, page_source):
+        """Return the unique helix-* tag names of the page."""
+        try:
+            helix_elements = set()
+            if document is not None:
+                for element in document.xpath('//*[starts-with(@tag, "helix") or starts-with(@name, "helix")]'):
+                    if element.tag.startswith('helix'):
+                        helix_elements.add(element.tag)
+                if not helix_elements:
+                    helix_elements.update(element.tag for element in document.xpath('//*[starts-with(name(), "helix")]'))
+
+            if not helix_elements and page_source:
+                helix_elements.update(HELIX_TAG_PATTERN.findall(page_source))
+
+            return list(helix_elements)
+        except Exception as e:
+            logger.warning(f"Error finding helix elements: {e}")
+            return []
+
+
+class PageInventory:
+    """Component inventory of one page, as found by InventoryScanner."""
+
+    def __init__(self, content, class_filter, custom_tags, helix_tags, named_helix_tags):
+        self.content = content
+        self.class_filter = class_filter
+        self.custom_tags = custom_tags
+        self.helix_tags = helix_tags
+        self.named_helix_tags = named_helix_tags
+
+
+class InventoryScanner:
+    """
+    Inventory-only backend: one pass of compiled byte patterns over the raw
+    response that records the helix tag names and the tags carrying the
+    custom block class, without building a DOM. Only candidate tags are
+    tokenized (with html.parser's rules, comments and script/style bodies
+    skipped), so it reports the same names as SoupParser. The one difference:
+    a class filter spelled with character references in the markup isn't found.
+    """
+
+    name = 'inventory'
+
+    def __init__(self, class_filter=CUSTOM_BLOCK_CLASS):
+        self.class_filter = class_filter.lower()
+
+    def parse(self, content, class_filter=None):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        class_filter = (class_filter or self.class_filter).lower()
+        filter_bytes = class_filter.encode('utf-8')
+        custom_tags = []
+        helix_tags = set()
+        named_helix_tags = set()
+
+        candidates = _candidate_pattern(filter_bytes)
+        position = 0
+        while True:
+            candidate = candidates.search(content, position)
+            if candidate is None:
+                break
+            start = candidate.start()
+            # A match inside the attributes of an ordinary tag (e.g. title="<!-- x") isn't markup
+            tag_end = content.rfind(b'>', position, start)
+            opener = _TAG_OPENER.search(content, max(tag_end, position), start)
+            if opener is not None:
+                close = content.find(b'>', _START_TAG.match(content, opener.start()).end())
+                position = close + 1 if close != -1 else len(content)
+                continue
+            if candidate.group(1):  # <!-- comment -->
+                close = _COMMENT_CLOSE.search(content, candidate.end())
+                position = close.end() if close else len(content)
+                continue
+            if candidate.group(2):  # <![CDATA[ ... ]]>
+                close = content.find(b']]>', candidate.end())
+                position = close + 3 if close != -1 else len(content)
+                continue
+
+            tag = _START_TAG.match(content, start)
+            close = content.find(b'>', tag.end())
+            if close == -1:
+                break
+            position = close + 1
+            name = tag.group(1).lower()
+            attributes = tag.group(2)
+            is_helix = name.startswith(b'helix')
+            if is_helix or filter_bytes in attributes:
+                values = self._attributes(attributes) if attributes else {}
+                tag_name = name.decode('utf-8', 'replace')
+                if class_filter in values.get('class', ''):
+                    custom_tags.append(tag_name)
+                if is_helix:
+                    helix_tags.add(tag_name)
+                    if values.get('tag', '').startswith('helix') or values.get('name', '').startswith('helix'):
+                        named_helix_tags.add(tag_name)
+            # Script and style bodies are raw text, unless the tag closed itself
+            raw_text_end = _RAW_TEXT_END.get(name)
+            if raw_text_end is not None and content[close - 1:close] != b'/':
+                end = raw_text_end.search(content, position)
+                position = end.end() if end else len(content)
+
+        return PageInventory(content, class_filter, custom_tags, helix_tags, named_helix_tags)
+
+    @staticmethod
+    def _attributes(attributes):
+        """Decode the attributes of one start tag into {lower-cased name: value}; the last duplicate wins."""
+        values = {}
+        for match in _ATTRIBUTE.finditer(attributes):
+            value = match.group(3) or b''
+            if value[:1] in (b"'", b'"') and value[:1] == value[-1:] and len(value) > 1:
+                value = value[1:-1]
+            value = value.decode('utf-8', 'replace')
+            if '&' in value:
+                value = html.unescape(value)
+            values[match.group(1).decode('utf-8', 'replace').lower()] = value
+        return values
+
+    def find_custom_class_elements(self, document, class_filter=CUSTOM_BLOCK_CLASS):
+        """Return the tag names of the elements whose class attribute contains `class_filter`."""
+        if class_filter.lower() != document.class_filter:
+            document = self.parse(document.content, class_filter)
+        return list(document.custom_tags)
+
+    def find_helix_elements(self, document, page_source):
+        """Return the unique helix-* tag names of the page."""
+        helix_elements = set(document.named_helix_tags or document.helix_tags)
+        if not helix_elements and page_source:
+            helix_elements.update(HELIX_TAG_PATTERN.findall(page_source))
+        return list(helix_elements)
+
+
+PARSER_BACKENDS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser,
+    InventoryScanner.name: InventoryScanner,
+}
+
+
+def get_parser(name=None):
+    """
+    Return the parser backend named by `name` or the SITE_ANALYSIS_PARSER setting.
+    Falls back to html.parser when the backend is unknown or lxml isn't installed.
+    """
+    name = name or getattr(settings, 'SITE_ANALYSIS_PARSER', InventoryScanner.name)
+    if name == LxmlParser.name and etree is None:
+        logger.warning("lxml is not installed, using html.parser for page analysis")
+        name = SoupParser.name
+    if name not in PARSER_BACKENDS:
+        logger.warning(f"Unknown parser backend {name!r}, using html.parser for page analysis")
+        name = SoupParser.name
+    return PARSER_BACKENDS[name]()
@@ -0,0 +1,223 @@
+import hashlib
+import html
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from django.conf import settings
+
+from .html_parsers import get_parser
+
+logger = logging.getLogger(__name__)
+
+# Default bounds of one crawl, overridden by the SITE_CRAWL_* settings
+CRAWL_MAX_DEPTH = 3
+CRAWL_MAX_PAGES = 500
+CRAWL_TIME_LIMIT = 300  # seconds
+CRAWL_WORKERS = 8
+
+# Sizing of the seen-URL filter: links discovered (not pages fetched) per crawl
+SEEN_CAPACITY = 100_000
+SEEN_ERROR_RATE = 0.001
+RECENT_URLS = 10_000
+
+# Links to resources that are never HTML pages
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.css', '.js', '.json', '.xml',
+    '.zip', '.gz', '.mp3', '.mp4', '.mov', '.avi', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.woff', '.woff2', '.ttf', '.eot',
+)
+
+LINK_PATTERN = re.compile(rb'<a\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for `capacity` items at `error_rate` false positives."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: the k positions are derived from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class SeenURLs:
+    """
+    Set of URLs a crawl has already queued: an exact LRU set of the most recent
+    URLs (navigation links repeat on every page) in front of a Bloom filter that
+    remembers all of them in constant memory. A Bloom false positive only means
+    a page is skipped, never fetched twice.
+    """
+
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE, recent=RECENT_URLS):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.recent = OrderedDict()
+        self.recent_limit = recent
+        self.lock = threading.Lock()
+
+    def add(self, url):
+        """Record `url` and return True if it hadn't been seen before."""
+        with self.lock:
+            if url in self.recent:
+                self.recent.move_to_end(url)
+                return False
+            is_new = url not in self.bloom
+            if is_new:
+                self.bloom.add(url)
+            self.recent[url] = None
+            if len(self.recent) > self.recent_limit:
+                self.recent.popitem(last=False)
+            return is_new
+
+
+def site_host(url):
+    """Lower-cased host of `url` without a leading 'www.'."""
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def normalize_link(href, page_url):
+    """Absolute URL of a link without its fragment, or None for non-HTTP and non-page links."""
+    href = html.unescape(href.strip())
+    if not href or href.startswith(('mailto:', 'tel:', 'javascript:', 'data:')):
+        return None
+    url, _ = urldefrag(urljoin(page_url, href))
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    if parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+def extract_links(content, page_url):
+    """Yield the normalized URLs of the <a href> links in raw page bytes."""
+    for match in LINK_PATTERN.finditer(content):
+        href = next(group for group in match.groups() if group is not None)
+        url = normalize_link(href.decode('utf-8', 'replace'), page_url)
+        if url:
+            yield url
+
+
+class LinkCrawler:
+    """
+    Concurrent breadth-first crawler for sites without a sitemap.
+
+    Follows <a href> links within the start URL's host (ignoring 'www.') up to
+    max_depth levels, max_pages fetched pages and time_limit seconds, honouring
+    robots.txt. crawl() yields (page_url, document, page_source, error) for every
+    fetched HTML page, parsed with the analysis parser, as pages arrive.
+    """
+
+    def __init__(self, base_url, max_depth=None, max_pages=None, time_limit=None, workers=None,
+                 parser=None, headers=None):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.host = site_host(self.base_url)
+        self.max_depth = max_depth if max_depth is not None else getattr(settings, 'SITE_CRAWL_MAX_DEPTH', CRAWL_MAX_DEPTH)
+        self.max_pages = max_pages or getattr(settings, 'SITE_CRAWL_MAX_PAGES', CRAWL_MAX_PAGES)
+        self.time_limit = time_limit or getattr(settings, 'SITE_CRAWL_TIME_LIMIT', CRAWL_TIME_LIMIT)
+        self.workers = workers or getattr(settings, 'SITE_CRAWL_WORKERS', CRAWL_WORKERS)
+        self.parser = parser or get_parser()
+        self.headers = headers or {}
+        self.seen = SeenURLs()
+        self.robots = None
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def _load_robots(self):
+        robots = RobotFileParser()
+        try:
+            response = self._session().get(urljoin(self.base_url, '/robots.txt'), timeout=10, verify=False)
+            robots.parse(response.text.splitlines() if response.status_code == 200 else [])
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch robots.txt from {self.base_url}: {e}")
+            robots.parse([])
+        self.robots = robots
+
+    def allowed(self, url):
+        return site_host(url) == self.host and self.robots.can_fetch(self.headers.get('User-Agent', '*'), url)
+
+    def _fetch(self, url):
+        """
+        Fetch one page and return (page_url, document, page_source, error, links),
+        or None when the URL isn't an HTML page.
+        """
+        try:
+            response = self._session().get(url, timeout=30, verify=False)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            return url, None, None, f"Request error: {e}", []
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None
+        if site_host(response.url) != self.host:
+            return url, None, None, f"Redirected off site to {response.url}", []
+        links = [link for link in extract_links(response.content, response.url) if self.allowed(link)]
+        return url, self.parser.parse(response.content), response.text, None, links
+
+    def crawl(self):
+        deadline = time.monotonic() + self.time_limit
+        self._load_robots()
+        start_url = normalize_link(self.base_url, self.base_url)
+        self.seen.add(start_url)
+        frontier = [start_url]
+        fetched = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for depth in range(self.max_depth + 1):
+                next_frontier = []
+                pending = set()
+                queued = iter(frontier)
+                while True:
+                    # Keep at most `workers` requests in flight, within the page budget
+                    while len(pending) < self.workers and fetched + len(pending) < self.max_pages:
+                        url = next(queued, None)
+                        if url is None:
+                            break
+                        pending.add(pool.submit(self._fetch, url))
+                    if not pending:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.info(f"Crawl of {self.base_url} stopped at the {self.time_limit}s time limit")
+                        return
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        if result is None:
+                            continue
+                        page_url, document, page_source, error, links = result
+                        fetched += 1
+                        if depth < self.max_depth:
+                            next_frontier.extend(link for link in links if self.seen.add(link))
+                        yield page_url, document, page_source, error
+                if fetched >= self.max_pages or not next_frontier:
+                    break
+                frontier = next_frontier
+        logger.info(f"Crawl of {self.base_url} fetched {fetched} pages")
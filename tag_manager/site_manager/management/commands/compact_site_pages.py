@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from site_manager.models import SiteListDetails
+from site_manager.page_components import SiteAggregate, delete_duplicate_pages, sites_with_duplicate_pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove duplicate page rows left by repeated sitemap analysis (keeping the latest row '
+        'per site and page URL) and recalculate the page totals stored on each site'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            type=int,
+            help='Only compact the site with this id',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the sites with duplicate pages without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        duplicate_site_ids = set(sites_with_duplicate_pages())
+        sites = SiteListDetails.objects.filter(is_imported=True)
+        if options['site']:
+            sites = SiteListDetails.objects.filter(pk=options['site'])
+
+        if options['dry_run']:
+            affected = sites.filter(pk__in=duplicate_site_ids)
+            for site in affected:
+                self.stdout.write(f'{site.website_url} has duplicate pages')
+            self.stdout.write(self.style.WARNING(f'{affected.count()} sites would be compacted (dry run)'))
+            return
+
+        total_deleted = 0
+        sites_updated = 0
+        for site in sites.iterator():
+            if site.pk in duplicate_site_ids:
+                deleted = delete_duplicate_pages(site)
+                total_deleted += deleted
+                self.stdout.write(f'{site.website_url}: removed {deleted} duplicate pages')
+
+            # Totals were summed over every stored row, so rebuild them from the remaining pages
+            aggregate = SiteAggregate()
+            aggregate.add_stored_pages(site)
+            aggregate.apply_to(site)
+            site.save(update_fields=[
+                'helix_v1_component', 'helix_v2_compatible_component', 'helix_v2_non_compatible_component',
+                'custom_component', 'total_pages', 'v2_compatible_count', 'v2_non_compatible_count',
+                'component_bits',
+            ])
+            sites_updated += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {total_deleted} duplicate pages and recalculated totals for {sites_updated} sites'
+        ))
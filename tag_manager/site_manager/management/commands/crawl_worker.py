@@ -0,0 +1,195 @@
+import logging
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from site_manager.crawl_queue import (
+    DEFAULT_LEASE_SECONDS, claim_tasks, close_waiting_site_task, complete_task, enqueue_page_tasks, extend_lease,
+    fail_abandoned_tasks, fail_task, finish_job_if_done,
+)
+from site_manager.models import CrawlTask
+from site_manager.page_components import SiteAggregate, delete_stale_pages
+from site_manager.views import (
+    PageAnalyzer, analyze_site, build_v1_to_v2_map, fetch_sitemap_urls, finish_site_analysis, save_page_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tags, mappings and the component vocabulary are reloaded at most this often
+ANALYZER_REFRESH_SECONDS = 60
+
+
+class TaskError(Exception):
+    """A task failure; retried unless `retry` is False."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class Command(BaseCommand):
+    help = (
+        'Process sitemap analysis tasks from the database crawl queue. Any number of workers '
+        'can run at once, on one host or many; each leases tasks, analyzes them and writes the results back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--worker-id',
+            default=f'{socket.gethostname()}:{os.getpid()}',
+            help='Name recorded on leased tasks (default: host:pid)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1,
+            help='Number of tasks leased per poll',
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=DEFAULT_LEASE_SECONDS,
+            help='Visibility timeout of a leased task; renewed while a site is being analyzed',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait before polling again when the queue is empty',
+        )
+        parser.add_argument(
+            '--split-pages',
+            type=int,
+            default=200,
+            help='Split sites with more pages than this into page tasks other workers can share (0 disables)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit as soon as the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        self.worker_id = options['worker_id']
+        self.lease_seconds = options['lease_seconds']
+        self.split_pages = options['split_pages']
+        self.stopping = False
+        self.page_analyzer = None
+        self.page_analyzer_loaded_at = 0
+        processed = 0
+
+        def request_stop(signum, frame):
+            self.stdout.write(self.style.WARNING('Stopping after the current task...'))
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f'Crawl worker {self.worker_id} started')
+        while not self.stopping:
+            close_old_connections()
+            for task in fail_abandoned_tasks():
+                self.task_failed(task, 'Lease expired on the last attempt')
+
+            tasks = claim_tasks(self.worker_id, limit=options['batch_size'], lease_seconds=self.lease_seconds)
+            if not tasks:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            for task in tasks:
+                if self.stopping:
+                    # Let the lease run out so another worker picks the task up
+                    break
+                self.process(task)
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Crawl worker {self.worker_id} processed {processed} tasks'))
+
+    def get_page_analyzer(self):
+        """PageAnalyzer shared by the page tasks of this worker, reloaded every ANALYZER_REFRESH_SECONDS."""
+        if self.page_analyzer is None or time.monotonic() - self.page_analyzer_loaded_at > ANALYZER_REFRESH_SECONDS:
+            self.page_analyzer = PageAnalyzer(build_v1_to_v2_map())
+            self.page_analyzer_loaded_at = time.monotonic()
+        return self.page_analyzer
+
+    def process(self, task):
+        try:
+            if task.task_type == 'site':
+                self.process_site_task(task)
+            else:
+                self.process_page_task(task)
+        except Exception as e:
+            retry = getattr(e, 'retry', True)
+            logger.warning(f"Crawl task {task.pk} failed (attempt {task.attempts}/{task.max_attempts}): {e}")
+            if not retry:
+                task.attempts = task.max_attempts
+            if fail_task(task, self.worker_id, str(e)):
+                self.task_failed(task, str(e))
+
+    def process_site_task(self, task):
+        site = task.site
+        if task.job is not None:
+            task.job.update_fields(current_site=site.website_url)
+
+        # Without a sitemap, analyze_site crawls the site's links within this task
+        sitemap_urls = fetch_sitemap_urls(site.website_url)
+        if self.split_pages and len(sitemap_urls) > self.split_pages:
+            count = enqueue_page_tasks(task, sitemap_urls, self.worker_id)
+            if count:
+                self.stdout.write(f'{site.website_url}: split into {count} page tasks')
+            return
+
+        last_renewal = time.monotonic()
+
+        def on_page(page_url):
+            nonlocal last_renewal
+            if time.monotonic() - last_renewal > self.lease_seconds / 3:
+                extend_lease(task, self.worker_id, self.lease_seconds)
+                last_renewal = time.monotonic()
+
+        pages_processed = analyze_site(site, sitemap_urls, build_v1_to_v2_map(), on_page=on_page)
+        if complete_task(task, self.worker_id):
+            self.record(task, 'completed')
+            self.stdout.write(f'{site.website_url}: analyzed {pages_processed} pages')
+
+    def process_page_task(self, task):
+        page_analyzer = self.get_page_analyzer()
+        page = page_analyzer.analyze(task.site, task.page_url)
+        if page is None:
+            raise TaskError(f'Could not fetch {task.page_url}')
+        save_page_batch(task.site, [page], page_analyzer.tag_ids)
+        if complete_task(task, self.worker_id):
+            self.page_task_done(task)
+
+    def page_task_done(self, task):
+        """After the last page task of a split site, aggregate the site from its stored pages."""
+        site_task = task.parent
+        if site_task is None or not close_waiting_site_task(site_task):
+            return
+        # Page tasks only write their own pages: drop the pages this split no longer lists
+        failed_urls = CrawlTask.objects.filter(parent=site_task, status='failed').values_list('page_url', flat=True)
+        delete_stale_pages(task.site, site_task.created_at, keep_urls=failed_urls)
+        aggregate = SiteAggregate()
+        aggregate.add_stored_pages(task.site)
+        finish_site_analysis(task.site, aggregate)
+        self.record(site_task, 'completed')
+        self.stdout.write(f'{task.site.website_url}: finished {aggregate.total_pages} pages')
+
+    def task_failed(self, task, error):
+        """A task that won't be retried: site tasks are reported on their job, page tasks count as done."""
+        if task.task_type == 'site':
+            self.record(task, 'failed', error)
+        else:
+            self.page_task_done(task)
+
+    def record(self, site_task, status, error=''):
+        if site_task.job is None:
+            return
+        site_task.job.record_item(site_task.site, status, error=error)
+        finish_job_if_done(site_task.job)
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0010_sitelistdetails_webbuilder_site_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('analysis', 'Sitemap Analysis'), ('complexity', 'Complexity Update')], max_length=20)),
+                ('status', models.CharField(choices=[('starting', 'Starting'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='starting', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('current', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('current_site', models.CharField(blank=True, default='', max_length=500)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BatchJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_url', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('completed', 'Completed'), ('failed', 'Failed')], max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('old_complexity', models.CharField(blank=True, default='', max_length=10)),
+                ('new_complexity', models.CharField(blank=True, default='', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='site_manager.batchjob')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch_job_items', to='site_manager.sitelistdetails')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='batchjob',
+            index=models.Index(fields=['job_type', '-started_at'], name='site_manage_job_typ_2f3745_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batchjobitem',
+            index=models.Index(fields=['job', 'status'], name='site_manage_job_id_4e106f_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0011_batchjob_batchjobitem'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='batchjob',
+            name='job_type',
+            field=models.CharField(choices=[('analysis', 'Sitemap Analysis'), ('site_analysis', 'Single Site Analysis'), ('complexity', 'Complexity Update')], max_length=20),
+        ),
+    ]
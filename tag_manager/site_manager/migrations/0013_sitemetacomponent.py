@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+COMPONENT_FIELDS = {
+    'v1': 'helix_v1_component',
+    'v2_compatible': 'helix_v2_compatible_component',
+    'v2_non_compatible': 'helix_v2_non_compatible_component',
+    'custom': 'custom_component',
+}
+
+TAG_VERSION_BY_TYPE = {
+    'v1': 'V1',
+    'v2_compatible': 'V2',
+    'v2_non_compatible': 'V1',
+}
+
+
+def backfill_page_components(apps, schema_editor):
+    """
+    Populate SiteMetaComponent from the comma-joined fields of existing SiteMetaDetails rows.
+    Stored strings are already de-duplicated, so every backfilled row gets count=1.
+    """
+    SiteMetaDetails = apps.get_model('site_manager', 'SiteMetaDetails')
+    SiteMetaComponent = apps.get_model('site_manager', 'SiteMetaComponent')
+    Tag = apps.get_model('tag_manager_component', 'Tag')
+
+    tag_ids = {}
+    for tag_id, name, version in Tag.objects.order_by('-id').values_list('id', 'name', 'version'):
+        tag_ids[(version, name)] = tag_id
+
+    rows = []
+    pages = SiteMetaDetails.objects.values_list('id', 'site_list_details_id', *COMPONENT_FIELDS.values())
+    for page in pages.iterator(chunk_size=2000):
+        page_id, site_id, values = page[0], page[1], page[2:]
+        for component_type, value in zip(COMPONENT_FIELDS, values):
+            names = Counter(v.strip() for v in (value or '').split(',') if v.strip())
+            version = TAG_VERSION_BY_TYPE.get(component_type)
+            for name in names:
+                rows.append(SiteMetaComponent(
+                    site_meta_details_id=page_id,
+                    site_list_details_id=site_id,
+                    component_type=component_type,
+                    component_name=name[:255],
+                    tag_id=tag_ids.get((version, name)) if version else None,
+                    count=1,
+                ))
+        if len(rows) >= 5000:
+            SiteMetaComponent.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    if rows:
+        SiteMetaComponent.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0012_alter_batchjob_job_type'),
+        ('tag_manager_component', '0020_alter_tagsextractor_extraction_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteMetaComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_type', models.CharField(choices=[('v1', 'Helix V1'), ('v2_compatible', 'Helix V2 Compatible'), ('v2_non_compatible', 'Helix V2 Non-Compatible'), ('custom', 'Custom')], max_length=20)),
+                ('component_name', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=1)),
+                ('site_list_details', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_components', to='site_manager.sitelistdetails')),
+                ('site_meta_details', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='components', to='site_manager.sitemetadetails')),
+                ('tag', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='page_components', to='tag_manager_component.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site_list_details', 'component_type', 'component_name'], name='site_manage_site_li_5eaa77_idx'), models.Index(fields=['component_type', 'component_name'], name='site_manage_compone_c5a52d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site_meta_details', 'component_type', 'component_name'), name='unique_page_component')],
+            },
+        ),
+        migrations.RunPython(backfill_page_components, migrations.RunPython.noop),
+    ]
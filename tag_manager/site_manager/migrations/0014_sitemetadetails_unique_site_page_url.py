@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:21
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicate_pages(apps, schema_editor):
+    """
+    Keep only the most recent SiteMetaDetails row (highest id) for each (site, page URL)
+    so the unique constraint can be added. Their component rows are removed by cascade.
+    Site totals are not recalculated here; run `manage.py compact_site_pages` for that.
+    """
+    SiteMetaDetails = apps.get_model('site_manager', 'SiteMetaDetails')
+    site_ids = list(
+        SiteMetaDetails.objects
+        .values('site_list_details_id', 'site_url')
+        .annotate(page_count=Count('id'))
+        .filter(page_count__gt=1)
+        .values_list('site_list_details_id', flat=True)
+        .distinct()
+        .order_by()
+    )
+    for site_id in site_ids:
+        latest_ids = {}
+        stale_ids = []
+        pages = SiteMetaDetails.objects.filter(site_list_details_id=site_id).order_by('id')
+        for page_id, site_url in pages.values_list('id', 'site_url'):
+            if site_url in latest_ids:
+                stale_ids.append(latest_ids[site_url])
+            latest_ids[site_url] = page_id
+        for start in range(0, len(stale_ids), 1000):
+            SiteMetaDetails.objects.filter(id__in=stale_ids[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0013_sitemetacomponent'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_pages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sitemetadetails',
+            constraint=models.UniqueConstraint(fields=('site_list_details', 'site_url'), name='unique_site_page_url'),
+        ),
+    ]
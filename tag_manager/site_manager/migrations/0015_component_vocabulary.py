@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def pack_bits(ids):
+    bits = 0
+    for component_id in ids:
+        bits |= 1 << component_id
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def build_component_bits(apps, schema_editor):
+    """
+    Register every Tag name and every stored page component in the vocabulary,
+    then fill in the page and site bitsets from the SiteMetaComponent rows.
+    """
+    Tag = apps.get_model('tag_manager_component', 'Tag')
+    ComponentName = apps.get_model('site_manager', 'ComponentName')
+    SiteListDetails = apps.get_model('site_manager', 'SiteListDetails')
+    SiteMetaDetails = apps.get_model('site_manager', 'SiteMetaDetails')
+    SiteMetaComponent = apps.get_model('site_manager', 'SiteMetaComponent')
+
+    tag_ids = {}
+    for tag_id, name in Tag.objects.order_by('version', '-id').values_list('id', 'name'):
+        tag_ids[name] = tag_id  # V2 over V1, lowest id wins
+    names = set(tag_ids)
+    names.update(SiteMetaComponent.objects.values_list('component_name', flat=True).distinct().order_by())
+    ComponentName.objects.bulk_create(
+        [ComponentName(name=name, tag_id=tag_ids.get(name)) for name in sorted(names)],
+        batch_size=1000,
+    )
+    component_ids = dict(ComponentName.objects.values_list('name', 'id'))
+
+    for site_id in SiteListDetails.objects.values_list('id', flat=True).order_by('id').iterator():
+        ids_by_page = defaultdict(set)
+        rows = SiteMetaComponent.objects.filter(site_list_details_id=site_id).values_list(
+            'site_meta_details_id', 'component_name',
+        )
+        for page_id, name in rows:
+            ids_by_page[page_id].add(component_ids[name])
+        pages = [
+            SiteMetaDetails(id=page_id, component_bits=pack_bits(ids))
+            for page_id, ids in ids_by_page.items()
+        ]
+        SiteMetaDetails.objects.bulk_update(pages, ['component_bits'], batch_size=500)
+        site_ids = set().union(*ids_by_page.values())
+        SiteListDetails.objects.filter(id=site_id).update(component_bits=pack_bits(site_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0014_sitemetadetails_unique_site_page_url'),
+        ('tag_manager_component', '0020_alter_tagsextractor_extraction_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitelistdetails',
+            name='component_bits',
+            field=models.BinaryField(blank=True, help_text='Bitset of the ComponentName ids used on any page of the site', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitemetadetails',
+            name='component_bits',
+            field=models.BinaryField(blank=True, help_text='Bitset of the ComponentName ids used on the page', null=True),
+        ),
+        migrations.CreateModel(
+            name='ComponentName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tag', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='component_names', to='tag_manager_component.tag')),
+            ],
+        ),
+        migrations.RunPython(build_component_bits, migrations.RunPython.noop),
+    ]
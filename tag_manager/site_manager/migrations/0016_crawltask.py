@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0015_component_vocabulary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(choices=[('site', 'Site'), ('page', 'Page')], max_length=10)),
+                ('page_url', models.URLField(blank=True, default='', max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('leased', 'Leased'), ('waiting', 'Waiting for page tasks'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='The task is not handed out before this time')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=200)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='crawl_tasks', to='site_manager.batchjob')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='page_tasks', to='site_manager.crawltask')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_tasks', to='site_manager.sitelistdetails')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='site_manage_status_edfb79_idx'), models.Index(fields=['status', 'lease_expires_at'], name='site_manage_status_80c221_idx'), models.Index(fields=['parent', 'status'], name='site_manage_parent__1793c1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_manager', '0016_crawltask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitemetadetails',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, help_text='Last analysis run that listed the page; older pages are stale', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sitemetadetails',
+            index=models.Index(fields=['site_list_details', 'analyzed_at'], name='site_manage_site_li_a51415_idx'),
+        ),
+    ]
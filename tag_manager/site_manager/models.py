@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
@@ -27,6 +28,8 @@ class SiteListDetails(models.Model):
     v2_compatible_count = models.IntegerField(default=0)
     v2_non_compatible_count = models.IntegerField(default=0)
     custom_component = models.TextField(blank=True, null=True)
+    component_bits = models.BinaryField(blank=True, null=True, editable=False,
+                                        help_text='Bitset of the ComponentName ids used on any page of the site')
     is_imported = models.BooleanField(default=False)
     last_analyzed = models.DateTimeField(blank=True, null=True, help_text='Date and time when the site was last analyzed')
     webbuilder_site_id = models.IntegerField(null=True, blank=True)
@@ -44,6 +47,229 @@ class SiteMetaDetails(models.Model):
     v2_non_compatible_count = models.IntegerField(default=0)
     custom_component = models.TextField(blank=True, null=True)
     custom_component_count = models.IntegerField(default=0)
+    component_bits = models.BinaryField(blank=True, null=True, editable=False,
+                                        help_text='Bitset of the ComponentName ids used on the page')
+    analyzed_at = models.DateTimeField(blank=True, null=True,
+                                       help_text='Last analysis run that listed the page; older pages are stale')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['site_list_details', 'site_url'], name='unique_site_page_url'),
+        ]
+        indexes = [
+            models.Index(fields=['site_list_details', 'analyzed_at']),
+        ]
 
     def __str__(self):
         return self.site_url
+
+
+
+class ComponentName(models.Model):
+    """
+    Shared component vocabulary: every helix or custom component name gets a small
+    integer id, which is its bit position in the page and site component bitsets.
+    Ids are never reused or renumbered, so stored bitsets stay valid across runs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    tag = models.ForeignKey('tag_manager_component.Tag', on_delete=models.SET_NULL, null=True, blank=True,
+                            related_name='component_names')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.name
+
+
+class SiteMetaComponent(models.Model):
+    """
+    One component found on one page, with how many times it occurs there.
+    Normalized copy of the comma-joined component fields on SiteMetaDetails so that
+    per-site sets, usage counts and "which pages use X" can be answered with indexed GROUP BY queries.
+    """
+    COMPONENT_TYPE_CHOICES = [
+        ('v1', 'Helix V1'),
+        ('v2_compatible', 'Helix V2 Compatible'),
+        ('v2_non_compatible', 'Helix V2 Non-Compatible'),
+        ('custom', 'Custom'),
+    ]
+
+    site_meta_details = models.ForeignKey(SiteMetaDetails, on_delete=models.CASCADE, related_name='components')
+    site_list_details = models.ForeignKey(SiteListDetails, on_delete=models.CASCADE, related_name='page_components')
+    component_type = models.CharField(max_length=20, choices=COMPONENT_TYPE_CHOICES)
+    component_name = models.CharField(max_length=255)
+    tag = models.ForeignKey('tag_manager_component.Tag', on_delete=models.SET_NULL, null=True, blank=True,
+                            related_name='page_components')
+    count = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['site_meta_details', 'component_type', 'component_name'],
+                name='unique_page_component',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['site_list_details', 'component_type', 'component_name']),
+            models.Index(fields=['component_type', 'component_name']),
+        ]
+
+    def __str__(self):
+        return f"{self.component_name} x{self.count} ({self.component_type})"
+
+class BatchJob(models.Model):
+    """
+    Progress record for a background run (batch or single-site sitemap analysis, or complexity update).
+    Counters are bumped with single UPDATE statements so progress writes stay O(1)
+    no matter how many sites the job has processed; per-site outcomes live in BatchJobItem.
+    """
+    JOB_TYPE_CHOICES = [
+        ('analysis', 'Sitemap Analysis'),
+        ('site_analysis', 'Single Site Analysis'),
+        ('complexity', 'Complexity Update'),
+    ]
+
+    STATUS_CHOICES = [
+        ('starting', 'Starting'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='starting')
+    total = models.IntegerField(default=0)
+    current = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    current_site = models.CharField(max_length=500, blank=True, default='')
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, related_name='batch_jobs')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job_type', '-started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} ({self.status})"
+
+    def update_fields(self, **fields):
+        """Write the given fields with a single UPDATE, without reloading the row."""
+        BatchJob.objects.filter(pk=self.pk).update(**fields)
+        for name, value in fields.items():
+            if not hasattr(value, 'resolve_expression'):
+                setattr(self, name, value)
+
+    def record_item(self, site, status, error='', old_complexity='', new_complexity='', advance=True):
+        """
+        Store one per-site outcome and bump the completed/failed counter.
+        `current` is advanced too unless `advance` is False (single-site jobs count pages instead).
+        """
+        BatchJobItem.objects.create(
+            job=self,
+            site=site,
+            site_url=site.website_url if site else '',
+            status=status,
+            error=error or '',
+            old_complexity=old_complexity or '',
+            new_complexity=new_complexity or '',
+        )
+        counter = 'failed_count' if status == 'failed' else 'completed_count'
+        fields = {counter: models.F(counter) + 1}
+        if advance:
+            fields['current'] = models.F('current') + 1
+        self.update_fields(**fields)
+
+    def record_items(self, items):
+        """
+        Store a batch of unsaved BatchJobItem outcomes with one INSERT and advance
+        `current` and the completed/failed counters with one UPDATE.
+        """
+        if not items:
+            return
+        for item in items:
+            item.job = self
+        BatchJobItem.objects.bulk_create(items)
+        failed = sum(1 for item in items if item.status == 'failed')
+        self.update_fields(
+            current=models.F('current') + len(items),
+            completed_count=models.F('completed_count') + len(items) - failed,
+            failed_count=models.F('failed_count') + failed,
+        )
+
+
+class BatchJobItem(models.Model):
+    STATUS_CHOICES = [
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.ForeignKey(BatchJob, on_delete=models.CASCADE, related_name='items')
+    site = models.ForeignKey(SiteListDetails, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='batch_job_items')
+    site_url = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True, default='')
+    old_complexity = models.CharField(max_length=10, blank=True, default='')
+    new_complexity = models.CharField(max_length=10, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.site_url} ({self.status})"
+
+
+class CrawlTask(models.Model):
+    """
+    One unit of work in the database-backed crawl queue processed by `manage.py crawl_worker`.
+
+    A worker leases a task for a visibility timeout; if the worker dies the lease
+    expires and another worker picks the task up. Failed attempts are retried with
+    backoff until max_attempts is reached. Site tasks of large sites are split into
+    page tasks and stay 'waiting' until their pages are done.
+    """
+    TASK_TYPE_CHOICES = [
+        ('site', 'Site'),
+        ('page', 'Page'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('leased', 'Leased'),
+        ('waiting', 'Waiting for page tasks'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    task_type = models.CharField(max_length=10, choices=TASK_TYPE_CHOICES)
+    site = models.ForeignKey(SiteListDetails, on_delete=models.CASCADE, related_name='crawl_tasks')
+    page_url = models.URLField(max_length=500, blank=True, default='')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='page_tasks')
+    job = models.ForeignKey(BatchJob, on_delete=models.CASCADE, null=True, blank=True, related_name='crawl_tasks')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now, help_text='The task is not handed out before this time')
+    lease_owner = models.CharField(max_length=200, blank=True, default='')
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+            models.Index(fields=['parent', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.task_type} task #{self.pk} for {self.page_url or self.site.website_url} ({self.status})"
@@ -0,0 +1,370 @@
+import heapq
+import json
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import ComponentName, SiteListDetails, SiteMetaComponent, SiteMetaDetails
+from tag_manager_component.models import Tag
+
+# SiteMetaDetails field holding the comma-joined names for each component type
+COMPONENT_FIELDS = {
+    'v1': 'helix_v1_component',
+    'v2_compatible': 'helix_v2_compatible_component',
+    'v2_non_compatible': 'helix_v2_non_compatible_component',
+    'custom': 'custom_component',
+}
+
+# Tag version a component type is linked to (custom components have no Tag)
+TAG_VERSION_BY_TYPE = {
+    'v1': 'V1',
+    'v2_compatible': 'V2',
+    'v2_non_compatible': 'V1',
+}
+
+# Component types that count towards Tag/TagMapper usage
+HELIX_COMPONENT_TYPES = ['v1', 'v2_compatible', 'v2_non_compatible']
+
+
+def split_components(value):
+    """Split a comma-joined component string into a list of stripped, non-empty names."""
+    if not value:
+        return []
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def load_tag_ids():
+    """
+    Load {(version, name): tag_id} for all tags in a single query.
+    When a name exists under several theme types the lowest id wins.
+    """
+    tag_ids = {}
+    for tag_id, name, version in Tag.objects.order_by('-id').values_list('id', 'name', 'version'):
+        tag_ids[(version, name)] = tag_id
+    return tag_ids
+
+
+def build_component_rows(meta, components_by_type, tag_ids):
+    """
+    Build unsaved SiteMetaComponent rows for a saved SiteMetaDetails.
+
+    components_by_type: {component_type: iterable of names}; repeated names are counted.
+    """
+    rows = []
+    for component_type, names in components_by_type.items():
+        version = TAG_VERSION_BY_TYPE.get(component_type)
+        for name, count in Counter(n for n in names if n).items():
+            rows.append(SiteMetaComponent(
+                site_meta_details_id=meta.pk,
+                site_list_details_id=meta.site_list_details_id,
+                component_type=component_type,
+                component_name=name,
+                tag_id=tag_ids.get((version, name)) if version else None,
+                count=count,
+            ))
+    return rows
+
+
+def sync_page_components(meta, tag_ids=None):
+    """
+    Rebuild the component rows and bitset of one page from its comma-joined fields
+    (e.g. after a manual edit).
+    """
+    if tag_ids is None:
+        tag_ids = load_tag_ids()
+    components_by_type = {
+        component_type: split_components(getattr(meta, field))
+        for component_type, field in COMPONENT_FIELDS.items()
+    }
+    SiteMetaComponent.objects.filter(site_meta_details=meta).delete()
+    SiteMetaComponent.objects.bulk_create(build_component_rows(meta, components_by_type, tag_ids))
+    meta.component_bits = ComponentVocabulary(tag_ids).page_bits(components_by_type)
+    SiteMetaDetails.objects.filter(pk=meta.pk).update(component_bits=meta.component_bits)
+
+
+def ids_to_bits(ids):
+    """Return the int bitset with the bit of every component id set."""
+    bits = 0
+    for component_id in ids:
+        bits |= 1 << component_id
+    return bits
+
+
+def pack_bits(bits):
+    """Pack an int bitset into the little-endian bytes stored in the component_bits fields."""
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def unpack_bits(data):
+    """Inverse of pack_bits; a NULL field is the empty set."""
+    return int.from_bytes(bytes(data), 'little') if data else 0
+
+
+def bits_to_ids(bits):
+    """Return the component ids set in an int bitset, in ascending order."""
+    ids = []
+    while bits:
+        lowest = bits & -bits
+        ids.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return ids
+
+
+class ComponentVocabulary:
+    """
+    In-memory {name: id} view of ComponentName, loaded with one query and
+    extended (one insert and one select) the first time a new name is seen.
+    """
+
+    def __init__(self, tag_ids=None):
+        self.tag_ids = tag_ids if tag_ids is not None else load_tag_ids()
+        self.ids = dict(ComponentName.objects.values_list('name', 'id'))
+        self._names = None
+
+    def _tag_id(self, name):
+        return self.tag_ids.get(('V2', name)) or self.tag_ids.get(('V1', name))
+
+    def ids_for(self, names):
+        """Return the ids of `names`, registering the names that aren't in the vocabulary yet."""
+        names = {name for name in names if name}
+        missing = [name for name in names if name not in self.ids]
+        if missing:
+            # ignore_conflicts covers names registered by a concurrent analysis
+            ComponentName.objects.bulk_create(
+                [ComponentName(name=name, tag_id=self._tag_id(name)) for name in missing],
+                ignore_conflicts=True,
+            )
+            self.ids.update(ComponentName.objects.filter(name__in=missing).values_list('name', 'id'))
+            self._names = None
+        return [self.ids[name] for name in names]
+
+    def page_bits(self, components_by_type):
+        """Packed bitset of every component name in {component_type: names}."""
+        return pack_bits(ids_to_bits(self.ids_for(chain.from_iterable(components_by_type.values()))))
+
+    def names(self, bits):
+        """Sorted component names of an int bitset."""
+        if self._names is None:
+            self._names = {component_id: name for name, component_id in self.ids.items()}
+        return sorted(self._names[component_id] for component_id in bits_to_ids(bits) if component_id in self._names)
+
+
+def get_component_page_frequency(site):
+    """
+    Return {component_name: number of the site's pages using it}.
+    The page bitsets are unpacked into one (pages x bits) array and summed per column.
+    """
+    page_bits = [
+        bytes(data) for data in
+        SiteMetaDetails.objects.filter(site_list_details=site).exclude(component_bits=None)
+        .values_list('component_bits', flat=True).order_by()
+    ]
+    width = max((len(data) for data in page_bits), default=0)
+    if not width:
+        return {}
+    matrix = np.zeros((len(page_bits), width), dtype=np.uint8)
+    for row, data in enumerate(page_bits):
+        matrix[row, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+    page_counts = np.unpackbits(matrix, axis=1, bitorder='little').sum(axis=0)
+    names = dict(ComponentName.objects.filter(id__in=np.flatnonzero(page_counts).tolist()).values_list('id', 'name'))
+    return {names[component_id]: int(page_counts[component_id]) for component_id in names}
+
+
+def get_overlapping_sites(site, limit=20):
+    """
+    Return the `limit` sites sharing the most components with `site`, as dicts with
+    the number of shared components and the Jaccard similarity of the two sets.
+    """
+    bits = unpack_bits(site.component_bits)
+    if not bits:
+        return []
+    others = (
+        SiteListDetails.objects.exclude(pk=site.pk).exclude(component_bits=None)
+        .values_list('id', 'website_url', 'component_bits').order_by()
+    )
+    overlaps = []
+    for other_id, website_url, data in others.iterator():
+        other_bits = unpack_bits(data)
+        shared = (bits & other_bits).bit_count()
+        if shared:
+            overlaps.append({
+                'id': other_id,
+                'website_url': website_url,
+                'shared_components': shared,
+                'jaccard': round(shared / (bits | other_bits).bit_count(), 4),
+            })
+    return heapq.nlargest(limit, overlaps, key=lambda o: (o['shared_components'], o['jaccard']))
+
+
+def get_site_component_sets(site):
+    """
+    Return {component_type: sorted list of unique names} for a site using one GROUP BY query.
+    """
+    component_sets = {component_type: [] for component_type in COMPONENT_FIELDS}
+    rows = (
+        SiteMetaComponent.objects
+        .filter(site_list_details=site)
+        .values_list('component_type', 'component_name')
+        .distinct()
+        .order_by('component_type', 'component_name')
+    )
+    for component_type, name in rows:
+        component_sets[component_type].append(name)
+    return component_sets
+
+
+def get_component_site_counts(component_types=HELIX_COMPONENT_TYPES):
+    """Return {component_name: number of distinct sites using it}."""
+    rows = (
+        SiteMetaComponent.objects
+        .filter(component_type__in=component_types)
+        .values('component_name')
+        .annotate(site_count=Count('site_list_details', distinct=True))
+        .order_by()
+    )
+    return {row['component_name']: row['site_count'] for row in rows}
+
+
+def pages_using_component(component_name, site=None, component_type=None):
+    """Return the SiteMetaDetails pages that contain `component_name`."""
+    filters = {'component_name': component_name}
+    if site is not None:
+        filters['site_list_details'] = site
+    if component_type:
+        filters['component_type'] = component_type
+    page_ids = SiteMetaComponent.objects.filter(**filters).values('site_meta_details_id')
+    return SiteMetaDetails.objects.filter(pk__in=page_ids)
+
+
+def sites_with_duplicate_pages():
+    """Return ids of sites that have more than one SiteMetaDetails row for the same page URL."""
+    return list(
+        SiteMetaDetails.objects
+        .values('site_list_details_id', 'site_url')
+        .annotate(page_count=Count('id'))
+        .filter(page_count__gt=1)
+        .values_list('site_list_details_id', flat=True)
+        .distinct()
+        .order_by()
+    )
+
+
+def delete_duplicate_pages(site, batch_size=1000):
+    """
+    Keep only the most recent row (highest id) per page URL of a site and delete the rest,
+    together with their component rows. Returns the number of pages deleted.
+    """
+    latest_ids = {}
+    stale_ids = []
+    pages = SiteMetaDetails.objects.filter(site_list_details=site).order_by('id')
+    for page_id, site_url in pages.values_list('id', 'site_url'):
+        if site_url in latest_ids:
+            stale_ids.append(latest_ids[site_url])
+        latest_ids[site_url] = page_id
+    for start in range(0, len(stale_ids), batch_size):
+        SiteMetaDetails.objects.filter(id__in=stale_ids[start:start + batch_size]).delete()
+    return len(stale_ids)
+
+
+def delete_stale_pages(site, analyzed_before, keep_urls=(), batch_size=1000):
+    """
+    Delete the pages of a site that weren't analyzed since `analyzed_before`, i.e. pages
+    an analysis run no longer listed, together with their component rows. The pages of
+    `keep_urls` (listed, but not fetched this time) are marked analyzed first and kept.
+    Returns the number of pages deleted.
+    """
+    keep_urls = list(keep_urls)
+    for start in range(0, len(keep_urls), batch_size):
+        SiteMetaDetails.objects.filter(
+            site_list_details=site, site_url__in=keep_urls[start:start + batch_size],
+        ).update(analyzed_at=timezone.now())
+    stale = SiteMetaDetails.objects.filter(site_list_details=site).filter(
+        Q(analyzed_at__lt=analyzed_before) | Q(analyzed_at=None)
+    )
+    _, deleted = stale.delete()
+    return deleted.get(SiteMetaDetails._meta.label, 0)
+
+
+class SiteAggregate:
+    """
+    Running component bitsets (one per component type) and counters for one site,
+    updated page by page as results arrive so the site totals never have to be
+    re-read from its pages. Pages that were not re-analyzed are folded in once with
+    add_stored_pages(). Names are only resolved from the bitsets by names().
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else ComponentVocabulary()
+        self.type_bits = {component_type: 0 for component_type in COMPONENT_FIELDS}
+        self.total_pages = 0
+        self.v2_compatible_count = 0
+        self.v2_non_compatible_count = 0
+        self.custom_component_count = 0
+
+    @property
+    def component_bits(self):
+        """Bitset of every component on the site, whatever its type."""
+        bits = 0
+        for type_bits in self.type_bits.values():
+            bits |= type_bits
+        return bits
+
+    def names(self, component_type):
+        """Sorted names of the site's components of one type."""
+        return self.vocabulary.names(self.type_bits[component_type])
+
+    def add_components(self, component_type, names):
+        self.type_bits[component_type] |= ids_to_bits(self.vocabulary.ids_for(names))
+
+    def add_stored_pages(self, site, site_urls=None):
+        """
+        Fold in the pages already stored for the site, or only those of `site_urls`
+        (typically pages this run couldn't fetch, which keep their previous results).
+        """
+        pages = SiteMetaDetails.objects.filter(site_list_details=site)
+        if site_urls is not None:
+            pages = pages.filter(site_url__in=list(site_urls))
+        totals = pages.aggregate(
+            total_pages=Count('id'),
+            v2_compatible_count=Sum('v2_compatible_count'),
+            v2_non_compatible_count=Sum('v2_non_compatible_count'),
+            custom_component_count=Sum('custom_component_count'),
+        )
+        self.total_pages += totals['total_pages'] or 0
+        self.v2_compatible_count += totals['v2_compatible_count'] or 0
+        self.v2_non_compatible_count += totals['v2_non_compatible_count'] or 0
+        self.custom_component_count += totals['custom_component_count'] or 0
+        rows = (
+            SiteMetaComponent.objects
+            .filter(site_meta_details__in=pages)
+            .values_list('component_type', 'component_name')
+            .distinct()
+            .order_by()
+        )
+        names_by_type = {component_type: [] for component_type in COMPONENT_FIELDS}
+        for component_type, name in rows:
+            names_by_type[component_type].append(name)
+        for component_type, names in names_by_type.items():
+            self.add_components(component_type, names)
+
+    def add_page(self, meta, components_by_type):
+        """Fold one analyzed page into the running totals."""
+        for component_type, names in components_by_type.items():
+            self.add_components(component_type, names)
+        self.total_pages += 1
+        self.v2_compatible_count += meta.v2_compatible_count
+        self.v2_non_compatible_count += meta.v2_non_compatible_count
+        self.custom_component_count += meta.custom_component_count
+
+    def apply_to(self, site):
+        """Copy the totals onto the site's aggregate fields (the caller saves the site)."""
+        for component_type in HELIX_COMPONENT_TYPES:
+            setattr(site, COMPONENT_FIELDS[component_type], json.dumps(self.names(component_type)))
+        site.total_pages = self.total_pages
+        site.v2_compatible_count = self.v2_compatible_count
+        site.v2_non_compatible_count = self.v2_non_compatible_count
+        site.custom_component = self.custom_component_count
+        site.component_bits = pack_bits(self.component_bits)
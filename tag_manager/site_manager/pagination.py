@@ -0,0 +1,53 @@
+from django.core.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset plus the cursors to reach its neighbours."""
+
+    def __init__(self, items, key, has_next, has_previous):
+        self.items = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = getattr(items[-1], key) if items and has_next else None
+        self.previous_cursor = getattr(items[0], key) if items and has_previous else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def parse_cursor(queryset, key, value):
+    """Convert a cursor from the query string to the key field's type, or None when missing/invalid."""
+    if value in (None, ''):
+        return None
+    try:
+        return queryset.model._meta.get_field(key).to_python(value)
+    except ValidationError:
+        return None
+
+
+def keyset_paginate(queryset, key, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return a KeysetPage of `queryset` ordered by the unique field `key`.
+
+    Rows are fetched with an indexed `key > after` (or `key < before`) range and a
+    LIMIT of page_size + 1, so the cost of a page doesn't grow with its position
+    the way OFFSET pagination does.
+    """
+    after = parse_cursor(queryset, key, after)
+    before = parse_cursor(queryset, key, before)
+
+    if before is not None:
+        rows = list(queryset.filter(**{f'{key}__lt': before}).order_by(f'-{key}')[:page_size + 1])
+        has_previous = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(items, key, has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        queryset = queryset.filter(**{f'{key}__gt': after})
+    rows = list(queryset.order_by(key)[:page_size + 1])
+    return KeysetPage(rows[:page_size], key, has_next=len(rows) > page_size, has_previous=after is not None)
@@ -0,0 +1,127 @@
+import csv
+import io
+from urllib.parse import urlsplit, urlunsplit
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+
+from .models import SiteListDetails
+
+IMPORT_BATCH_SIZE = 1000
+
+WEBSITE_URL_MAX_LENGTH = SiteListDetails._meta.get_field('website_url').max_length
+
+url_validator = URLValidator(schemes=['http', 'https'])
+
+
+class InvalidCSVHeader(Exception):
+    pass
+
+
+class ImportResult:
+    """Counts reported back after a website import."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.existing = 0
+        self.invalid = 0
+        self.invalid_examples = []
+
+
+def with_scheme(value):
+    """The stripped URL with https:// added when it has no scheme, the form older imports stored verbatim."""
+    url = value.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def canonicalize_website_url(value):
+    """
+    Return the canonical form of a website URL from the CSV, or None if it isn't a valid URL.
+    A missing scheme defaults to https; scheme and host are lower-cased and any
+    trailing slash on the path and the fragment are dropped. The query string is kept.
+    """
+    parts = urlsplit(with_scheme(value))
+    url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
+    if len(url) > WEBSITE_URL_MAX_LENGTH:
+        return None
+    try:
+        url_validator(url)
+    except ValidationError:
+        return None
+    return url
+
+
+def stored_url_forms(url, original):
+    """
+    The forms a site of canonical `url` may be stored under: the canonical URL, the same
+    URL with a trailing slash on its path, and the `original` CSV value as older imports
+    stored it.
+    """
+    parts = urlsplit(url)
+    slashed = urlunsplit((parts.scheme, parts.netloc, parts.path + '/', parts.query, ''))
+    return {url, slashed, with_scheme(original)}
+
+
+def read_website_urls(uploaded_file, result):
+    """
+    Stream the rows of an uploaded website CSV and yield (canonical URL, original value).
+    Blank and comment rows are skipped; invalid URLs are counted on `result`.
+    Raises InvalidCSVHeader if the first row isn't the 'website_url' header.
+    """
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header or header[0].strip().lower() != 'website_url':
+        raise InvalidCSVHeader()
+    for row in reader:
+        if not row or not row[0].strip() or row[0].strip().startswith('#'):
+            continue  # Skip empty or comment lines
+        url = canonicalize_website_url(row[0])
+        if url is None:
+            result.invalid += 1
+            if len(result.invalid_examples) < 5:
+                result.invalid_examples.append(row[0].strip())
+            continue
+        yield url, row[0]
+
+
+def import_websites(uploaded_file):
+    """
+    Import the websites listed in an uploaded CSV file with a handful of queries:
+    URLs are de-duplicated in memory, checked against existing sites in chunks
+    (under every form a site may be stored as, see stored_url_forms) and inserted
+    with batched bulk_create.
+    """
+    result = ImportResult()
+    forms_by_url = {}
+    for url, original in read_website_urls(uploaded_file, result):
+        if url in forms_by_url:
+            result.duplicates += 1
+            forms_by_url[url] |= stored_url_forms(url, original)
+        else:
+            forms_by_url[url] = stored_url_forms(url, original)
+
+    url_by_form = {form: url for url, forms in forms_by_url.items() for form in forms}
+    lookup = sorted(url_by_form)
+    existing = set()
+    for start in range(0, len(lookup), IMPORT_BATCH_SIZE):
+        chunk = lookup[start:start + IMPORT_BATCH_SIZE]
+        for stored in SiteListDetails.objects.filter(website_url__in=chunk).values_list('website_url', flat=True):
+            existing.add(url_by_form[stored])
+    result.existing = len(existing)
+
+    new_urls = sorted(url for url in forms_by_url if url not in existing)
+    for start in range(0, len(new_urls), IMPORT_BATCH_SIZE):
+        chunk = new_urls[start:start + IMPORT_BATCH_SIZE]
+        # ignore_conflicts skips sites added by someone else since the lookup above;
+        # counting the chunk's rows around the insert reports only the rows actually inserted
+        present = SiteListDetails.objects.filter(website_url__in=chunk)
+        before = present.count()
+        SiteListDetails.objects.bulk_create([SiteListDetails(website_url=url) for url in chunk],
+                                            ignore_conflicts=True)
+        result.inserted += present.count() - before
+        result.existing += before
+    return result
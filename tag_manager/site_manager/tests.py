@@ -1,3 +1,251 @@
-from django.test import TestCase
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from tag_manager_component.models import Tag
+
+from . import crawl_queue
+from .html_parsers import CUSTOM_BLOCK_CLASS, InventoryScanner, LxmlParser, SoupParser
+from .link_crawler import SeenURLs, extract_links
+from .models import ComponentName, CrawlTask, SiteListDetails, SiteMetaDetails
+from .page_components import (
+    ComponentVocabulary, SiteAggregate, bits_to_ids, get_component_page_frequency, get_overlapping_sites, ids_to_bits,
+    pack_bits, unpack_bits,
+)
+from .site_import import canonicalize_website_url, import_websites
+from .views import analyze_site
+
+PARSER_CORPUS_DIR = Path(__file__).resolve().parent / 'testdata' / 'parser_corpus'
+
+
+class ParserBackendParityTests(SimpleTestCase):
+    """The lxml and inventory backends must report exactly what the html.parser backend reports."""
+
+    def extract(self, parser, content):
+        document = parser.parse(content)
+        page_source = content.decode('utf-8')
+        return (
+            parser.find_custom_class_elements(document, CUSTOM_BLOCK_CLASS),
+            sorted(parser.find_helix_elements(document, page_source)),
+        )
+
+    def test_corpus_parity(self):
+        pages = sorted(PARSER_CORPUS_DIR.glob('*.html'))
+        self.assertTrue(pages)
+        for page in pages:
+            with self.subTest(page=page.name):
+                content = page.read_bytes()
+                expected = self.extract(SoupParser(), content)
+                self.assertEqual(self.extract(LxmlParser(), content), expected)
+                self.assertEqual(self.extract(InventoryScanner(), content), expected)
+
+    def test_empty_document(self):
+        expected = self.extract(SoupParser(), b'')
+        self.assertEqual(self.extract(LxmlParser(), b''), expected)
+        self.assertEqual(self.extract(InventoryScanner(), b''), expected)
+
+    def test_inventory_rescans_for_another_class_filter(self):
+        content = b'<div class="custom-block-element"></div><section class="other-block"></section>'
+        scanner = InventoryScanner()
+        inventory = scanner.parse(content)
+        self.assertEqual(scanner.find_custom_class_elements(inventory), ['div'])
+        self.assertEqual(scanner.find_custom_class_elements(inventory, 'other-block'), ['section'])
+
+
+class LinkCrawlerTests(SimpleTestCase):
+
+    def test_extract_links(self):
+        content = (
+            b'<a href="/about">About</a><A class="x" HREF=\'blog/#top\'>Blog</a><a href=/p?a=1&amp;b=2>P</a>'
+            b'<a href="mailto:x@example.com">Mail</a><a href="/logo.PNG">Logo</a><link href="/style.css">'
+        )
+        self.assertEqual(list(extract_links(content, 'https://Example.com/news/')), [
+            'https://example.com/about', 'https://example.com/news/blog/', 'https://example.com/p?a=1&b=2',
+        ])
+
+    def test_seen_urls_remember_urls_evicted_from_the_recent_set(self):
+        seen = SeenURLs(capacity=1000, recent=2)
+        self.assertEqual([seen.add(url) for url in ['a', 'b', 'c', 'a', 'c']], [True, True, True, False, False])
+
+
+class CrawlQueueTests(TestCase):
+
+    def setUp(self):
+        self.site = SiteListDetails.objects.create(website_url='https://example.com')
+        crawl_queue.enqueue_site_tasks([self.site])
+        self.site_task = crawl_queue.claim_tasks('worker-a')[0]
+
+    def test_page_tasks_finished_during_the_split_close_the_site_task(self):
+        """Another worker claiming and finishing every page task right after the insert still finds the site task waiting."""
+        closed = []
+        bulk_create = CrawlTask.objects.bulk_create
+
+        def bulk_create_then_finish_pages(tasks, **kwargs):
+            created = bulk_create(tasks, **kwargs)
+            for page_task in crawl_queue.claim_tasks('worker-b', limit=len(tasks)):
+                crawl_queue.complete_task(page_task, 'worker-b')
+            closed.append(crawl_queue.close_waiting_site_task(self.site_task))
+            return created
+
+        with mock.patch.object(CrawlTask.objects, 'bulk_create', bulk_create_then_finish_pages):
+            count = crawl_queue.enqueue_page_tasks(self.site_task, ['https://example.com/a', 'https://example.com/b'],
+                                                   'worker-a')
+        self.assertEqual(count, 2)
+        self.assertEqual(closed, [True])
+        self.site_task.refresh_from_db()
+        self.assertEqual(self.site_task.status, 'completed')
+
+    def test_split_after_losing_the_lease_queues_nothing(self):
+        CrawlTask.objects.filter(pk=self.site_task.pk).update(lease_expires_at=timezone.now())
+        self.assertEqual([task.pk for task in crawl_queue.claim_tasks('worker-b')], [self.site_task.pk])
+
+        self.assertEqual(crawl_queue.enqueue_page_tasks(self.site_task, ['https://example.com/a'], 'worker-a'), 0)
+        self.assertFalse(CrawlTask.objects.filter(parent=self.site_task).exists())
+        self.site_task.refresh_from_db()
+        self.assertEqual((self.site_task.status, self.site_task.lease_owner), ('leased', 'worker-b'))
+
+
+class ComponentBitsTests(TestCase):
+
+    def setUp(self):
+        self.vocabulary = ComponentVocabulary(tag_ids={})
+
+    def add_site(self, url, *pages):
+        """A site with one page per list of component names, and the union bitset on the site."""
+        site = SiteListDetails.objects.create(website_url=url)
+        site_bits = 0
+        for number, names in enumerate(pages):
+            bits = ids_to_bits(self.vocabulary.ids_for(names))
+            SiteMetaDetails.objects.create(site_list_details=site, site_url=f'{url}/{number}',
+                                           component_bits=pack_bits(bits))
+            site_bits |= bits
+        site.component_bits = pack_bits(site_bits)
+        site.save()
+        return site
+
+    def test_pack_and_unpack(self):
+        for ids in ([], [0], [3, 7, 8], [1, 64, 1000]):
+            bits = ids_to_bits(ids)
+            self.assertEqual(bits_to_ids(unpack_bits(pack_bits(bits))), ids)
+        self.assertEqual(pack_bits(0), b'')
+        self.assertEqual(unpack_bits(None), 0)
+        self.assertEqual(unpack_bits(memoryview(b'\x05')), 0b101)
+
+    def test_ids_for_registers_new_names_once(self):
+        user = get_user_model().objects.create(username='u', email='u@u.com')
+        tag = Tag.objects.create(name='helix-button', path='p', details='d', version='V2', created_by=user,
+                                 updated_by=user, complexity='simple', is_managed_by='automated')
+        vocabulary = ComponentVocabulary(tag_ids={('V2', 'helix-button'): tag.id})
+        ids = vocabulary.ids_for(['helix-button', 'custom-card', '', 'helix-button'])
+        self.assertEqual(len(set(ids)), 2)
+        self.assertEqual(ComponentName.objects.count(), 2)
+        self.assertEqual(ComponentName.objects.get(name='helix-button').tag_id, tag.id)
+        self.assertIsNone(ComponentName.objects.get(name='custom-card').tag_id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(vocabulary.ids_for(['custom-card', 'helix-button'])), sorted(ids))
+        self.assertEqual(ComponentVocabulary(tag_ids={}).names(ids_to_bits(ids)), ['custom-card', 'helix-button'])
+
+    def test_overlapping_sites(self):
+        site = self.add_site('https://a.com', ['x', 'y', 'z'])
+        close = self.add_site('https://b.com', ['x', 'y'])
+        distant = self.add_site('https://c.com', ['z', 'w', 'v', 'u'])
+        self.add_site('https://d.com', ['t'])
+        overlaps = get_overlapping_sites(site)
+        self.assertEqual([(o['id'], o['shared_components'], o['jaccard']) for o in overlaps], [
+            (close.id, 2, round(2 / 3, 4)),
+            (distant.id, 1, round(1 / 6, 4)),
+        ])
+
+    def test_component_page_frequency(self):
+        site = self.add_site('https://a.com', ['x', 'y'], ['x'], ['x', 'z'], [])
+        self.add_site('https://b.com', ['y'])
+        self.assertEqual(get_component_page_frequency(site), {'x': 3, 'y': 1, 'z': 1})
+
+    def test_site_aggregate_keeps_one_bitset_per_type(self):
+        aggregate = SiteAggregate(self.vocabulary)
+        for components_by_type in (
+            {'v1': ['helix-a'], 'v2_compatible': ['helix-a2'], 'v2_non_compatible': [], 'custom': ['card']},
+            {'v1': ['helix-b', 'helix-a'], 'v2_compatible': [], 'v2_non_compatible': ['helix-b'], 'custom': []},
+        ):
+            aggregate.add_page(SiteMetaDetails(), components_by_type)
+        self.assertEqual(aggregate.names('v1'), ['helix-a', 'helix-b'])
+        self.assertEqual(aggregate.names('v2_non_compatible'), ['helix-b'])
+        self.assertEqual(self.vocabulary.names(aggregate.component_bits), ['card', 'helix-a', 'helix-a2', 'helix-b'])
+        self.assertEqual(aggregate.total_pages, 2)
+
+
+class SiteReanalysisTests(TestCase):
+    """Re-analysis keeps only the pages its run listed, plus listed pages it couldn't fetch."""
+
+    PAGES = {
+        'https://example.com/a': '<helix-button></helix-button>',
+        'https://example.com/b': '<helix-card></helix-card>',
+        'https://example.com/c': '<helix-modal></helix-modal>',
+    }
+
+    def setUp(self):
+        self.site = SiteListDetails.objects.create(website_url='https://example.com')
+        self.unreachable = set()
+
+    def fetch_page(self, url, parser):
+        if url in self.unreachable:
+            return None, None, 'Request timed out'
+        source = f'<html><body>{self.PAGES[url]}</body></html>'
+        return parser.parse(source.encode()), source, None
+
+    def analyze(self, urls):
+        with mock.patch('site_manager.views.fetch_page', self.fetch_page):
+            analyze_site(self.site, urls, {})
+        self.site.refresh_from_db()
+
+    def test_pages_dropped_from_the_sitemap_are_deleted(self):
+        self.analyze(list(self.PAGES))
+        self.assertEqual(self.site.total_pages, 3)
+
+        self.unreachable = {'https://example.com/b'}
+        self.analyze(['https://example.com/a', 'https://example.com/b'])
+        self.assertEqual(self.site.total_pages, 2)
+        self.assertEqual(self.site.helix_v1_component, '["helix-button", "helix-card"]')
+        self.assertEqual(
+            sorted(SiteMetaDetails.objects.filter(site_list_details=self.site).values_list('site_url', flat=True)),
+            ['https://example.com/a', 'https://example.com/b'],
+        )
+
+
+class ImportWebsitesTests(TestCase):
+
+    def import_csv(self, *urls):
+        return import_websites(SimpleUploadedFile('sites.csv', '\n'.join(['website_url', *urls]).encode()))
+
+    def test_canonicalize_website_url(self):
+        self.assertEqual(canonicalize_website_url(' Example.COM/shop/ '), 'https://example.com/shop')
+        self.assertEqual(canonicalize_website_url('http://example.com/?lang=de#top'), 'http://example.com?lang=de')
+        self.assertIsNone(canonicalize_website_url('not a url'))
+
+    def test_sites_stored_by_older_imports_are_not_duplicated(self):
+        SiteListDetails.objects.create(website_url='https://example.com/')
+        SiteListDetails.objects.create(website_url='https://Shop.example.com')
+        result = self.import_csv('example.com', 'https://Shop.example.com', 'https://example.com?lang=de',
+                                 'example.com/')
+        self.assertEqual((result.inserted, result.existing, result.duplicates), (1, 2, 1))
+        self.assertTrue(SiteListDetails.objects.filter(website_url='https://example.com?lang=de').exists())
+        self.assertEqual(SiteListDetails.objects.count(), 3)
+
+    def test_inserted_count_leaves_out_sites_added_after_the_lookup(self):
+        bulk_create = SiteListDetails.objects.bulk_create
+
+        def bulk_create_while_another_import_adds_b(sites, **kwargs):
+            created = bulk_create(sites, **kwargs)
+            SiteListDetails.objects.get_or_create(website_url='https://b.example.com')
+            return created
+
+        with mock.patch('site_manager.site_import.IMPORT_BATCH_SIZE', 1), \
+                mock.patch.object(SiteListDetails.objects, 'bulk_create', bulk_create_while_another_import_adds_b):
+            result = self.import_csv('a.example.com', 'b.example.com')
+        self.assertEqual((result.inserted, result.existing), (1, 1))
+        self.assertEqual(SiteListDetails.objects.count(), 2)
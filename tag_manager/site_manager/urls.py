@@ -8,8 +8,11 @@ urlpatterns = [
     path('<int:pk>/delete/', views.site_delete, name='site_delete'),
     path('<int:site_id>/meta/', views.site_meta_list, name='site_meta_list'),
     path('<int:site_id>/meta/create/', views.site_meta_create, name='site_meta_create'),
+    path('<int:site_id>/meta/<int:pk>/components/', views.site_meta_components, name='site_meta_components'),
     path('<int:site_id>/meta/<int:pk>/edit/', views.site_meta_edit, name='site_meta_edit'),
     path('<int:site_id>/meta/<int:pk>/delete/', views.site_meta_delete, name='site_meta_delete'),
+    path('<int:site_id>/overlap/', views.site_component_overlap, name='site_component_overlap'),
+    path('<int:site_id>/component-frequency/', views.site_component_frequency, name='site_component_frequency'),
     path('<int:site_id>/analyze/', views.analyze_sitemap, name='analyze_sitemap'),
     path('import-websites-csv/', views.import_websites_csv, name='import_websites_csv'),
     path('batch-analyze-sitemaps/', views.batch_analyze_sitemaps, name='batch_analyze_sitemaps'),
@@ -18,6 +21,8 @@ urlpatterns = [
     path('batch-complexity-progress/', views.batch_complexity_progress, name='batch_complexity_progress'),
     path('download-sites-import-template/', views.download_sites_import_template, name='download_sites_import_template'),
     path('export-sites-csv/', views.export_sites_csv, name='export_sites_csv'),
+    path('export-pages-csv/', views.export_site_meta_csv, name='export_site_meta_csv'),
+    path('<int:site_id>/meta/export-csv/', views.export_site_meta_csv, name='export_site_meta_csv_for_site'),
     path('cleanup-site-data/', views.cleanup_site_data, name='cleanup_site_data'),
     path('<int:site_id>/meta/create-webbuilder/', views.trigger_webbuilder_site_creation, name='trigger_webbuilder_site_creation'),
 ]
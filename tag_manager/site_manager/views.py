@@ -1,22 +1,20 @@
 # Standard library imports
 import csv
-import json
 import logging
 import re
 import threading
-import time
 import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 import subprocess
 import sys
 
 # Django imports
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.sessions.backends.db import SessionStore
-from django.contrib.sessions.models import Session
 from django.db import models
-from django.db.models import Sum, Count, Q
+from django.db.models import Q
+from django.db.models.functions import Left
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
@@ -29,9 +27,24 @@ import urllib3
 from bs4 import BeautifulSoup
 
 # Project-specific imports
-from .models import SiteListDetails, SiteMetaDetails
+from authentication.counts import get_site_complexity_counts, invalidate_counts
+from .models import SiteListDetails, SiteMetaDetails, SiteMetaComponent, BatchJob
+from .page_components import (
+    ComponentVocabulary, SiteAggregate, build_component_rows, get_component_page_frequency, get_overlapping_sites,
+    delete_stale_pages, load_tag_ids, pages_using_component, sync_page_components,
+)
+from .crawl_queue import enqueue_site_tasks
+from .complexity import (
+    build_complexity_configuration, build_site_data, count_components_by_complexity, load_v2_tag_complexity,
+    recompute_site_complexities,
+)
+from .csv_export import iter_values_in_batches, streaming_csv_response
 from .forms import SiteListDetailsForm, SiteMetaDetailsForm
-from tag_manager_component.models import Tag, TagMapper
+from .html_parsers import CUSTOM_BLOCK_CLASS, get_parser
+from .link_crawler import LinkCrawler
+from .pagination import keyset_paginate
+from .site_import import InvalidCSVHeader, import_websites
+from tag_manager_component.models import TagMapper
 from tag_manager_component.views import get_website_complexity
 
 # Disable SSL warnings for sites with certificate issues
@@ -40,10 +53,23 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # Configure logging
 logger = logging.getLogger(__name__)
 
+SITE_LIST_PAGE_SIZE = 50
+SITE_META_PAGE_SIZE = 100
+
+# Component list columns that site_list only shows truncated
+SITE_LIST_PREVIEW_FIELDS = ['helix_v1_component', 'helix_v2_compatible_component', 'helix_v2_non_compatible_component']
+SITE_LIST_PREVIEW_LENGTH = 31
+
+# Full component strings of a page, loaded on demand by site_meta_list
+SITE_META_TEXT_FIELDS = [
+    'helix_v1_component', 'helix_v2_compatible_component', 'helix_v2_non_compatible_component', 'custom_component',
+]
+
+
 @login_required
 def site_list(request):
     """
-    Display a list of websites with search and complexity filtering functionality
+    Display a keyset-paginated list of websites with search and complexity filtering functionality
     """
     query = request.GET.get('search', '').strip()
     complexity = request.GET.get('complexity', '').strip()
@@ -71,24 +97,32 @@ def site_list(request):
             # Filter by specific complexity
             filtered_sites = filtered_sites.filter(complexity=complexity)
     
-    # Order the results
-    filtered_sites = filtered_sites.order_by('website_url')
+    # Keyset-paginate on the unique website_url and only load the start of the
+    # component lists, which is all the table shows
+    filtered_count = filtered_sites.count()
+    page = keyset_paginate(
+        filtered_sites
+        .defer('complexity_configuration', 'component_bits', *SITE_LIST_PREVIEW_FIELDS)
+        .annotate(**{
+            f'{field}_preview': Left(field, SITE_LIST_PREVIEW_LENGTH) for field in SITE_LIST_PREVIEW_FIELDS
+        }),
+        'website_url',
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=SITE_LIST_PAGE_SIZE,
+    )
     
-    # Count total sites for each complexity
+    # Facet counts for all sites, from one cached conditional-aggregation query
+    site_counts = get_site_complexity_counts()
     complexity_counts = {
-        'simple': sites.filter(complexity='simple').count(),
-        'medium': sites.filter(complexity='medium').count(),
-        'complex': sites.filter(complexity='complex').count(),
-        'unidentified': sites.filter(
-            Q(complexity__isnull=True) | 
-            Q(complexity='') | 
-            ~Q(complexity__in=['simple', 'medium', 'complex'])
-        ).count(),
+        level: site_counts[level] for level in ['simple', 'medium', 'complex', 'unidentified']
     }
     
     return render(request, 'site_manager/site_list.html', {
-        'sites': sites,
-        'filtered_sites': filtered_sites,
+        'total_count': site_counts['total'],
+        'filtered_count': filtered_count,
+        'filtered_sites': page,
+        'page': page,
         'search': query,
         'complexity': complexity,
         'complexity_counts': complexity_counts,
@@ -121,12 +155,16 @@ def cleanup_site_data(request):
                 complexity="",
                 complexity_configuration=None,
                 is_imported=False,
-                last_analyzed=None
+                last_analyzed=None,
+                component_bits=None
             )
             
             # Step 2: Delete all site meta details
             SiteMetaDetails.objects.all().delete()
             
+            # Queryset updates don't send save signals, so drop the cached complexity counts here
+            invalidate_counts()
+            
             # Log the cleanup
             logger.info(f"Cleaned up {sites_count} sites and deleted {meta_details_count} meta details")
             
@@ -158,28 +196,28 @@ def batch_analyze_sitemaps(request):
     logger.info(f"Batch analyze sitemaps called with method: {request.method}")
     
     if request.method == 'POST':
-        # Initialize progress in session
-        request.session['batch_analysis_progress'] = {
-            'status': 'starting',
-            'current': 0,
-            'total': 0,
-            'current_site': '',
-            'completed_sites': [],
-            'failed_sites': [],
-            'start_time': time.time()
-        }
+        # Progress lives in a BatchJob row rather than the user's session
+        job = BatchJob.objects.create(job_type='analysis', created_by=request.user)
         
-        # Save session explicitly to ensure it's persisted
-        request.session.save()
+        if settings.SITE_ANALYSIS_QUEUE:
+            # Hand the sites to `manage.py crawl_worker` processes through the database queue
+            sites = SiteListDetails.objects.filter(is_imported=False).exclude(
+                crawl_tasks__status__in=['pending', 'leased', 'waiting'],
+            )
+            queued = enqueue_site_tasks(sites, job=job)
+            job.update_fields(status='processing' if queued else 'completed', total=queued,
+                              finished_at=None if queued else timezone.now())
+            logger.info(f"Queued {queued} site tasks for job {job.id}")
+            return render(request, 'site_manager/batch_analysis_progress.html', {'job': job})
         
-        logger.info(f"Starting batch analysis thread with session key: {request.session.session_key}")
+        logger.info(f"Starting batch analysis thread for job {job.id}")
         
         # Start background processing
-        thread = threading.Thread(target=process_batch_analysis, args=(request.session.session_key,))
+        thread = threading.Thread(target=process_batch_analysis, args=(job.id,))
         thread.daemon = True
         thread.start()
         
-        return render(request, 'site_manager/batch_analysis_progress.html')
+        return render(request, 'site_manager/batch_analysis_progress.html', {'job': job})
     
     # GET request - show the batch analysis initiation page
     sites = SiteListDetails.objects.filter(is_imported=False)
@@ -191,60 +229,103 @@ def batch_analyze_sitemaps(request):
         'sites_count': sites_count,
     })
 
+
+def get_batch_job(request, *job_types):
+    """
+    Resolve the job a progress request refers to: the `job` query parameter if given,
+    otherwise the most recently started job of the given type(s).
+    """
+    job_id = request.GET.get('job')
+    jobs = BatchJob.objects.filter(job_type__in=job_types)
+    if job_id:
+        return get_object_or_404(jobs, pk=job_id)
+    return jobs.first()
+
+
+def get_batch_job_progress(job, recent_limit=50):
+    """
+    Build the JSON progress payload for a BatchJob.
+    Only the most recent `recent_limit` per-site results are included; the
+    totals come from the job counters.
+    """
+    if job is None:
+        return {
+            'status': 'not_started',
+            'current': 0,
+            'total': 0,
+            'current_site': '',
+            'completed_count': 0,
+            'failed_count': 0,
+            'completed_sites': [],
+            'failed_sites': [],
+            'updated_sites': [],
+            'percentage': 0,
+        }
+
+    items = job.items.order_by('-id')
+    completed_items = list(items.filter(status='completed').values(
+        'site_url', 'old_complexity', 'new_complexity')[:recent_limit])
+    failed_items = list(items.filter(status='failed').values('site_url', 'error')[:recent_limit])
+
+    progress_data = {
+        'job_id': job.id,
+        'status': job.status,
+        'current': job.current,
+        'total': job.total,
+        'current_site': job.current_site,
+        'completed_count': job.completed_count,
+        'failed_count': job.failed_count,
+        'completed_sites': [item['site_url'] for item in completed_items],
+        'failed_sites': [{'url': item['site_url'], 'error': item['error']} for item in failed_items],
+        'updated_sites': [
+            {
+                'url': item['site_url'],
+                'old_complexity': item['old_complexity'],
+                'new_complexity': item['new_complexity'],
+            }
+            for item in completed_items
+        ],
+        'error': job.error,
+    }
+
+    # Calculate percentage
+    if job.total > 0:
+        progress_data['percentage'] = round((job.current / job.total) * 100, 1)
+    else:
+        progress_data['percentage'] = 0
+
+    # Calculate elapsed time and estimate remaining time
+    end_time = job.finished_at or timezone.now()
+    elapsed_time = (end_time - job.started_at).total_seconds()
+    progress_data['elapsed_time'] = round(elapsed_time, 1)
+    if job.current > 0:
+        avg_time_per_site = elapsed_time / job.current
+        remaining_sites = job.total - job.current
+        progress_data['estimated_remaining'] = round(avg_time_per_site * remaining_sites, 1)
+
+    return progress_data
+
+
 @login_required
 def batch_analysis_progress(request):
     """
     AJAX endpoint to get current progress
     """
-    logger.info(f"Progress check requested with session key: {request.session.session_key}")
-    
-    # Get progress data from session
-    progress_data = request.session.get('batch_analysis_progress', {
-        'status': 'not_started',
-        'current': 0,
-        'total': 0,
-        'current_site': '',
-        'completed_sites': [],
-        'failed_sites': []
-    })
+    job = get_batch_job(request, 'analysis', 'site_analysis')
+    progress_data = get_batch_job_progress(job)
     
     logger.info(f"Current progress data: status={progress_data.get('status')}, "
                f"current={progress_data.get('current')}, total={progress_data.get('total')}")
     
-    # Calculate percentage
-    if progress_data.get('total', 0) > 0:
-        percentage = round((progress_data.get('current', 0) / progress_data.get('total')) * 100, 1)
-    else:
-        percentage = 0
-    
-    progress_data['percentage'] = percentage
-    
-    # Calculate elapsed time if started
-    if 'start_time' in progress_data and progress_data['start_time']:
-        elapsed_time = time.time() - progress_data['start_time']
-        progress_data['elapsed_time'] = round(elapsed_time, 1)
-        
-        # Estimate remaining time
-        if progress_data['current'] > 0:
-            avg_time_per_site = elapsed_time / progress_data['current']
-            remaining_sites = progress_data['total'] - progress_data['current']
-            estimated_remaining = avg_time_per_site * remaining_sites
-            progress_data['estimated_remaining'] = round(estimated_remaining, 1)
-    
     return JsonResponse(progress_data)
 
-def process_batch_analysis(session_key):
+def process_batch_analysis(job_id):
     """
     Background process for batch analysis with progress updates
     """
+    job = BatchJob.objects.get(pk=job_id)
     try:
-        logger.info(f"Starting batch analysis process with session key: {session_key}")
-        
-        # Get session
-        session = SessionStore(session_key=session_key)
-        if not session:
-            logger.error(f"Could not load session with key: {session_key}")
-            return
+        logger.info(f"Starting batch analysis process for job {job_id}")
             
         # Get all sites that need analysis
         sites = SiteListDetails.objects.filter(is_imported=False)
@@ -253,319 +334,358 @@ def process_batch_analysis(session_key):
         logger.info(f"Found {total_sites} sites to analyze")
         
         # Update progress
-        progress = session.get('batch_analysis_progress', {})
-        progress.update({
-            'status': 'processing',
-            'total': total_sites,
-            'current': 0
-        })
-        session['batch_analysis_progress'] = progress
-        session.save()
-        
-        logger.info("Updated session with initial progress")
+        job.update_fields(status='processing', total=total_sites, current=0)
         
         # Get all tag mappings at once to avoid repeated queries
-        v1_to_v2_map = {}
-        
-        # Get all tag mappings efficiently
-        all_tag_mappings = TagMapper.objects.all()
-        if all_tag_mappings.exists():
-            logger.info(f"Found {all_tag_mappings.count()} tag mappings")
-            
-        # Build mapping dictionary
-        for mapping in all_tag_mappings:
-            v1_name = mapping.v1_component_name
-            if v1_name not in v1_to_v2_map:
-                v1_to_v2_map[v1_name] = []
-            v1_to_v2_map[v1_name].append({
-                'v2_name': mapping.v2_component_name, 
-                'weight': mapping.weight
-            })
+        v1_to_v2_map = build_v1_to_v2_map()
         
-        # Sort all mappings by weight in descending order
-        for v1_name in v1_to_v2_map:
-            v1_to_v2_map[v1_name] = sorted(
-                v1_to_v2_map[v1_name], 
-                key=lambda x: x['weight'], 
-                reverse=True
-            )
-        
-        completed_sites = []
-        failed_sites = []
-        
-        for index, site in enumerate(sites):
+        for site in sites:
             try:
                 # Update current site being processed
-                progress = session.get('batch_analysis_progress', {})
-                progress.update({
-                    'current': index,
-                    'current_site': site.website_url,
-                    'status': 'processing'
-                })
-                session['batch_analysis_progress'] = progress
-                session.save()
+                job.update_fields(current_site=site.website_url, status='processing')
                 
                 # Process the site
                 print("Processing site:", site.website_url)
                 sitemap_urls = fetch_sitemap_urls(site.website_url)
-                if not sitemap_urls:
-                    failed_sites.append({'url': site.website_url, 'error': 'No sitemap found'})
-                    continue
-                
-                # Prepare for bulk creation of meta details
-                meta_details_to_create = []
-                
-                for sitemap_url in sitemap_urls:
-                    soup, page_source, error = fetch_page(sitemap_url)
-                    if error:
-                        logger.warning(f"Error fetching {sitemap_url}: {error}")
-                        continue
-                        
-                    custom_elements = find_enhanced_custom_class_elements(soup, "custom-block-element")
-                    helix_elements = find_enhanced_helix_elements(soup, page_source)
-                    
-                    # Process compatible components
-                    helix_v2_compatible_component_data = []
-                    helix_v2_non_compatible_component_data = []
-                    
-                    # Process all v1 components at once
-                    for v1_component_name in helix_elements:
-                        if v1_component_name in v1_to_v2_map and v1_to_v2_map[v1_component_name]:
-                            # Get highest weighted v2 component
-                            helix_v2_compatible_component_data.append(v1_to_v2_map[v1_component_name][0]['v2_name'])
-                        else:
-                            # No mapping found
-                            helix_v2_non_compatible_component_data.append(v1_component_name)
-                    
-                    # Create unique, comma-separated strings
-                    helix_v1_component_str = ",".join([e for e in set(helix_elements) if e])
-                    helix_v2_compatible_component_str = ",".join([e for e in set(helix_v2_compatible_component_data) if e])
-                    helix_v2_non_compatible_component_str = ",".join([e for e in set(helix_v2_non_compatible_component_data) if e])
-                    custom_component_str = ",".join([e for e in set(custom_elements) if e])
-                    
-                    # Add to batch for bulk creation
-                    meta_details_to_create.append(
-                        SiteMetaDetails(
-                            site_list_details=site,
-                            site_url=sitemap_url,
-                            helix_v1_component=helix_v1_component_str,
-                            helix_v2_compatible_component=helix_v2_compatible_component_str,
-                            helix_v2_non_compatible_component=helix_v2_non_compatible_component_str,
-                            custom_component=custom_component_str,
-                            v2_compatible_count=len([e for e in helix_v2_compatible_component_data if e]),
-                            v2_non_compatible_count=len([e for e in helix_v2_non_compatible_component_data if e]),
-                            custom_component_count=len([e for e in custom_elements if e]),
-                        )
-                    )
-                
-                # Update site details after analysis
-                # Remove duplicates and blank values, store as comma-separated string
-                # Bulk create all meta details for this site
-                if meta_details_to_create:
-                    SiteMetaDetails.objects.bulk_create(meta_details_to_create)
-                
-                # Use more efficient queries with annotate and aggregate
-                site_meta_details = SiteMetaDetails.objects.filter(site_list_details=site)
-                
-                # Aggregate all unique v1 components
-                helix_v1_components_raw = site_meta_details.filter(
-                    helix_v1_component__isnull=False
-                ).values_list('helix_v1_component', flat=True)
-
-                unique_v1_components = set()
-                for value in helix_v1_components_raw:
-                    components = [comp.strip() for comp in value.split(',') if comp.strip()]
-                    unique_v1_components.update(components)
-
-                site.helix_v1_component = json.dumps(sorted(unique_v1_components))
-                
-                # Aggregate v2 compatible components
-                helix_v2_compatible_raw = site_meta_details.filter(
-                    helix_v2_compatible_component__isnull=False
-                ).values_list('helix_v2_compatible_component', flat=True)
-                
-                unique_v2_compatible = set()
-                for value in helix_v2_compatible_raw:
-                    components = [comp.strip() for comp in value.split(',') if comp.strip()]
-                    unique_v2_compatible.update(components)
-                
-                site.helix_v2_compatible_component = json.dumps(sorted(unique_v2_compatible))
-                
-                # Aggregate v2 non-compatible components
-                helix_v2_non_compatible_raw = site_meta_details.filter(
-                    helix_v2_non_compatible_component__isnull=False
-                ).values_list('helix_v2_non_compatible_component', flat=True)
-                
-                unique_v2_non_compatible = set()
-                for value in helix_v2_non_compatible_raw:
-                    components = [comp.strip() for comp in value.split(',') if comp.strip()]
-                    unique_v2_non_compatible.update(components)
-                
-                site.helix_v2_non_compatible_component = json.dumps(sorted(unique_v2_non_compatible))
-                
-                # Use single query with aggregation for counts
-                aggregated_counts = site_meta_details.aggregate(
-                    custom_component_count=Sum('custom_component_count'),
-                    v2_compatible_count=Sum('v2_compatible_count'),
-                    v2_non_compatible_count=Sum('v2_non_compatible_count'),
-                    total_pages=Count('id')
-                )
-                
-                site.custom_component = aggregated_counts['custom_component_count'] or 0
-                site.v2_compatible_count = aggregated_counts['v2_compatible_count'] or 0
-                site.v2_non_compatible_count = aggregated_counts['v2_non_compatible_count'] or 0
-                site.total_pages = aggregated_counts['total_pages']
-                
-                # Calculate and update complexity based on site data
-                try:
-                    # Use the pre-calculated set of unique v2 components
-                    # Count complexity levels based on V2 component complexity
-                    complexity_counts = {
-                        'simple': 0,
-                        'medium': 0,
-                        'complex': 0
-                    }
-                    
-                    # Get all V2 tags with their complexity in a single query
-                    v2_tags_complexity = {
-                        tag.name: tag.complexity 
-                        for tag in Tag.objects.filter(
-                            version='V2', 
-                            name__in=unique_v2_compatible
-                        ).only('name', 'complexity')
-                    }
-                    
-                    # Count components by complexity
-                    for component_name in unique_v2_compatible:
-                        complexity = v2_tags_complexity.get(component_name)
-                        if complexity in complexity_counts:
-                            complexity_counts[complexity] += 1
-                    
-                    # Prepare site data for complexity calculation
-                    site_data = {
-                        'number_of_pages': site.total_pages,
-                        'number_of_helix_v2_compatible': site.v2_compatible_count,
-                        'number_of_helix_v2_non_compatible': site.v2_non_compatible_count,
-                        'number_of_custom_components': site.custom_component if isinstance(site.custom_component, int) else 0,
-                        'total_simple_components': complexity_counts['simple'],
-                        'total_medium_components': complexity_counts['medium'],
-                        'total_complex_components': complexity_counts['complex'],
-                    }
-                    
-                    # Calculate website complexity
-                    complexity_result = get_website_complexity(site_data, return_config=True)
-                    
-                    if complexity_result and len(complexity_result) == 2:
-                        calculated_complexity, config_data = complexity_result
-                        
-                        if calculated_complexity:
-                            site.complexity = calculated_complexity
-                            
-                            # Store configuration data with audit trail
-                            if config_data:
-                                full_config_data = {
-                                    'configuration_used': config_data,
-                                    'site_data_at_calculation': site_data,
-                                    'calculation_timestamp': timezone.now().isoformat(),
-                                    'complexity_determined': calculated_complexity
-                                }
-                                site.complexity_configuration = json.dumps(full_config_data)
-                            
-                            logger.info(f"Updated complexity for {site.website_url}: {calculated_complexity} "
-                                        f"(simple: {complexity_counts['simple']}, medium: {complexity_counts['medium']}, "
-                                        f"complex: {complexity_counts['complex']})")
-                        else:
-                            logger.info(f"Could not determine complexity for {site.website_url}, keeping default")
-                    else:
-                        logger.info(f"Could not determine complexity for {site.website_url}, keeping default")
-                
-                except Exception as complexity_error:
-                    logger.warning(f"Error calculating complexity for {site.website_url}: {complexity_error}")
-                
-                site.is_imported = True
-                site.last_analyzed = timezone.now()
-                site.save()
-                
-                completed_sites.append(site.website_url)
+                analyze_site(site, sitemap_urls, v1_to_v2_map)
+                job.record_item(site, 'completed')
                 
             except Exception as e:
                 logger.warning(f"Error analyzing site {site.website_url}: {e}")
-                failed_sites.append({'url': site.website_url, 'error': str(e)})
-            
-            # Update progress after each site - refresh session to avoid conflicts
-            try:
-                # Get a fresh session instance to avoid conflicts
-                session = SessionStore(session_key=session_key)
-                progress = session.get('batch_analysis_progress', {})
-                progress.update({
-                    'current': index + 1,
-                    'completed_sites': completed_sites,
-                    'failed_sites': failed_sites
-                })
-                session['batch_analysis_progress'] = progress
-                session.save()
-                logger.info(f"Updated progress: {index + 1}/{total_sites}")
-            except Exception as session_err:
-                logger.error(f"Error updating session: {session_err}")
+                job.record_item(site, 'failed', error=str(e))
         
-        # Mark as completed - get fresh session
-        try:
-            session = SessionStore(session_key=session_key)
-            progress = session.get('batch_analysis_progress', {})
-            progress.update({
-                'status': 'completed',
-                'current': total_sites,
-                'current_site': '',
-                'end_time': time.time()
-            })
-            session['batch_analysis_progress'] = progress
-            session.save()
-            logger.info(f"Batch analysis completed for {total_sites} sites")
-        except Exception as final_err:
-            logger.error(f"Error updating final progress: {final_err}")
+        # Mark as completed
+        job.update_fields(status='completed', current=total_sites, current_site='', finished_at=timezone.now())
+        logger.info(f"Batch analysis completed for {total_sites} sites")
         
     except Exception as e:
         logger.error(f"Error in batch analysis process: {e}")
         # Mark as failed
         try:
-            session = SessionStore(session_key=session_key)
-            progress = session.get('batch_analysis_progress', {})
-            progress.update({
-                'status': 'failed',
-                'error': str(e)
-            })
-            session['batch_analysis_progress'] = progress
-            session.save()
-            logger.error(f"Batch analysis failed: {str(e)}")
+            job.update_fields(status='failed', error=str(e), finished_at=timezone.now())
+        except Exception as err:
+            logger.error(f"Could not update job with failure status: {err}")
+
+
+def process_site_analysis(job_id, site_id):
+    """
+    Background process for analyzing a single site. Progress is tracked per page:
+    the job total is the number of sitemap URLs (the crawl page limit for sites
+    without a sitemap) and `current` advances as each page is processed.
+    """
+    job = BatchJob.objects.get(pk=job_id)
+    try:
+        site = SiteListDetails.objects.get(pk=site_id)
+        logger.info(f"Starting sitemap analysis for site: {site.website_url}")
+        job.update_fields(status='processing', current_site=site.website_url)
+        
+        # Fetch sitemap URLs
+        sitemap_urls = fetch_sitemap_urls(site.website_url)
+        job.update_fields(total=len(sitemap_urls) or settings.SITE_CRAWL_MAX_PAGES)
+        
+        def on_page(page_url):
+            job.update_fields(current=models.F('current') + 1)
+        
+        pages_processed = analyze_site(site, sitemap_urls, build_v1_to_v2_map(), on_page=on_page)
+        job.record_item(site, 'completed', advance=False)
+        job.update_fields(status='completed', total=pages_processed, current=pages_processed, current_site='',
+                          finished_at=timezone.now())
+        
+    except NoPagesFound as e:
+        logger.warning(f"{e}: {site.website_url}")
+        job.record_item(site, 'failed', error=str(e), advance=False)
+        job.update_fields(status='failed', error=str(e), current_site='', finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Error in site analysis process: {e}")
+        try:
+            job.update_fields(status='failed', error=str(e), finished_at=timezone.now())
         except Exception as err:
-            logger.error(f"Could not update session with failure status: {err}")
+            logger.error(f"Could not update job with failure status: {err}")
+
+
+def build_v1_to_v2_map():
+    """
+    Load all tag mappings into {v1_name: [{'v2_name': ..., 'weight': ...}, ...]},
+    each list sorted by weight in descending order.
+    """
+    v1_to_v2_map = {}
+    for mapping in TagMapper.objects.all():
+        v1_to_v2_map.setdefault(mapping.v1_component_name, []).append({
+            'v2_name': mapping.v2_component_name,
+            'weight': mapping.weight
+        })
+    
+    # Sort all mappings by weight in descending order
+    for v1_name in v1_to_v2_map:
+        v1_to_v2_map[v1_name] = sorted(
+            v1_to_v2_map[v1_name], 
+            key=lambda x: x['weight'], 
+            reverse=True
+        )
+    return v1_to_v2_map
+
+
+# Number of analyzed pages held in memory before they are written to the database
+PAGE_CHECKPOINT_SIZE = 200
+
+
+# Fields refreshed when a page that is already stored for the site is analyzed again
+PAGE_UPSERT_FIELDS = [
+    'helix_v1_component', 'helix_v2_compatible_component', 'helix_v2_non_compatible_component',
+    'custom_component', 'v2_compatible_count', 'v2_non_compatible_count', 'custom_component_count',
+    'component_bits', 'analyzed_at',
+]
+
+
+def save_page_batch(site, pages, tag_ids):
+    """
+    Upsert a batch of analyzed pages on (site, page URL) and replace their
+    normalized component rows. Returns the ids of the saved pages.
+
+    pages: list of (SiteMetaDetails, components_by_type) tuples
+    """
+    if not pages:
+        return []
+    meta_details_to_save = [meta for meta, _ in pages]
+    # MySQL upserts on any unique key and doesn't accept explicit conflict fields
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['site_list_details', 'site_url']
+    SiteMetaDetails.objects.bulk_create(
+        meta_details_to_save,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=PAGE_UPSERT_FIELDS,
+    )
+    if any(meta.pk is None for meta in meta_details_to_save):
+        # Backends such as MySQL don't return primary keys from bulk_create
+        page_ids = dict(
+            SiteMetaDetails.objects.filter(
+                site_list_details=site, site_url__in=[m.site_url for m in meta_details_to_save]
+            ).values_list('site_url', 'id')
+        )
+        for meta in meta_details_to_save:
+            meta.pk = page_ids.get(meta.site_url)
+    saved_ids = [meta.pk for meta in meta_details_to_save]
+    component_rows = []
+    for meta, components_by_type in pages:
+        component_rows.extend(build_component_rows(meta, components_by_type, tag_ids))
+    SiteMetaComponent.objects.filter(site_meta_details_id__in=saved_ids).delete()
+    SiteMetaComponent.objects.bulk_create(component_rows, batch_size=1000)
+    return saved_ids
+
+
+class NoPagesFound(Exception):
+    """A site has no sitemap and crawling it from its home page found no pages either."""
+
+    # Not worth retrying from the crawl queue
+    retry = False
+
+
+class PageAnalyzer:
+    """
+    Fetches and analyzes single pages. The lookups every page needs (tag ids,
+    component vocabulary, parser backend and V1 to V2 map) are loaded once per run.
+    """
+
+    def __init__(self, v1_to_v2_map):
+        self.v1_to_v2_map = v1_to_v2_map
+        self.tag_ids = load_tag_ids()
+        self.vocabulary = ComponentVocabulary(self.tag_ids)
+        self.parser = get_parser()
+
+    def analyze(self, site, page_url):
+        """
+        Fetch one page and return its unsaved (SiteMetaDetails, components_by_type),
+        or None when the page couldn't be fetched.
+        """
+        document, page_source, error = fetch_page(page_url, self.parser)
+        if error:
+            logger.warning(f"Error fetching {page_url}: {error}")
+            return None
+        return self.extract(site, page_url, document, page_source)
+
+    def extract(self, site, page_url, document, page_source):
+        """Return the unsaved (SiteMetaDetails, components_by_type) of a page parsed with self.parser."""
+        custom_elements = self.parser.find_custom_class_elements(document, CUSTOM_BLOCK_CLASS)
+        helix_elements = self.parser.find_helix_elements(document, page_source)
+        
+        # Process compatible components
+        helix_v2_compatible_component_data = []
+        helix_v2_non_compatible_component_data = []
+        
+        # Process all v1 components at once
+        for v1_component_name in helix_elements:
+            if v1_component_name in self.v1_to_v2_map and self.v1_to_v2_map[v1_component_name]:
+                # Get highest weighted v2 component
+                helix_v2_compatible_component_data.append(self.v1_to_v2_map[v1_component_name][0]['v2_name'])
+            else:
+                # No mapping found
+                helix_v2_non_compatible_component_data.append(v1_component_name)
+        
+        components_by_type = {
+            'v1': helix_elements,
+            'v2_compatible': helix_v2_compatible_component_data,
+            'v2_non_compatible': helix_v2_non_compatible_component_data,
+            'custom': custom_elements,
+        }
+        meta = SiteMetaDetails(
+            site_list_details=site,
+            site_url=page_url,
+            # Create unique, comma-separated strings
+            helix_v1_component=",".join(sorted({e for e in helix_elements if e})),
+            helix_v2_compatible_component=",".join(sorted({e for e in helix_v2_compatible_component_data if e})),
+            helix_v2_non_compatible_component=",".join(sorted({e for e in helix_v2_non_compatible_component_data if e})),
+            custom_component=",".join(sorted({e for e in custom_elements if e})),
+            v2_compatible_count=len([e for e in helix_v2_compatible_component_data if e]),
+            v2_non_compatible_count=len([e for e in helix_v2_non_compatible_component_data if e]),
+            custom_component_count=len([e for e in custom_elements if e]),
+            component_bits=self.vocabulary.page_bits(components_by_type),
+            analyzed_at=timezone.now(),
+        )
+        return meta, components_by_type
+
+
+def fetch_pages(page_urls, parser):
+    """Fetch `page_urls` one by one, yielding (page_url, document, page_source, error)."""
+    for page_url in page_urls:
+        yield (page_url, *fetch_page(page_url, parser))
+
+
+def analyze_site(site, sitemap_urls, v1_to_v2_map, on_page=None):
+    """
+    Fetch and analyze every page in `sitemap_urls`, store the page meta details,
+    then aggregate the results and complexity onto `site` and save it.
+    `on_page(page_url)` is called after each page is processed.
+    Returns the number of pages processed.
+
+    When `sitemap_urls` is empty the site is crawled from its home page instead
+    (see LinkCrawler), and NoPagesFound is raised if that finds nothing either.
+
+    Pages are upserted on (site, page URL), so re-running the analysis refreshes
+    existing rows instead of adding new ones, and stored pages the run no longer
+    lists are deleted. Site totals are kept in a running SiteAggregate as pages
+    arrive; only listed pages that couldn't be fetched keep their stored results
+    and are folded in at the end.
+    """
+    run_started = timezone.now()
+    page_analyzer = PageAnalyzer(v1_to_v2_map)
+    aggregate = SiteAggregate(page_analyzer.vocabulary)
+    pending_pages = []
+    failed_urls = []
+    pages_processed = 0
+    
+    if sitemap_urls:
+        fetched_pages = fetch_pages(sitemap_urls, page_analyzer.parser)
+    else:
+        logger.info(f"No sitemap found for {site.website_url}, crawling its links instead")
+        fetched_pages = LinkCrawler(site.website_url, parser=page_analyzer.parser, headers=PAGE_HEADERS).crawl()
+    
+    for page_url, document, page_source, error in fetched_pages:
+        pages_processed += 1
+        if error:
+            logger.warning(f"Error fetching {page_url}: {error}")
+            failed_urls.append(page_url)
+        else:
+            page = page_analyzer.extract(site, page_url, document, page_source)
+            aggregate.add_page(*page)
+            pending_pages.append(page)
+            
+            # Write pages out in batches to keep memory bounded on large sites
+            if len(pending_pages) >= PAGE_CHECKPOINT_SIZE:
+                save_page_batch(site, pending_pages, page_analyzer.tag_ids)
+                pending_pages = []
+        
+        if on_page:
+            on_page(page_url)
+    
+    if not sitemap_urls and aggregate.total_pages == 0:
+        raise NoPagesFound('No sitemap found and no pages could be crawled')
+    
+    save_page_batch(site, pending_pages, page_analyzer.tag_ids)
+    
+    delete_stale_pages(site, run_started, keep_urls=failed_urls)
+    for start in range(0, len(failed_urls), PAGE_CHECKPOINT_SIZE):
+        aggregate.add_stored_pages(site, site_urls=failed_urls[start:start + PAGE_CHECKPOINT_SIZE])
+    finish_site_analysis(site, aggregate)
+    return pages_processed
+
+
+def finish_site_analysis(site, aggregate):
+    """Copy the page totals in `aggregate` onto the site, calculate its complexity and save it."""
+    aggregate.apply_to(site)
+    unique_v2_compatible = aggregate.names('v2_compatible')
+    
+    # Calculate and update complexity based on site data
+    try:
+        # Count the site's unique v2 components by tag complexity, with a single Tag query
+        complexity_counts = count_components_by_complexity(
+            unique_v2_compatible, load_v2_tag_complexity(unique_v2_compatible)
+        )
+        
+        # Prepare site data for complexity calculation
+        site_data = build_site_data(site, complexity_counts)
+        
+        # Calculate website complexity
+        complexity_result = get_website_complexity(site_data, return_config=True)
+        
+        if complexity_result and len(complexity_result) == 2:
+            calculated_complexity, config_data = complexity_result
+            
+            if calculated_complexity:
+                site.complexity = calculated_complexity
+                
+                # Store configuration data with audit trail
+                if config_data:
+                    site.complexity_configuration = build_complexity_configuration(
+                        site_data, calculated_complexity, config_data
+                    )
+                
+                logger.info(f"Updated complexity for {site.website_url}: {calculated_complexity} "
+                            f"(simple: {complexity_counts['simple']}, medium: {complexity_counts['medium']}, "
+                            f"complex: {complexity_counts['complex']})")
+            else:
+                logger.info(f"Could not determine complexity for {site.website_url}, keeping default")
+        else:
+            logger.info(f"Could not determine complexity for {site.website_url}, keeping default")
+    
+    except Exception as complexity_error:
+        logger.warning(f"Error calculating complexity for {site.website_url}: {complexity_error}")
+    
+    site.is_imported = True
+    site.last_analyzed = timezone.now()
+    site.save()
 
 
 @login_required
 def import_websites_csv(request):
-    
+    """
+    Import websites from an uploaded CSV and report how many were inserted,
+    skipped as duplicates or already present, and rejected as invalid.
+    """
     if request.method == 'POST' and request.FILES.get('csv_file'):
-        csv_file = request.FILES['csv_file']
-        decoded_file = csv_file.read().decode('utf-8').splitlines()
-        reader = csv.reader(decoded_file)
-        count = 0
-        rows = list(reader)
-        # Validate that the first row is a header with 'website_url'
-        if not rows or not rows[0] or rows[0][0].strip().lower() != 'website_url':
+        try:
+            result = import_websites(request.FILES['csv_file'])
+        except InvalidCSVHeader:
             messages.error(request, "CSV header must start with 'website_url'. Please use the provided template.")
             return render(request, 'site_manager/import_websites_csv.html')
-        rows = rows[1:]  # Exclude header row
-        for row in rows:
-            if not row or not row[0].strip() or row[0].strip().startswith('#'):
-                continue  # Skip empty or comment lines
-            url = row[0].strip()
-            if not url.startswith('http://') and not url.startswith('https://'):
-                url = 'https://' + url
-            print(f"Processing URL: {url}")
-            if url and not SiteListDetails.objects.filter(website_url=url).exists():
-                SiteListDetails.objects.create(website_url=url)
-                count += 1
-        messages.success(request, f"Imported {count} websites.")
+        except UnicodeDecodeError:
+            messages.error(request, "CSV file must be UTF-8 encoded.")
+            return render(request, 'site_manager/import_websites_csv.html')
+        
+        # bulk_create doesn't send save signals
+        invalidate_counts()
+        
+        messages.success(
+            request,
+            f"Imported {result.inserted} websites. Skipped {result.duplicates} duplicate rows "
+            f"and {result.existing} websites that already exist."
+        )
+        if result.invalid:
+            messages.warning(
+                request,
+                f"{result.invalid} rows were not valid URLs (e.g. {', '.join(result.invalid_examples)})."
+            )
         return redirect('site_list')
     return render(request, 'site_manager/import_websites_csv.html')
 
@@ -605,22 +725,71 @@ def site_delete(request, pk):
 
 @login_required
 def site_meta_list(request, site_id):
+    """
+    Keyset-paginated pages of a site. The comma-joined component strings are
+    deferred and fetched per page through site_meta_components when opened.
+    """
     site = get_object_or_404(SiteListDetails, pk=site_id)
-    meta_details = site.meta_details.all()
+    component = request.GET.get('component', '').strip()
+    if component:
+        # Pages that use a given component, answered from the indexed component table
+        meta_details = pages_using_component(component, site=site)
+    else:
+        meta_details = site.meta_details.all()
+    page = keyset_paginate(
+        meta_details.defer('component_bits', *SITE_META_TEXT_FIELDS),
+        'id',
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=SITE_META_PAGE_SIZE,
+    )
     return render(request, 'site_manager/site_meta_list.html', {
         'site': site,
-        'meta_details': meta_details
+        'meta_details': page,
+        'page': page,
+        'component': component,
     })
 
+@login_required
+def site_meta_components(request, site_id, pk):
+    """Return the full component lists of one page as JSON"""
+    meta_detail = get_object_or_404(
+        SiteMetaDetails.objects.only('id', 'site_list_details_id', *SITE_META_TEXT_FIELDS),
+        pk=pk, site_list_details_id=site_id,
+    )
+    return JsonResponse({field: getattr(meta_detail, field) or '' for field in SITE_META_TEXT_FIELDS})
+
+@login_required
+def site_component_overlap(request, site_id):
+    """Return the sites that share the most components with this one as JSON"""
+    site = get_object_or_404(SiteListDetails.objects.only('id', 'component_bits'), pk=site_id)
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+    except ValueError:
+        limit = 20
+    return JsonResponse({'site_id': site.id, 'sites': get_overlapping_sites(site, limit=limit)})
+
+@login_required
+def site_component_frequency(request, site_id):
+    """Return the number of the site's pages using each component as JSON, most used first"""
+    site = get_object_or_404(SiteListDetails.objects.only('id'), pk=site_id)
+    frequency = get_component_page_frequency(site)
+    components = [
+        {'name': name, 'pages': pages}
+        for name, pages in sorted(frequency.items(), key=lambda item: (-item[1], item[0]))
+    ]
+    return JsonResponse({'site_id': site.id, 'components': components})
+
 @login_required
 def site_meta_create(request, site_id):
     site = get_object_or_404(SiteListDetails, pk=site_id)
     if request.method == 'POST':
-        form = SiteMetaDetailsForm(request.POST)
+        form = SiteMetaDetailsForm(request.POST, site=site)
         if form.is_valid():
             meta_detail = form.save(commit=False)
             meta_detail.site_list_details = site
             meta_detail.save()
+            sync_page_components(meta_detail)
             return redirect('site_meta_list', site_id=site.id)
     else:
         form = SiteMetaDetailsForm()
@@ -631,9 +800,10 @@ def site_meta_edit(request, site_id, pk):
     site = get_object_or_404(SiteListDetails, pk=site_id)
     meta_detail = get_object_or_404(SiteMetaDetails, pk=pk, site_list_details=site)
     if request.method == 'POST':
-        form = SiteMetaDetailsForm(request.POST, instance=meta_detail)
+        form = SiteMetaDetailsForm(request.POST, instance=meta_detail, site=site)
         if form.is_valid():
-            form.save()
+            meta_detail = form.save()
+            sync_page_components(meta_detail)
             return redirect('site_meta_list', site_id=site.id)
     else:
         form = SiteMetaDetailsForm(instance=meta_detail)
@@ -651,187 +821,56 @@ def site_meta_delete(request, site_id, pk):
 @login_required
 def analyze_sitemap(request, site_id):
     """
-    Analyze sitemap URLs for a specific site and create meta details
+    Start a background analysis of the sitemap URLs for a specific site and
+    return the progress page immediately
     """
-    # Get the site
     site = get_object_or_404(SiteListDetails, pk=site_id)
-    logger.info(f"Starting sitemap analysis for site: {site.website_url}")
+    job = BatchJob.objects.create(job_type='site_analysis', created_by=request.user,
+                                  current_site=site.website_url)
     
-    # Fetch sitemap URLs
-    sitemap_urls = fetch_sitemap_urls(site.website_url)
+    logger.info(f"Starting site analysis thread for job {job.id}: {site.website_url}")
     
-    if not sitemap_urls:
-        logger.warning(f"No sitemap URLs found for site: {site.website_url}")
-        return render(request, 'site_manager/error.html', {'error': 'No sitemap URLs found.'})
-
-    # Get all tag mappings for efficiency
-    v1_to_v2_map = {}
-    all_tag_mappings = TagMapper.objects.all()
-    for mapping in all_tag_mappings:
-        v1_name = mapping.v1_component_name
-        if v1_name not in v1_to_v2_map:
-            v1_to_v2_map[v1_name] = []
-        v1_to_v2_map[v1_name].append({'v2_name': mapping.v2_component_name, 'weight': mapping.weight})
-    for v1_name in v1_to_v2_map:
-        v1_to_v2_map[v1_name] = sorted(v1_to_v2_map[v1_name], key=lambda x: x['weight'], reverse=True)
-
-    meta_details_to_create = []
-
-    for sitemap_url in sitemap_urls:
-        try:
-            soup, page_source, error = fetch_page(sitemap_url)
-            if error:
-                logger.warning(f"Error fetching {sitemap_url}: {error}")
-                continue
-
-            custom_elements = find_enhanced_custom_class_elements(soup, "custom-block-element")
-            helix_elements = find_enhanced_helix_elements(soup, page_source)
-
-            helix_v2_compatible_component_data = []
-            helix_v2_non_compatible_component_data = []
-
-            for v1_component_name in helix_elements:
-                if v1_component_name in v1_to_v2_map and v1_to_v2_map[v1_component_name]:
-                    helix_v2_compatible_component_data.append(v1_to_v2_map[v1_component_name][0]['v2_name'])
-                else:
-                    helix_v2_non_compatible_component_data.append(v1_component_name)
-
-            def explode_and_unique_comma_separated(values):
-                unique = set()
-                for item in values:
-                    if item:
-                        unique.update([v.strip() for v in item.split(',') if v.strip()])
-                return ",".join(sorted(unique))
-
-            meta_details_to_create.append(
-                SiteMetaDetails(
-                    site_list_details=site,
-                    site_url=sitemap_url,
-                    helix_v1_component=explode_and_unique_comma_separated([",".join(helix_elements)]),
-                    helix_v2_compatible_component=explode_and_unique_comma_separated([",".join([e for e in helix_v2_compatible_component_data if e])]),
-                    helix_v2_non_compatible_component=explode_and_unique_comma_separated([",".join([e for e in helix_v2_non_compatible_component_data if e])]),
-                    custom_component=explode_and_unique_comma_separated([",".join([e for e in custom_elements if e])]),
-                    v2_compatible_count=len([e for e in helix_v2_compatible_component_data if e]),
-                    v2_non_compatible_count=len([e for e in helix_v2_non_compatible_component_data if e]),
-                    custom_component_count=len([e for e in custom_elements if e]),
-                )
-            )
-        except requests.exceptions.RequestException as e:
-            return render(request, 'site_manager/error.html', {'error': str(e)})
-
-    if meta_details_to_create:
-        SiteMetaDetails.objects.bulk_create(meta_details_to_create)
-
-    def explode_and_unique_comma_separated_list(values):
-        unique = set()
-        for item in values:
-            if item:
-                unique.update([v.strip() for v in item.split(',') if v.strip()])
-        return sorted(unique)
-
-    helix_v1_components_raw = SiteMetaDetails.objects.filter(
-        site_list_details=site, helix_v1_component__isnull=False
-    ).values_list('helix_v1_component', flat=True)
-    site.helix_v1_component = json.dumps(explode_and_unique_comma_separated_list(helix_v1_components_raw))
-
-    helix_v2_compatible_raw = SiteMetaDetails.objects.filter(
-        site_list_details=site, helix_v2_compatible_component__isnull=False
-    ).values_list('helix_v2_compatible_component', flat=True)
-    site.helix_v2_compatible_component = json.dumps(explode_and_unique_comma_separated_list(helix_v2_compatible_raw))
-
-    helix_v2_non_compatible_raw = SiteMetaDetails.objects.filter(
-        site_list_details=site, helix_v2_non_compatible_component__isnull=False
-    ).values_list('helix_v2_non_compatible_component', flat=True)
-    site.helix_v2_non_compatible_component = json.dumps(explode_and_unique_comma_separated_list(helix_v2_non_compatible_raw))
-
-    aggregated_counts = SiteMetaDetails.objects.filter(site_list_details=site).aggregate(
-        custom_component_count=models.Sum('custom_component_count'),
-        v2_compatible_count=models.Sum('v2_compatible_count'),
-        v2_non_compatible_count=models.Sum('v2_non_compatible_count'),
-        total_pages=models.Count('id')
-    )
-    site.custom_component = aggregated_counts['custom_component_count'] or 0
-    site.v2_compatible_count = aggregated_counts['v2_compatible_count'] or 0
-    site.v2_non_compatible_count = aggregated_counts['v2_non_compatible_count'] or 0
-    site.total_pages = aggregated_counts['total_pages']
-
-    # Calculate and update complexity based on site data
-    try:
-        # Aggregate all unique v2 compatible components
-        helix_v2_compatible_raw = SiteMetaDetails.objects.filter(
-            site_list_details=site, helix_v2_compatible_component__isnull=False
-        ).values_list('helix_v2_compatible_component', flat=True)
-        unique_v2_compatible = set()
-        for value in helix_v2_compatible_raw:
-            components = [comp.strip() for comp in value.split(',') if comp.strip()]
-            unique_v2_compatible.update(components)
-
-        # Count complexity levels based on V2 component complexity
-        complexity_counts = {
-            'simple': 0,
-            'medium': 0,
-            'complex': 0
-        }
-        v2_tags_complexity = {
-            tag.name: tag.complexity
-            for tag in Tag.objects.filter(
-                version='V2',
-                name__in=unique_v2_compatible
-            ).only('name', 'complexity')
-        }
-        for component_name in unique_v2_compatible:
-            complexity = v2_tags_complexity.get(component_name)
-            if complexity in complexity_counts:
-                complexity_counts[complexity] += 1
-
-        site_data = {
-            'number_of_pages': site.total_pages,
-            'number_of_helix_v2_compatible': site.v2_compatible_count,
-            'number_of_helix_v2_non_compatible': site.v2_non_compatible_count,
-            'number_of_custom_components': site.custom_component if isinstance(site.custom_component, int) else 0,
-            'total_simple_components': complexity_counts['simple'],
-            'total_medium_components': complexity_counts['medium'],
-            'total_complex_components': complexity_counts['complex'],
-        }
-
-        complexity_result = get_website_complexity(site_data, return_config=True)
-        if complexity_result and len(complexity_result) == 2:
-            calculated_complexity, config_data = complexity_result
-            if calculated_complexity:
-                site.complexity = calculated_complexity
-                if config_data:
-                    full_config_data = {
-                        'configuration_used': config_data,
-                        'site_data_at_calculation': site_data,
-                        'calculation_timestamp': timezone.now().isoformat(),
-                        'complexity_determined': calculated_complexity
-                    }
-                    site.complexity_configuration = json.dumps(full_config_data)
-    except Exception as complexity_error:
-        logger.warning(f"Error calculating complexity for {site.website_url}: {complexity_error}")
-
-    site.is_imported = True
-    site.last_analyzed = timezone.now()
-    site.save()
-
-    return redirect('site_meta_list', site_id=site.id)
+    thread = threading.Thread(target=process_site_analysis, args=(job.id, site.id))
+    thread.daemon = True
+    thread.start()
+    
+    return render(request, 'site_manager/batch_analysis_progress.html', {'job': job, 'site': site})
 
 
 @login_required
 def export_sites_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="sites.csv"'
-
-    writer = csv.writer(response)
-    # Dynamically fetch all fields from the SiteListDetails model
-    fields = [field.name for field in SiteListDetails._meta.fields]
-    writer.writerow(fields)
-
-    sites = SiteListDetails.objects.all()
-    for site in sites:
-        writer.writerow([getattr(site, field) for field in fields])
+    """
+    Stream all sites as CSV. Pass ?gzip=1 to download a gzip-compressed file.
+    """
+    # Dynamically fetch all fields from the SiteListDetails model, apart from binary ones (component_bits)
+    fields = [
+        field for field in SiteListDetails._meta.concrete_fields if field.get_internal_type() != 'BinaryField'
+    ]
+    rows = iter_values_in_batches(SiteListDetails.objects.all(), [field.attname for field in fields])
+    return streaming_csv_response(
+        'sites.csv', [field.name for field in fields], rows, compress=bool(request.GET.get('gzip')),
+    )
 
-    return response
+@login_required
+def export_site_meta_csv(request, site_id=None):
+    """
+    Stream page details as CSV, for one site when `site_id` is given or for all sites.
+    Pass ?gzip=1 to download a gzip-compressed file.
+    """
+    pages = SiteMetaDetails.objects.all()
+    filename = 'site_pages.csv'
+    if site_id is not None:
+        site = get_object_or_404(SiteListDetails, pk=site_id)
+        pages = pages.filter(site_list_details=site)
+        filename = f'site_{site.id}_pages.csv'
+    header = [
+        'website_url', 'site_url', 'helix_v1_component', 'helix_v2_compatible_component',
+        'helix_v2_non_compatible_component', 'v2_compatible_count', 'v2_non_compatible_count',
+        'custom_component', 'custom_component_count',
+    ]
+    fields = ['site_list_details__website_url'] + header[1:]
+    rows = iter_values_in_batches(pages, fields)
+    return streaming_csv_response(filename, header, rows, compress=bool(request.GET.get('gzip')))
 
 @login_required
 def download_sites_import_template(request):
@@ -910,6 +949,14 @@ DEFAULT_HEADERS = {
     'Connection': 'keep-alive'
 }
 
+# Headers for fetching HTML pages
+PAGE_HEADERS = {
+    **DEFAULT_HEADERS,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1'
+}
+
 def fetch_sitemap_urls(base_url):
     """
     Fetch all URLs from sitemap(s) for the given website
@@ -1150,102 +1197,24 @@ def extract_urls_with_regex(content, base_url):
     return list(set(urls))  # Return unique URLs
 
 
-def find_enhanced_custom_class_elements(soup, class_filter="custom-block-element"):
-    """
-    Find HTML elements with custom block classes
-    
-    Args:
-        soup: BeautifulSoup object representing the parsed HTML
-        class_filter: String to filter class names
-        
-    Returns:
-        List of element tag names with the specified class
-    """
-    # Create a more efficient CSS selector
-    class_selector = f'[class*="{class_filter.lower()}"]'
-    
-    try:
-        # Find all elements with the target class in one operation
-        elements = soup.select(class_selector)
-        
-        # Extract tag names
-        return [element.name for element in elements if element.name]
-    except Exception as e:
-        logger.warning(f"Error finding custom elements: {e}")
-        return []
-
-
-def find_enhanced_helix_elements(soup, page_source):
-    """
-    Find Helix-specific elements in the HTML
-    
-    Args:
-        soup: BeautifulSoup object representing the parsed HTML
-        page_source: Raw HTML source (used for regex fallbacks if needed)
-        
-    Returns:
-        List of Helix element names
-    """
-    try:
-        # More efficient selector for helix tags
-        helix_elements = set()
-        
-        # Method 1: Use CSS selector for element names starting with "helix"
-        try:
-            # Note: Not all parsers support this type of CSS selector
-            helix_tags = soup.select('[tag^="helix"], [name^="helix"]')
-            for tag in helix_tags:
-                if tag.name.startswith('helix'):
-                    helix_elements.add(tag.name)
-        except:
-            pass
-            
-        # Method 2: Use find_all with lambda (more compatible but slower)
-        if not helix_elements:
-            helix_tags = soup.find_all(lambda tag: tag.name and tag.name.startswith('helix'))
-            for tag in helix_tags:
-                helix_elements.add(tag.name)
-                
-        # Method 3: Regex fallback if needed
-        if not helix_elements and page_source:
-            import re
-            helix_pattern = r'<(helix-[a-zA-Z0-9-]+)'
-            matches = re.findall(helix_pattern, page_source)
-            helix_elements.update(matches)
-            
-        return list(helix_elements)
-        
-    except Exception as e:
-        logger.warning(f"Error finding helix elements: {e}")
-        return []
-
-
-def fetch_page(url):
+def fetch_page(url, parser=None):
     """
     Fetch webpage content using requests with optimized error handling
     
     Args:
         url: The URL to fetch
+        parser: Parser backend from html_parsers (defaults to get_parser())
         
     Returns:
-        tuple: (BeautifulSoup object, page source text, error message)
+        tuple: (parsed document, page source text, error message)
     """
     try:
-        # Use our predefined headers with HTML-specific Accept header
-        headers = DEFAULT_HEADERS.copy()
-        headers.update({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Upgrade-Insecure-Requests': '1'
-        })
-        
         # Set a reasonable timeout to avoid hanging
-        response = requests.get(url, headers=headers, timeout=30, verify=False)
+        response = requests.get(url, headers=PAGE_HEADERS, timeout=30, verify=False)
         response.raise_for_status()
         
-        # Use html.parser for better compatibility and performance
-        soup = BeautifulSoup(response.content, 'html.parser')
-        return soup, response.text, None
+        document = (parser or get_parser()).parse(response.content)
+        return document, response.text, None
         
     except requests.exceptions.Timeout:
         logger.error(f"Timeout fetching {url}")
@@ -1453,24 +1422,16 @@ def batch_update_complexity(request):
     """
     print("Batch update complexity started")
     if request.method == 'POST':
-        # Initialize progress in session
-        request.session['batch_complexity_progress'] = {
-            'status': 'starting',
-            'current': 0,
-            'total': 0,
-            'current_site': '',
-            'updated_sites': [],
-            'failed_sites': [],
-            'start_time': time.time()
-        }
+        job = BatchJob.objects.create(job_type='complexity', created_by=request.user)
         
         # Start background processing
-        thread = threading.Thread(target=process_batch_complexity_update, args=(request.session.session_key,))
+        thread = threading.Thread(target=process_batch_complexity_update, args=(job.id,))
         thread.daemon = True
         thread.start()
         
         return render(request, 'site_manager/batch_complexity_progress.html', {
-            'is_complexity_only': True
+            'is_complexity_only': True,
+            'job': job,
         })
     
     # GET request - show the batch complexity update initiation page
@@ -1487,187 +1448,34 @@ def batch_complexity_progress(request):
     """
     AJAX endpoint to get current complexity update progress
     """
-    progress_data = request.session.get('batch_complexity_progress', {
-        'status': 'not_started',
-        'current': 0,
-        'total': 0,
-        'current_site': '',
-        'updated_sites': [],
-        'failed_sites': [],
-        'start_time': time.time()
-    })
-    
-    # Calculate elapsed time and estimated remaining time
-    if progress_data.get('start_time'):
-        elapsed_time = time.time() - progress_data['start_time']
-        progress_data['elapsed_time'] = round(elapsed_time, 1)
-        
-        if progress_data['current'] > 0:
-            avg_time_per_site = elapsed_time / progress_data['current']
-            remaining_sites = progress_data['total'] - progress_data['current']
-            estimated_remaining = avg_time_per_site * remaining_sites
-            progress_data['estimated_remaining'] = round(estimated_remaining, 1)
-    
-    return JsonResponse(progress_data)
+    job = get_batch_job(request, 'complexity')
+    return JsonResponse(get_batch_job_progress(job))
 
 
-def process_batch_complexity_update(session_key):
+def process_batch_complexity_update(job_id):
     """
     Background process for batch complexity update only
     """
+    job = BatchJob.objects.get(pk=job_id)
     try:
-        # Get session
-        session = SessionStore(session_key=session_key)
-        print("process_batch_complexity_update started")
-        # Get all sites
-        sites = SiteListDetails.objects.all()
-        total_sites = sites.count()
+        total_sites = SiteListDetails.objects.count()
         
         # Update progress
-        progress = session.get('batch_complexity_progress', {})
-        progress.update({
-            'status': 'processing',
-            'total': total_sites,
-            'current': 0
-        })
-        session['batch_complexity_progress'] = progress
-        session.save()
+        job.update_fields(status='processing', total=total_sites, current=0)
         
-        updated_sites = []
-        failed_sites = []
-        
-        for index, site in enumerate(sites):
-            try:
-                # Update current site being processed
-                progress = session.get('batch_complexity_progress', {})
-                progress.update({
-                    'current': index,
-                    'current_site': site.website_url,
-                    'status': 'processing'
-                })
-                session['batch_complexity_progress'] = progress
-                session.save()
-                
-                # Calculate complexity based on existing site data
-                try:
-                    # Calculate component complexity counts by analyzing existing components
-                    simple_count = 0
-                    medium_count = 0
-                    complex_count = 0
-                    
-                    # Get all unique V2 compatible components for this site
-                    site_meta_details = SiteMetaDetails.objects.filter(site_list_details=site)
-                    all_v2_components = []
-                    
-                    for meta in site_meta_details:
-                        if meta.helix_v2_compatible_component:
-                            try:
-                                components = json.loads(meta.helix_v2_compatible_component)
-                                if isinstance(components, list):
-                                    all_v2_components.extend(components)
-                            except (json.JSONDecodeError, TypeError):
-                                pass
-                    
-                    # Remove duplicates
-                    unique_v2_components = list(set(all_v2_components))
-                    
-                    # Count complexity levels based on V2 component complexity
-                    for component_name in unique_v2_components:
-                        tag = Tag.objects.filter(name=component_name, version='V2').first()
-                        if tag and tag.complexity:
-                            if tag.complexity == 'simple':
-                                simple_count += 1
-                            elif tag.complexity == 'medium':
-                                medium_count += 1
-                            elif tag.complexity == 'complex':
-                                complex_count += 1
-                    
-                    site_data = {
-                        'number_of_pages': site.total_pages,
-                        'number_of_helix_v2_compatible': site.v2_compatible_count,
-                        'number_of_helix_v2_non_compatible': site.v2_non_compatible_count,
-                        'number_of_custom_components': site.custom_component if isinstance(site.custom_component, int) else 0,
-                        'total_simple_components': simple_count,
-                        'total_medium_components': medium_count,
-                        'total_complex_components': complex_count,
-                    }
-                    
-                    # Get complexity and configuration data
-                    complexity_result = get_website_complexity(site_data, return_config=True)
-                    if complexity_result and len(complexity_result) == 2:
-                        calculated_complexity, config_data = complexity_result
-                        
-                        if calculated_complexity:
-                            old_complexity = site.complexity
-                            site.complexity = calculated_complexity
-                            
-                            # Store the configuration data used for this complexity determination
-                            import json
-                            if config_data:
-                                # Add site data to config for complete audit trail
-                                full_config_data = {
-                                    'configuration_used': config_data,
-                                    'site_data_at_calculation': site_data,
-                                    'calculation_timestamp': timezone.now().isoformat(),
-                                    'complexity_determined': calculated_complexity
-                                }
-                                site.complexity_configuration = json.dumps(full_config_data)
-                            
-                            site.save()
-                            
-                            updated_sites.append({
-                                'url': site.website_url,
-                                'old_complexity': old_complexity,
-                                'new_complexity': calculated_complexity
-                            })
-                            print(f"Updated complexity for {site.website_url}: {old_complexity} → {calculated_complexity}")
-                            logger.info(f"Updated complexity for {site.website_url}: {old_complexity} → {calculated_complexity}")
-                        else:
-                            failed_sites.append({'url': site.website_url, 'error': 'Could not determine complexity'})
-                    else:
-                        failed_sites.append({'url': site.website_url, 'error': 'Could not determine complexity'})
-                        
-                        
-                except Exception as complexity_error:
-                    logger.warning(f"Error calculating complexity for {site.website_url}: {complexity_error}")
-                    failed_sites.append({'url': site.website_url, 'error': str(complexity_error)})
-                
-            except Exception as e:
-                logger.warning(f"Error processing site {site.website_url}: {e}")
-                failed_sites.append({'url': site.website_url, 'error': str(e)})
-            
-            # Update progress after each site
-            progress = session.get('batch_complexity_progress', {})
-            progress.update({
-                'current': index + 1,
-                'updated_sites': updated_sites,
-                'failed_sites': failed_sites
-            })
-            session['batch_complexity_progress'] = progress
-            session.save()
+        updated_count = recompute_site_complexities(job)
+        # bulk_update doesn't send save signals, so refresh the cached complexity counts
+        invalidate_counts()
+        logger.info(f"Batch complexity update completed: {updated_count} of {total_sites} sites changed")
         
         # Mark as completed
-        progress = session.get('batch_complexity_progress', {})
-        progress.update({
-            'status': 'completed',
-            'current': total_sites,
-            'current_site': '',
-            'end_time': time.time()
-        })
-        session['batch_complexity_progress'] = progress
-        session.save()
+        job.update_fields(status='completed', current=total_sites, current_site='', finished_at=timezone.now())
         
     except Exception as e:
         logger.error(f"Error in batch complexity update process: {e}")
         # Mark as failed
         try:
-            progress = session.get('batch_complexity_progress', {})
-            progress.update({
-                'status': 'failed',
-                'error': str(e)
-            })
-            session['batch_complexity_progress'] = progress
-            session.save()
+            job.update_fields(status='failed', error=str(e), finished_at=timezone.now())
         except:
             pass
 
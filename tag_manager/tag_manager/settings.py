@@ -23,6 +23,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Get the GitHub token from the environment variable
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 
+# GitHub API client used by tag extraction (see tag_manager_component/github_client.py)
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_MAX_WORKERS = int(os.getenv('GITHUB_MAX_WORKERS', 8))
+# Longest pause (seconds) for a used-up rate limit to reset before extraction stops and saves its progress
+GITHUB_RATE_LIMIT_MAX_WAIT = int(os.getenv('GITHUB_RATE_LIMIT_MAX_WAIT', 60))
+
+# Cached sparse clones for CLONE extraction (see tag_manager_component/repo_cache.py);
+# least recently used clones are evicted beyond REPO_CACHE_MAX_BYTES
+REPO_CACHE_DIR = os.getenv('REPO_CACHE_DIR', BASE_DIR / 'temp_repos')
+REPO_CACHE_MAX_BYTES = int(os.getenv('REPO_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -166,9 +177,37 @@ STATIC_ROOT = BASE_DIR / os.getenv('STATIC_DIR')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    # Dashboard and site list counts; invalidated on model saves/deletes (see authentication/signals.py).
+    # The timeout bounds staleness across processes, since local memory caches aren't shared.
+    'counts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tag-manager-counts',
+        'TIMEOUT': int(os.getenv('COUNTS_CACHE_TIMEOUT', 300)),
+    },
+    # ETags and bodies of GitHub API responses, for conditional requests that survive restarts
+    'github': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('GITHUB_CACHE_DIR', BASE_DIR / 'github_cache'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('GITHUB_CACHE_MAX_ENTRIES', 20000))},
+    },
 }
 
+# HTML parser used by sitemap analysis: 'inventory' (tag-name scan, no DOM), 'lxml' or 'html.parser'
+# (see site_manager/html_parsers.py)
+SITE_ANALYSIS_PARSER = os.getenv('SITE_ANALYSIS_PARSER', 'inventory')
+
+# Queue batch sitemap analysis in the database for `manage.py crawl_worker` processes
+# instead of running it in a thread of the web process
+SITE_ANALYSIS_QUEUE = os.getenv('SITE_ANALYSIS_QUEUE', 'false').lower() in ('1', 'true', 'yes')
+
+# Bounds of the link crawl used for sites without a sitemap (see site_manager/link_crawler.py)
+SITE_CRAWL_MAX_DEPTH = int(os.getenv('SITE_CRAWL_MAX_DEPTH', 3))
+SITE_CRAWL_MAX_PAGES = int(os.getenv('SITE_CRAWL_MAX_PAGES', 500))
+SITE_CRAWL_TIME_LIMIT = int(os.getenv('SITE_CRAWL_TIME_LIMIT', 300))
+SITE_CRAWL_WORKERS = int(os.getenv('SITE_CRAWL_WORKERS', 8))
+
 # Additional Development Settings
 # Disable browser caching for static files during development
 # Note: For complete cache disabling, you may also want to:
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TagManagerComponentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tag_manager_component'
+
+    def ready(self):
+        # Register the complexity evaluator cache invalidation handler
+        from . import signals  # noqa: F401
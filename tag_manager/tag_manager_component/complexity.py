@@ -0,0 +1,153 @@
+import threading
+import time
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .models import ComplexityParameter
+
+# Configurations are checked in this order; the first one a site fits wins
+COMPLEXITY_ORDER = ['simple', 'medium', 'complex']
+
+# site_data keys compared against the ComplexityParameter field of the same name
+COMPLEXITY_FEATURES = [
+    'number_of_pages',
+    'number_of_helix_v2_compatible',
+    'number_of_helix_v2_non_compatible',
+    'number_of_custom_components',
+    'total_simple_components',
+    'total_medium_components',
+    'total_complex_components',
+]
+
+DEFAULT_FALLBACK_CONFIG = {'complexity_type': 'complex', 'reason': 'default_fallback'}
+
+
+def config_to_dict(config):
+    """Convert ComplexityParameter object to dictionary for storage"""
+    return {
+        'complexity_type': config.complexity_type,
+        'number_of_pages': config.number_of_pages,
+        'number_of_helix_v2_compatible': config.number_of_helix_v2_compatible,
+        'number_of_helix_v2_non_compatible': config.number_of_helix_v2_non_compatible,
+        'number_of_custom_components': config.number_of_custom_components,
+        'total_simple_components': config.total_simple_components,
+        'total_medium_components': config.total_medium_components,
+        'total_complex_components': config.total_complex_components,
+        'created_at': config.created_at.isoformat() if config.created_at else None,
+        'updated_at': config.updated_at.isoformat() if config.updated_at else None,
+    }
+
+
+class ComplexityEvaluator:
+    """
+    ComplexityParameter thresholds compiled into a (levels x features) array.
+
+    A site fits a level when each of its features is <= that level's threshold;
+    a threshold of 0 means "not checked" and is compiled to +inf. Levels are tried
+    in COMPLEXITY_ORDER and a site that fits none is 'complex'.
+    """
+
+    def __init__(self, config_data):
+        """config_data: {complexity_type: {feature: threshold, ...}} (extra keys are kept for auditing)."""
+        self.config_data = config_data
+        self.levels = [level for level in COMPLEXITY_ORDER if level in config_data]
+        self.thresholds = np.array(
+            [[self._threshold(config_data[level].get(feature)) for feature in COMPLEXITY_FEATURES]
+             for level in self.levels],
+            dtype=float,
+        ).reshape(len(self.levels), len(COMPLEXITY_FEATURES))
+
+    @staticmethod
+    def _threshold(value):
+        value = value or 0
+        return float(value) if value > 0 else np.inf
+
+    @classmethod
+    def from_configs(cls, configs):
+        """Compile {complexity_type: ComplexityParameter}."""
+        return cls({complexity_type: config_to_dict(config) for complexity_type, config in configs.items()})
+
+    @property
+    def is_configured(self):
+        return bool(self.levels)
+
+    def config_for(self, complexity):
+        """Configuration dict reported for a result, as stored in the site's audit trail."""
+        if complexity in self.config_data:
+            return self.config_data[complexity]
+        return DEFAULT_FALLBACK_CONFIG
+
+    @staticmethod
+    def features(site_data):
+        """Feature vector of one site_data dict."""
+        return [int(site_data.get(feature) or 0) for feature in COMPLEXITY_FEATURES]
+
+    def evaluate(self, site_data):
+        """Return (complexity, config_data) for one site, or (None, None) when nothing is configured."""
+        if not self.is_configured:
+            return None, None
+        complexity = self.evaluate_many(np.array([self.features(site_data)]))[0]
+        return complexity, self.config_for(complexity)
+
+    def evaluate_many(self, feature_matrix):
+        """
+        Classify every row of an (n_sites x features) array at once.
+        Returns an array of complexity names.
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=float).reshape(-1, len(COMPLEXITY_FEATURES))
+        result = np.full(len(feature_matrix), 'complex', dtype=object)
+        if not self.is_configured:
+            result[:] = None
+            return result
+        # fits[i, j]: site j is within every threshold of level i
+        fits = (feature_matrix[np.newaxis, :, :] <= self.thresholds[:, np.newaxis, :]).all(axis=2)
+        matched = fits.any(axis=0)
+        first_level = fits.argmax(axis=0)
+        levels = np.array(self.levels, dtype=object)
+        result[matched] = levels[first_level[matched]]
+        return result
+
+
+# Saves and deletes in this process invalidate the evaluator through signals; edits made
+# by other processes are picked up by a version check at most this often
+VERSION_CHECK_SECONDS = 60
+
+_evaluator_lock = threading.Lock()
+_cached_evaluator = None
+_cached_version = None
+_version_checked_at = None
+
+
+def _configs_version():
+    """Cheap fingerprint of the ComplexityParameter table, so other processes' edits are noticed too."""
+    stats = ComplexityParameter.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return stats['count'], stats['updated']
+
+
+def get_complexity_evaluator():
+    """
+    Return the process-wide ComplexityEvaluator, compiling it when the thresholds
+    changed since it was built. Most calls make no query: the table fingerprint
+    is only compared every VERSION_CHECK_SECONDS.
+    """
+    global _cached_evaluator, _cached_version, _version_checked_at
+    with _evaluator_lock:
+        now = time.monotonic()
+        if _cached_evaluator is not None and now - _version_checked_at < VERSION_CHECK_SECONDS:
+            return _cached_evaluator
+        version = _configs_version()
+        if _cached_evaluator is None or _cached_version != version:
+            configs = {c.complexity_type: c for c in ComplexityParameter.objects.all()}
+            _cached_evaluator = ComplexityEvaluator.from_configs(configs)
+            _cached_version = version
+        _version_checked_at = now
+        return _cached_evaluator
+
+
+def invalidate_complexity_evaluator():
+    global _cached_evaluator, _cached_version, _version_checked_at
+    with _evaluator_lock:
+        _cached_evaluator = None
+        _cached_version = None
+        _version_checked_at = None
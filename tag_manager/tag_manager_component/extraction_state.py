@@ -0,0 +1,163 @@
+import hashlib
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExtractedFile, Tag
+
+# ExtractedFile rows written per query
+RECORD_BATCH_SIZE = 500
+
+
+def git_blob_sha(content):
+    """The git blob SHA-1 of `content` (bytes), the `sha` GitHub reports for a file."""
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+def save_extracted_tags(extractor, path, tags, theme_type, user):
+    """Create the Tag rows for the tags found in one file, skipping tags that already exist."""
+    for tag in tags:
+        try:
+            Tag.objects.get_or_create(
+                name=tag,
+                theme_type=theme_type,
+                defaults={
+                    'path': path,
+                    'details': f'Auto-generated tag for {tag}',
+                    'version': getattr(extractor, 'version_value', 'V1'),
+                    'created_by': user,
+                    'updated_by': user,
+                    'complexity': 'simple',
+                    'is_managed_by': 'automated',
+                    'tags_extractor_id': extractor.id,
+                    'theme_type': theme_type
+                }
+            )
+        except Exception as e:
+            print(f"Error creating tag '{tag}': {str(e)}")
+
+
+class ExtractionState:
+    """
+    The files a TagsExtractor processed on earlier runs, keyed by path with their blob SHAs.
+
+    An extraction run asks unchanged(path, sha) for every .tsx file it lists and
+    only reads and record()s the others, whose tags are saved right away. save()
+    writes the file records (e.g. after each page). finish() runs once the whole
+    listing is known: it drops the records of files that are gone and reconciles
+    tags, deleting automated tags of this extractor that no recorded file of any
+    extractor produces anymore. Tags are never deleted mid-run, since a tag that left one file may
+    still turn up in a file listed later.
+    """
+
+    def __init__(self, extractor, user):
+        self.extractor = extractor
+        self.user = user
+        self.files = {record.path: record for record in ExtractedFile.objects.filter(extractor=extractor)}
+        self.seen = set()
+        self.pending = {}  # path -> ExtractedFile to write
+        self.dropped = set()  # (tag name, theme type) produced by modified or deleted files before this run
+        self.skipped = 0
+        self.deleted = 0
+        self.tags_removed = 0
+
+    def unchanged(self, path, sha):
+        """True if `path` was processed before with the same blob SHA, so it can be skipped."""
+        self.seen.add(path)
+        record = self.files.get(path)
+        if record is not None and record.blob_sha == sha:
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, path, sha, tags, theme_type):
+        """Save the tags of a new or modified file and remember its SHA."""
+        self.seen.add(path)
+        record = self.files.get(path)
+        if record is None:
+            record = ExtractedFile(extractor=self.extractor, path=path)
+        else:
+            self.dropped.update((name, record.theme_type) for name in record.tags)
+        save_extracted_tags(self.extractor, path, tags, theme_type, self.user)
+        record.blob_sha = sha
+        record.theme_type = theme_type
+        record.tags = sorted(set(tags))
+        record.updated_at = timezone.now()
+        self.pending[path] = record
+
+    def save(self):
+        """Write the pending file records."""
+        created = [record for record in self.pending.values() if record.pk is None]
+        updated = [record for record in self.pending.values() if record.pk is not None]
+        with transaction.atomic():
+            ExtractedFile.objects.bulk_create(created, batch_size=RECORD_BATCH_SIZE)
+            ExtractedFile.objects.bulk_update(updated, ['blob_sha', 'theme_type', 'tags', 'updated_at'],
+                                              batch_size=RECORD_BATCH_SIZE)
+        # bulk_create doesn't set primary keys on MySQL: reload so later saves update these rows
+        if created:
+            paths = [record.path for record in created]
+            self.files.update(
+                (record.path, record) for record in ExtractedFile.objects.filter(extractor=self.extractor, path__in=paths)
+            )
+        self.pending = {}
+
+    def finish(self, complete=True):
+        """
+        Save the run. `complete` means every file of the repository was listed: recorded
+        files that weren't are deleted and orphaned tags are removed. Runs that stopped
+        early only save their records, and the next complete run reconciles the tags.
+        """
+        if complete:
+            deleted = [path for path in self.files if path not in self.seen]
+            for path in deleted:
+                record = self.files.pop(path)
+                self.dropped.update((name, record.theme_type) for name in record.tags)
+            ExtractedFile.objects.filter(extractor=self.extractor, path__in=deleted).delete()
+            self.deleted += len(deleted)
+        self.save()
+        if complete:
+            # With a record for every listed file, all of the extractor's tags can be checked
+            # (this also catches tags dropped by earlier runs that stopped early); otherwise
+            # only those this run saw leave a file, as an unrecorded file's tags are unknown
+            self._remove_orphaned_tags(sweep=self.seen <= set(self.files))
+
+    def _remove_orphaned_tags(self, sweep):
+        # Tags are shared by (name, theme type): get_or_create in save_extracted_tags reuses the
+        # row another extractor created, so a tag is kept while any extractor's files produce it
+        produced = {
+            (name, theme_type)
+            for tags, theme_type in ExtractedFile.objects.values_list('tags', 'theme_type').iterator()
+            for name in tags
+        }
+        tags = Tag.objects.filter(tags_extractor=self.extractor, is_managed_by='automated')
+        if sweep:
+            candidates = tags.values_list('id', 'name', 'theme_type')
+        else:
+            candidates = [
+                (tag_id, name, theme_type)
+                for theme_type, names in self._dropped_by_theme().items()
+                for tag_id, name, theme_type in tags.filter(theme_type=theme_type, name__in=names)
+                .values_list('id', 'name', 'theme_type')
+            ]
+        orphaned_ids = [tag_id for tag_id, name, theme_type in candidates if (name, theme_type or '') not in produced]
+        for start in range(0, len(orphaned_ids), RECORD_BATCH_SIZE):
+            deleted, _ = Tag.objects.filter(id__in=orphaned_ids[start:start + RECORD_BATCH_SIZE]).delete()
+            self.tags_removed += deleted
+        self.dropped = set()
+
+    def _dropped_by_theme(self):
+        dropped_by_theme = {}
+        for name, theme_type in self.dropped:
+            dropped_by_theme.setdefault(theme_type, []).append(name)
+        return dropped_by_theme
+
+    def summary(self):
+        """A sentence on what the run skipped and removed, or '' if nothing was."""
+        parts = []
+        if self.skipped:
+            parts.append(f"{self.skipped} unchanged files skipped")
+        if self.deleted:
+            parts.append(f"{self.deleted} deleted files removed")
+        if self.tags_removed:
+            parts.append(f"{self.tags_removed} tags without a source file removed")
+        return f" ({', '.join(parts)})" if parts else ''
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = 'application/vnd.github+json'
+RAW_MEDIA_TYPE = 'application/vnd.github.raw'
+
+REQUEST_TIMEOUT = 15  # seconds
+
+# Rate-limited requests are retried this many times after waiting for the quota to reset
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class RateLimitExceeded(Exception):
+    """The GitHub quota is used up and resets later than the client is willing to wait."""
+
+    def __init__(self, reset_at):
+        self.reset_at = reset_at
+        super().__init__(f"GitHub API rate limit exceeded until {time.strftime('%H:%M:%S', time.localtime(reset_at))}")
+
+
+class GitHubError(Exception):
+    """A GitHub request that failed with an unexpected status code."""
+
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class GitHubClient:
+    """
+    Small GitHub REST client for tag extraction.
+
+    - One pooled requests.Session is shared by up to `max_workers` threads (fetch_many).
+    - X-RateLimit-Remaining/Reset are tracked per rate-limit resource (core, search):
+      when a quota is used up, requests pause until it resets if that is at most
+      `max_wait` seconds away, and raise RateLimitExceeded otherwise so the caller
+      can save its progress and resume later.
+    - GETs are conditional: the ETag and body of every 200 response are kept in the
+      'github' cache and sent back as If-None-Match, and GitHub answers unchanged
+      resources with a 304 that doesn't count against the quota.
+
+    `api_url` defaults to the GITHUB_API_URL setting, so the client can be pointed at a local stub server.
+    """
+
+    def __init__(self, token=None, api_url=None, max_workers=None, max_wait=None, etag_cache=None):
+        self.api_url = (api_url or getattr(settings, 'GITHUB_API_URL', 'https://api.github.com')).rstrip('/')
+        self.max_workers = max_workers or getattr(settings, 'GITHUB_MAX_WORKERS', 8)
+        self.max_wait = max_wait if max_wait is not None else getattr(settings, 'GITHUB_RATE_LIMIT_MAX_WAIT', 60)
+        self.etag_cache = etag_cache if etag_cache is not None else caches['github']
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        token = token if token is not None else getattr(settings, 'GITHUB_TOKEN', None)
+        if token:
+            self.session.headers['Authorization'] = f'token {token}'
+        self.rate_limits = {}  # resource -> (remaining, reset epoch seconds)
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f'{self.api_url}/{path.lstrip("/")}'
+
+    @staticmethod
+    def _resource(url):
+        # The X-RateLimit-Resource names of GitHub's separate quotas
+        path = urlsplit(url).path
+        if path.startswith('/search/code'):
+            return 'code_search'
+        return 'search' if path.startswith('/search/') else 'core'
+
+    @staticmethod
+    def _cache_key(url, params, media_type):
+        key = f'{media_type} {url} {sorted((params or {}).items())}'
+        return 'etag:' + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _record_rate_limit(self, resource, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.rate_limits[resource] = (int(remaining), int(reset))
+
+    def _pause(self, reset_at):
+        delay = reset_at - time.time()
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise RateLimitExceeded(reset_at)
+        logger.info(f"GitHub rate limit reached, pausing {delay:.0f}s")
+        time.sleep(delay)
+
+    def _wait_for_quota(self, resource):
+        with self.lock:
+            remaining, reset_at = self.rate_limits.get(resource, (None, None))
+        if remaining is not None and remaining <= 0:
+            self._pause(reset_at)
+
+    def _request(self, url, params=None, headers=None, stream=False):
+        """Send a GET, pausing and retrying while the quota is used up. Returns the final response."""
+        resource = self._resource(url)
+        for _ in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self._wait_for_quota(resource)
+            response = self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT, stream=stream)
+            self._record_rate_limit(resource, response)
+            if response.status_code in (403, 429) and (
+                response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers
+            ):
+                response.close()
+                retry_after = response.headers.get('Retry-After')
+                if retry_after is not None:
+                    reset_at = time.time() + int(retry_after)
+                else:
+                    reset_at = int(response.headers.get('X-RateLimit-Reset', time.time()))
+                self._pause(reset_at)
+                continue
+            break
+        return response
+
+    def get(self, url, params=None, media_type=JSON_MEDIA_TYPE):
+        """
+        GET an API URL and return (status_code, body text). A 304 for a cached
+        ETag is returned as (200, cached body). Raises RateLimitExceeded or
+        requests.RequestException.
+        """
+        cache_key = self._cache_key(url, params, media_type)
+        cached = self.etag_cache.get(cache_key)
+        headers = {'Accept': media_type}
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        response = self._request(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return 200, cached[1]
+        if response.status_code == 200 and response.headers.get('ETag'):
+            self.etag_cache.set(cache_key, (response.headers['ETag'], response.text), None)
+        return response.status_code, response.text
+
+    def get_json(self, url, params=None):
+        """GET an API URL and return (status_code, decoded JSON or {})."""
+        status_code, text = self.get(url, params=params)
+        try:
+            return status_code, json.loads(text) if text else {}
+        except ValueError:
+            return status_code, {}
+
+    def fetch_many(self, urls, media_type=RAW_MEDIA_TYPE):
+        """
+        GET many API URLs concurrently (by default as raw file contents) and return
+        [(url, status_code, body text or None, error or None)] in the order of `urls`.
+        RateLimitExceeded is raised once every started request has finished.
+        """
+        def fetch(url):
+            try:
+                status_code, text = self.get(url, media_type=media_type)
+                return url, status_code, text, None
+            except requests.RequestException as e:
+                return url, None, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(fetch, url) for url in urls]
+        results = []
+        rate_limit_error = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except RateLimitExceeded as e:
+                rate_limit_error = e
+        if rate_limit_error is not None:
+            raise rate_limit_error
+        return results
+
+    def iter_archive_files(self, owner, repo, suffix='.tsx', ref=''):
+        """
+        Download the repository tarball in one request and yield (path, data) for every
+        file ending in `suffix`, data being the raw bytes. The gzip stream is read as it arrives
+        and only one matching file is held in memory at a time; paths are relative to the
+        repository root.
+        Raises RateLimitExceeded, requests.RequestException, or GitHubError for other failures.
+        """
+        url = self.url(f'repos/{owner}/{repo}/tarball/{ref}'.rstrip('/'))
+        with self._request(url, stream=True) as response:
+            if response.status_code != 200:
+                raise GitHubError(response.status_code, f'Archive download failed (Status code: {response.status_code})')
+            response.raw.decode_content = True
+            with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+                for member in archive:
+                    if not member.isfile() or not member.name.endswith(suffix):
+                        continue
+                    # Entries sit under a single <owner>-<repo>-<sha>/ directory
+                    path = member.name.split('/', 1)[-1]
+                    yield path, archive.extractfile(member).read()
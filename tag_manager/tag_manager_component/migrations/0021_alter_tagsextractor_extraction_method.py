@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tag_manager_component', '0020_alter_tagsextractor_extraction_method'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tagsextractor',
+            name='extraction_method',
+            field=models.CharField(choices=[('GITAPI', 'GitHub API Repository'), ('ARCHIVE', 'GitHub Repository Archive'), ('CLONE', 'Local Repository Clone')], default='GITAPI', max_length=10),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tag_manager_component', '0021_alter_tagsextractor_extraction_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('blob_sha', models.CharField(max_length=40)),
+                ('theme_type', models.CharField(blank=True, default='', max_length=255)),
+                ('tags', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('extractor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='extracted_files', to='tag_manager_component.tagsextractor')),
+            ],
+            options={
+                'unique_together': {('extractor', 'path')},
+            },
+        ),
+    ]
@@ -153,6 +153,7 @@ class TagsExtractor(models.Model):
     
     EXTRACTION_METHOD_CHOICES = [
         ('GITAPI', 'GitHub API Repository'),
+        ('ARCHIVE', 'GitHub Repository Archive'),
         ('CLONE', 'Local Repository Clone'),
     ]
     
@@ -169,3 +170,22 @@ class TagsExtractor(models.Model):
 
     def __str__(self):
         return f"{self.repo_url} ({self.version_value})"
+
+
+class ExtractedFile(models.Model):
+    """
+    A .tsx file processed by a TagsExtractor: its git blob SHA and the tags it produced,
+    so a re-run only reads new or modified files (see extraction_state.ExtractionState).
+    """
+    extractor = models.ForeignKey(TagsExtractor, on_delete=models.CASCADE, related_name='extracted_files')
+    path = models.CharField(max_length=255)
+    blob_sha = models.CharField(max_length=40)
+    theme_type = models.CharField(max_length=255, blank=True, default='')
+    tags = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.blob_sha[:7]})"
+
+    class Meta:
+        unique_together = ('extractor', 'path')
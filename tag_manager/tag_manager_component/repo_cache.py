@@ -0,0 +1,165 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Files kept in the working tree of a cached clone
+SPARSE_PATTERNS = ['*.tsx']
+
+GIT_TIMEOUT = 600  # seconds
+
+# Touched whenever a cached clone is used; its mtime orders LRU eviction
+LAST_USED_FILE = '.last_used'
+
+
+def cache_root():
+    root = str(getattr(settings, 'REPO_CACHE_DIR', os.path.join(settings.BASE_DIR, 'temp_repos')))
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def cache_dir_for(repo_url):
+    """Stable cache directory of a repository URL: <repo name>-<hash of the URL>."""
+    repo_name = repo_url.rstrip('/').split('/')[-1].removesuffix('.git') or 'repo'
+    digest = hashlib.sha1(repo_url.rstrip('/').encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_root(), f'{repo_name}-{digest}')
+
+
+@contextmanager
+def repo_lock(repo_dir):
+    """
+    Exclusive lock on one cached clone, held from its update until the extraction reading it
+    finishes, so concurrent extractions of a repo don't share a half-updated tree.
+    """
+    with open(f'{repo_dir}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def run_git(args, cwd=None):
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0', GIT_LFS_SKIP_SMUDGE='1')
+    return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, check=False,
+                          timeout=GIT_TIMEOUT, env=env)
+
+
+def _clone(repo_url, repo_dir, branch=None):
+    """Shallow, blob-less clone with a sparse working tree of SPARSE_PATTERNS only."""
+    clone_cmd = ['clone', '--depth', '1', '--filter=blob:none', '--no-checkout']
+    if branch:
+        clone_cmd.extend(['--branch', branch])
+    result = run_git([*clone_cmd, repo_url, repo_dir])
+    if result.returncode != 0:
+        return f"Git clone failed: {result.stderr}"
+    # Non-cone patterns, so '*.tsx' matches at any depth; blobs of other files are never downloaded
+    for args in (['sparse-checkout', 'set', '--no-cone', *SPARSE_PATTERNS], ['checkout']):
+        result = run_git(args, cwd=repo_dir)
+        if result.returncode != 0:
+            return f"Git {args[0]} failed: {result.stderr}"
+    return None
+
+
+def _update(repo_dir, branch=None):
+    """Fetch the latest commit of `branch` (default: the remote HEAD) into a cached clone and check it out."""
+    result = run_git(['fetch', '--depth', '1', '--filter=blob:none', 'origin', branch or 'HEAD'], cwd=repo_dir)
+    if result.returncode != 0:
+        return f"Git fetch failed: {result.stderr}"
+    result = run_git(['reset', '--hard', 'FETCH_HEAD'], cwd=repo_dir)
+    if result.returncode != 0:
+        return f"Git reset failed: {result.stderr}"
+    return None
+
+
+@contextmanager
+def checkout_repo(repo_url, branch=None):
+    """
+    Context manager yielding an up-to-date sparse checkout of `repo_url` from the clone cache,
+    as (repo_dir, success, error_message).
+
+    The first use clones the repository (shallow, blob-filtered, *.tsx only);
+    later uses fetch only the new commit into the same directory. A cached clone
+    that can't be updated is cloned again from scratch. The clone stays locked
+    until the block exits, so no other extraction updates it and no eviction
+    deletes it while it is read. Least recently used clones are evicted afterwards
+    to keep the cache within REPO_CACHE_MAX_BYTES.
+    """
+    repo_dir = cache_dir_for(repo_url)
+    with repo_lock(repo_dir):
+        error = None
+        if os.path.isdir(os.path.join(repo_dir, '.git')):
+            error = _update(repo_dir, branch)
+            if error:
+                logger.warning(f"Updating cached clone of {repo_url} failed, cloning again: {error}")
+        if error or not os.path.isdir(os.path.join(repo_dir, '.git')):
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            error = _clone(repo_url, repo_dir, branch)
+            if error:
+                shutil.rmtree(repo_dir, ignore_errors=True)
+        if error:
+            yield None, False, error
+            return
+        with open(os.path.join(repo_dir, '.git', LAST_USED_FILE), 'w'):
+            pass
+        yield repo_dir, True, None
+    evict_clones(keep=repo_dir)
+
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _last_used(path):
+    try:
+        return os.path.getmtime(os.path.join(path, '.git', LAST_USED_FILE))
+    except OSError:
+        # Not a cache entry (e.g. a clone left by an older version): oldest of all
+        return os.path.getmtime(path) if os.path.exists(path) else 0
+
+
+def evict_clones(keep=None, max_bytes=None):
+    """
+    Delete least recently used clones until the cache fits in `max_bytes`
+    (default: the REPO_CACHE_MAX_BYTES setting). Clones locked by a running
+    extraction and `keep` are never deleted. Returns the deleted directories.
+    """
+    max_bytes = max_bytes if max_bytes is not None else getattr(settings, 'REPO_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+    root = cache_root()
+    entries = [os.path.join(root, name) for name in os.listdir(root)]
+    entries = [path for path in entries if os.path.isdir(path)]
+    sizes = {path: _directory_size(path) for path in entries}
+    total = sum(sizes.values())
+    deleted = []
+    for path in sorted(entries, key=_last_used):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        last_used = _last_used(path)
+        with open(f'{path}.lock', 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        total -= sizes[path]
+        deleted.append(path)
+        logger.info(f"Evicted cached clone {path} (last used {time.ctime(last_used)})")
+    return deleted
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .complexity import invalidate_complexity_evaluator
+from .models import ComplexityParameter
+
+
+@receiver([post_save, post_delete], sender=ComplexityParameter)
+def invalidate_cached_complexity_evaluator(sender, **kwargs):
+    invalidate_complexity_evaluator()
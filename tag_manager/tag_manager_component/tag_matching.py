@@ -0,0 +1,98 @@
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Character n-gram size of the candidate index; names are padded so short names still have grams
+NGRAM_SIZE = 3
+
+# V2 names exact-scored per V1 name
+DEFAULT_CANDIDATES = 10
+
+
+def name_ngrams(name, n=NGRAM_SIZE):
+    """The distinct character n-grams of `name`, padded with one space on each side."""
+    padded = f' {name} '
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to the names containing them.
+
+    top_candidates() ranks every indexed name against a query in one vectorized
+    pass: the postings of the query's grams are counted with np.bincount, giving
+    the shared gram count of all names at once, and turned into Dice coefficients.
+    """
+
+    def __init__(self, names, n=NGRAM_SIZE):
+        self.names = list(names)
+        self.n = n
+        postings = {}
+        gram_counts = []
+        for position, name in enumerate(self.names):
+            grams = name_ngrams(name, n)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+        self.gram_counts = np.array(gram_counts, dtype=np.float64)
+
+        # Character counts per name, for the SequenceMatcher.quick_ratio() bound of all names at once
+        self.alphabet = {char: column for column, char in enumerate(sorted({c for name in self.names for c in name}))}
+        self.char_counts = np.zeros((len(self.names), len(self.alphabet)), dtype=np.int32)
+        for position, name in enumerate(self.names):
+            for char in name:
+                self.char_counts[position, self.alphabet[char]] += 1
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.float64)
+
+    def top_candidates(self, name, k=DEFAULT_CANDIDATES):
+        """Positions of the (at most) k indexed names sharing the most n-grams with `name`, by Dice score."""
+        grams = name_ngrams(name, self.n)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        scores = 2.0 * shared / (self.gram_counts + len(grams))
+        k = min(k, np.count_nonzero(shared))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[shared[top] > 0]
+
+    def ratio_upper_bounds(self, name):
+        """
+        An upper bound of SequenceMatcher(None, name, indexed).ratio() for every indexed
+        name: matching characters can't outnumber the characters the two names share.
+        """
+        counts = np.zeros(len(self.alphabet), dtype=np.int32)
+        for char in name:
+            column = self.alphabet.get(char)
+            if column is not None:
+                counts[column] += 1
+        shared = np.minimum(self.char_counts, counts).sum(axis=1)
+        total = self.lengths + len(name)
+        return np.divide(2.0 * shared, total, out=np.ones_like(total), where=total > 0)
+
+
+def best_matches(v1_names, v2_names, threshold=0.7, k=DEFAULT_CANDIDATES):
+    """
+    Pick the most similar V2 name for each V1 name, by SequenceMatcher.ratio().
+
+    The top k candidates of an n-gram index over `v2_names` are scored first. Only
+    the other names whose ratio upper bound reaches the best score (or `threshold`)
+    are scored after them, so the result is the same as a full pairwise scan,
+    including ties going to the V2 name that comes first in `v2_names`.
+    Yields (v1_name, v2_name, score) for every V1 name whose best score exceeds `threshold`.
+    """
+    index = NgramIndex(v2_names)
+    for v1_name in v1_names:
+        scores = {}
+        for position in index.top_candidates(v1_name, k):
+            scores[int(position)] = SequenceMatcher(None, v1_name, index.names[position]).ratio()
+        floor = max(max(scores.values(), default=0.0), threshold)
+        for position in np.flatnonzero(index.ratio_upper_bounds(v1_name) >= floor):
+            if int(position) not in scores:
+                scores[int(position)] = SequenceMatcher(None, v1_name, index.names[position]).ratio()
+        if not scores:
+            continue
+        best_position = min(scores, key=lambda position: (-scores[position], position))
+        if scores[best_position] > threshold:
+            yield v1_name, index.names[best_position], scores[best_position]
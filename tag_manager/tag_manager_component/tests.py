@@ -1,3 +1,379 @@
-from django.test import TestCase
+import io
+import os
+import random
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+from difflib import SequenceMatcher
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import repo_cache
+from .complexity import get_complexity_evaluator, invalidate_complexity_evaluator
+from .extraction_state import ExtractionState, git_blob_sha
+from .github_client import GitHubClient, RateLimitExceeded
+from .models import ComplexityParameter, ExtractedFile, Tag, TagsExtractor
+from .tag_matching import best_matches
+from .views import extract_tags_from_tsx
+
+STUB_FILES = {
+    f'/repositories/1/contents/src/components/c{i}.tsx': f"@Component({{ tag: 'helix-c{i}' }})" for i in range(12)
+}
+
+
+def build_archive(files):
+    """A GitHub-style repository tarball: every entry under one <owner>-<repo>-<sha>/ directory."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for path, text in files.items():
+            data = text.encode()
+            member = tarfile.TarInfo(f'o-r-0123abc/{path}')
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+STUB_ARCHIVE = build_archive({
+    'packages/theme/src/button.tsx': "@Component({ tag: 'helix-button' })",
+    'packages/theme/src/button.css': 'helix-button { }',
+    'README.md': '# r',
+})
+
+
+class StubGitHubHandler(BaseHTTPRequestHandler):
+    """
+    Serves STUB_FILES with ETags, and answers 403 while the server's quota is used up.
+    /search/code has its own quota, labelled code_search as GitHub does.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+            if server.limited_until > time.time():
+                return self.reply(403, b'{"message": "API rate limit exceeded"}', {
+                    'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(server.limited_until) + 1),
+                })
+        if self.path.startswith('/search/code'):
+            with server.lock:
+                server.code_search_remaining -= 1
+                remaining = server.code_search_remaining
+            headers = {
+                'X-RateLimit-Resource': 'code_search', 'X-RateLimit-Remaining': str(max(remaining, 0)),
+                'X-RateLimit-Reset': str(int(time.time()) + 120),
+            }
+            if remaining < 0:
+                return self.reply(403, b'{"message": "API rate limit exceeded"}', headers)
+            return self.reply(200, b'{"total_count": 0, "items": []}', headers)
+        if self.path == '/repos/o/r/tarball':
+            return self.reply(200, STUB_ARCHIVE, {'Content-Type': 'application/x-gzip'})
+        body = STUB_FILES.get(self.path)
+        if body is None:
+            return self.reply(404, b'{"message": "Not Found"}')
+        etag = f'"{hash(body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, b'', {'ETag': etag})
+        self.reply(200, body.encode(), {'ETag': etag, 'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': '0'})
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GitHubClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGitHubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.limited_until = 0
+        self.server.code_search_remaining = 10
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.api_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.urls = [self.api_url + path for path in STUB_FILES]
+
+    def github_client(self, **kwargs):
+        return GitHubClient(token='t', api_url=self.api_url, max_workers=4,
+                            etag_cache=LocMemCache(f'github-{id(self)}', {}), **kwargs)
+
+    def test_fetch_many_returns_contents_in_order(self):
+        results = self.github_client().fetch_many(self.urls)
+        self.assertEqual([result[0] for result in results], self.urls)
+        self.assertEqual([result[2] for result in results], list(STUB_FILES.values()))
+        self.assertTrue(all(result[1] == 200 for result in results))
+
+    def test_unchanged_files_are_served_from_the_etag_cache(self):
+        client = self.github_client()
+        client.fetch_many(self.urls)
+        self.server.requests.clear()
+        results = client.fetch_many(self.urls)
+        self.assertEqual([result[2] for result in results], list(STUB_FILES.values()))
+        self.assertTrue(all(etag for _, etag in self.server.requests))
+
+    def test_pauses_until_the_rate_limit_resets(self):
+        self.server.limited_until = time.time() + 0.5
+        status_code, text = self.github_client(max_wait=5).get(self.urls[0])
+        self.assertEqual((status_code, text), (200, STUB_FILES[list(STUB_FILES)[0]]))
+        self.assertGreater(len(self.server.requests), 1)
+
+    def test_raises_when_the_reset_is_too_far_away(self):
+        self.server.limited_until = time.time() + 120
+        with self.assertRaises(RateLimitExceeded):
+            self.github_client(max_wait=1).fetch_many(self.urls[:3])
+
+    def test_pauses_before_a_code_search_once_its_quota_is_used_up(self):
+        self.server.code_search_remaining = 1
+        client = self.github_client(max_wait=1)
+        status_code, data = client.get_json(self.api_url + '/search/code?q=Component')
+        self.assertEqual((status_code, data['items']), (200, []))
+        with self.assertRaises(RateLimitExceeded):
+            client.get_json(self.api_url + '/search/code?q=Component&page=2')
+        self.assertEqual(len([path for path, _ in self.server.requests if path.startswith('/search/code')]), 1)
+
+    def test_get_json(self):
+        status_code, data = self.github_client().get_json(self.api_url + '/missing')
+        self.assertEqual((status_code, data), (404, {'message': 'Not Found'}))
+
+    def test_iter_archive_files(self):
+        files = list(self.github_client().iter_archive_files('o', 'r', suffix='.tsx'))
+        self.assertEqual(files, [('packages/theme/src/button.tsx', b"@Component({ tag: 'helix-button' })")])
+
+
+class RepoCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = os.path.join(tmp.name, 'source')
+        self.origin = os.path.join(tmp.name, 'origin.git')
+        self.commit({'src/button.tsx': "@Component({ tag: 'helix-button' })", 'README.md': '# r'})
+        subprocess.run(['git', 'clone', '-q', '--bare', self.source, self.origin], check=True)
+        settings_override = override_settings(REPO_CACHE_DIR=os.path.join(tmp.name, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def commit(self, files):
+        if not os.path.isdir(self.source):
+            subprocess.run(['git', 'init', '-q', '-b', 'main', self.source], check=True)
+        for path, text in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.source, path)), exist_ok=True)
+            with open(os.path.join(self.source, path), 'w') as f:
+                f.write(text)
+        git = ['git', '-C', self.source, '-c', 'user.name=t', '-c', 'user.email=t@t']
+        subprocess.run([*git, 'add', '.'], check=True)
+        subprocess.run([*git, 'commit', '-q', '-m', 'files'], check=True)
+
+    def checked_out_files(self, repo_dir):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), repo_dir)
+            for root, dirs, files in os.walk(repo_dir) if '.git' not in root.split(os.sep) for name in files
+        )
+
+    def test_checkout_keeps_only_tsx_files_and_fetches_new_commits(self):
+        url = f'file://{self.origin}'
+        with repo_cache.checkout_repo(url) as (repo_dir, success, error):
+            self.assertTrue(success, error)
+            self.assertEqual(self.checked_out_files(repo_dir), ['src/button.tsx'])
+
+        self.commit({'src/card.tsx': "@Component({ tag: 'helix-card' })"})
+        subprocess.run(['git', '-C', self.source, 'push', '-q', self.origin, 'main'], check=True)
+        with repo_cache.checkout_repo(url) as (updated_dir, success, error):
+            self.assertEqual(updated_dir, repo_dir)
+            self.assertEqual(self.checked_out_files(repo_dir), ['src/button.tsx', 'src/card.tsx'])
+
+    def test_clone_is_locked_while_in_use(self):
+        with repo_cache.checkout_repo(f'file://{self.origin}') as (repo_dir, success, error):
+            self.assertTrue(success, error)
+            self.assertEqual(repo_cache.evict_clones(max_bytes=0), [])
+            self.assertTrue(os.path.isdir(repo_dir))
+        self.assertEqual(repo_cache.evict_clones(max_bytes=0), [repo_dir])
+
+    def test_missing_repository(self):
+        with repo_cache.checkout_repo(f'file://{self.origin}-missing') as (repo_dir, success, error):
+            self.assertEqual((repo_dir, success), (None, False))
+            self.assertIn('Git clone failed', error)
+
+    def test_evicts_least_recently_used_clones(self):
+        with repo_cache.checkout_repo(f'file://{self.origin}') as (repo_dir, success, error):
+            pass
+        stale = os.path.join(repo_cache.cache_root(), 'stale')
+        os.makedirs(stale)
+        with open(os.path.join(stale, 'file'), 'w') as f:
+            f.write('x' * 1000)
+        os.utime(stale, (1, 1))
+        self.assertEqual(repo_cache.evict_clones(keep=repo_dir, max_bytes=0), [stale])
+        self.assertTrue(os.path.isdir(repo_dir))
+
+
+class IncrementalExtractionTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.request = RequestFactory().get('/')
+        self.request.user = get_user_model().objects.create(username='extractor', email='e@e.com', role='admin')
+        self.extractor = TagsExtractor.objects.create(
+            version_value='V1', repo_url='https://github.com/o/r', extraction_method='CLONE',
+        )
+        for name in ('button', 'card', 'modal'):
+            self.write(f'packages/theme/{name}.tsx', f"@Component({{ tag: 'helix-{name}' }})")
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(os.path.join(self.directory, path)), exist_ok=True)
+        with open(os.path.join(self.directory, path), 'w') as f:
+            f.write(text)
+
+    def tag_names(self):
+        return sorted(Tag.objects.filter(tags_extractor=self.extractor).values_list('name', flat=True))
+
+    def test_git_blob_sha(self):
+        self.assertEqual(git_blob_sha(b'hello\n'), 'ce013625030ba8dba906f756967f9e9ca394464a')
+
+    def test_rerun_processes_only_changed_files(self):
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        self.assertEqual(self.tag_names(), ['helix-button', 'helix-card', 'helix-modal'])
+        self.assertEqual(ExtractedFile.objects.filter(extractor=self.extractor).count(), 3)
+
+        self.write('packages/theme/card.tsx', "@Component({ tag: 'helix-card-v2' })")
+        os.remove(os.path.join(self.directory, 'packages/theme/modal.tsx'))
+        tsx_count, state = extract_tags_from_tsx(self.directory, self.extractor, self.request)
+
+        self.assertEqual((tsx_count, state.skipped, state.deleted, state.tags_removed), (2, 1, 1, 2))
+        self.assertEqual(self.tag_names(), ['helix-button', 'helix-card-v2'])
+        self.assertEqual(
+            dict(ExtractedFile.objects.filter(extractor=self.extractor).values_list('path', 'tags')),
+            {'packages/theme/button.tsx': ['helix-button'], 'packages/theme/card.tsx': ['helix-card-v2']},
+        )
+
+    def test_keeps_tags_still_produced_by_another_file(self):
+        self.write('packages/theme/button-alias.tsx', "@Component({ tag: 'helix-button' })")
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        os.remove(os.path.join(self.directory, 'packages/theme/button.tsx'))
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        self.assertIn('helix-button', self.tag_names())
+
+    def test_keeps_tags_another_extractor_still_produces(self):
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        other_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(other_directory.cleanup)
+        os.makedirs(os.path.join(other_directory.name, 'packages/theme'))
+        with open(os.path.join(other_directory.name, 'packages/theme/button.tsx'), 'w') as f:
+            f.write("@Component({ tag: 'helix-button' })")
+        other = TagsExtractor.objects.create(
+            version_value='V1', repo_url='https://github.com/o/other', extraction_method='CLONE',
+        )
+        extract_tags_from_tsx(other_directory.name, other, self.request)
+        button = Tag.objects.get(name='helix-button')
+        self.assertEqual(button.tags_extractor_id, self.extractor.id)
+
+        os.remove(os.path.join(self.directory, 'packages/theme/button.tsx'))
+        tsx_count, state = extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        self.assertEqual((state.deleted, state.tags_removed), (1, 0))
+        self.assertTrue(Tag.objects.filter(pk=button.pk).exists())
+
+    def test_tag_moved_to_a_file_saved_later_keeps_its_row(self):
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        card = Tag.objects.get(name='helix-card')
+        state = ExtractionState(self.extractor, self.request.user)
+        # First page: card.tsx no longer has the tag; a later page has the file it moved to
+        state.record('packages/theme/card.tsx', 'sha-2', [], 'theme')
+        state.save()
+        self.assertTrue(Tag.objects.filter(pk=card.pk).exists())
+        state.record('packages/theme/cards.tsx', 'sha-3', ['helix-card'], 'theme')
+        state.save()
+        state.finish(complete=False)
+        self.assertTrue(Tag.objects.filter(pk=card.pk).exists())
+
+    def test_complete_run_removes_tags_orphaned_by_a_stopped_run(self):
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        state = ExtractionState(self.extractor, self.request.user)
+        state.record('packages/theme/card.tsx', 'sha-2', [], 'theme')
+        state.finish(complete=False)
+        self.assertIn('helix-card', self.tag_names())
+
+        self.write('packages/theme/card.tsx', '')
+        extract_tags_from_tsx(self.directory, self.extractor, self.request)
+        self.assertEqual(self.tag_names(), ['helix-button', 'helix-modal'])
+
+
+class ComplexityEvaluatorCacheTests(TestCase):
+
+    def setUp(self):
+        invalidate_complexity_evaluator()
+        self.addCleanup(invalidate_complexity_evaluator)
+
+    def test_cached_evaluator_makes_no_queries(self):
+        evaluator = get_complexity_evaluator()
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertIs(get_complexity_evaluator(), evaluator)
+
+    def test_saving_thresholds_rebuilds_the_evaluator(self):
+        evaluator = get_complexity_evaluator()
+        ComplexityParameter.objects.create(complexity_type='simple')
+        rebuilt = get_complexity_evaluator()
+        self.assertIsNot(rebuilt, evaluator)
+        self.assertTrue(rebuilt.is_configured)
+
+
+def brute_force_matches(v1_names, v2_names, threshold=0.7):
+    """Reference for best_matches: score every pair, first V2 name wins ties."""
+    for v1_name in v1_names:
+        best_name, best_score = None, -1.0
+        for v2_name in v2_names:
+            score = SequenceMatcher(None, v1_name, v2_name).ratio()
+            if score > best_score:
+                best_name, best_score = v2_name, score
+        if best_name is not None and best_score > threshold:
+            yield v1_name, best_name, best_score
+
+
+class BestMatchesTests(SimpleTestCase):
+
+    def assertMatchesBruteForce(self, v1_names, v2_names, threshold=0.7, **kwargs):
+        self.assertEqual(list(best_matches(v1_names, v2_names, threshold=threshold, **kwargs)),
+                         list(brute_force_matches(v1_names, v2_names, threshold=threshold)))
+
+    def test_random_names(self):
+        rng = random.Random(45)
+
+        def name():
+            parts = rng.choices(['helix', 'button', 'card', 'nav', 'bar', 'list', 'item', 'x', 'modal'], k=rng.randint(1, 4))
+            return '-'.join(parts) + rng.choice(['', '', 's', '2', '-v2'])
+
+        for _ in range(2):
+            v2_names = [name() for _ in range(200)]
+            v1_names = [name() for _ in range(100)] + rng.sample(v2_names, 10)
+            for threshold in (0.0, 0.7):
+                self.assertMatchesBruteForce(v1_names, v2_names, threshold=threshold)
+            self.assertMatchesBruteForce(v1_names, v2_names, k=1)
+
+    def test_ties_go_to_the_first_v2_name(self):
+        # 'helix-cart' and 'helix-card' score the same against 'helix-carx'; so do the duplicates
+        v2_names = ['helix-card', 'helix-cart', 'helix-card', 'helix-bard']
+        self.assertEqual(list(best_matches(['helix-carx'], v2_names)), [('helix-carx', 'helix-card', 0.9)])
+        self.assertMatchesBruteForce(['helix-carx', 'helix-card', 'helix-bart'], v2_names, k=1)
+        self.assertMatchesBruteForce(['helix-carx'], list(reversed(v2_names)), k=1)
+
+    def test_empty_and_one_character_names(self):
+        names = ['', 'a', 'b', 'ab', 'ba', 'a-b', 'helix-a']
+        for threshold in (-1.0, 0.0, 0.5, 0.7):
+            self.assertMatchesBruteForce(names, names, threshold=threshold)
+            self.assertMatchesBruteForce(names, list(reversed(names)), threshold=threshold, k=1)
+        self.assertEqual(list(best_matches(['a'], [])), [])
+        self.assertEqual(list(best_matches([], names)), [])
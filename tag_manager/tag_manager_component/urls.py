@@ -30,6 +30,7 @@ urlpatterns = [
     
     # Complexity Parameter Configuration URLs
     path('complexity-parameter-config/', views.complexity_parameter_config, name='complexity_parameter_config'),
+    path('complexity-parameter-config/simulate/', views.simulate_complexity_parameters, name='simulate_complexity_parameters'),
     
     # Update tag usage counts
     path('update-usage-counts/', update_usage_counts, name='update_usage_counts'),
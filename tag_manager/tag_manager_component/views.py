@@ -2,25 +2,30 @@ import pandas as pd
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from .models import Tag, TagsExtractor, TagMapper, ComplexityParameter
 from django.db.models import Q
 import os
-import tempfile
-import shutil
-import subprocess
+import tarfile
 from dotenv import load_dotenv
 import re
 import requests
 import git
 from django.conf import settings
+from authentication.counts import invalidate_counts
+from site_manager.complexity import simulate_complexity
+from site_manager.csv_export import EXPORT_BATCH_SIZE, streaming_csv_response
+from .complexity import COMPLEXITY_FEATURES, COMPLEXITY_ORDER, get_complexity_evaluator
+from .extraction_state import ExtractionState, git_blob_sha
+from .github_client import GitHubClient, GitHubError, RateLimitExceeded
+from .repo_cache import checkout_repo
+from .tag_matching import best_matches
 from .forms import TagForm, TagsExtractorForm, TagMapperForm, ComplexityMappingForm, ComplexityParameterForm
 import logging
 from collections import defaultdict
 from django.db import transaction
 import csv
-from difflib import SequenceMatcher
 import io
 from django.db import models
 import git  # GitPython library
@@ -35,212 +40,25 @@ logger = logging.getLogger(__name__)
 
 def clone_github_repo(repo_url, branch=None):
     """
-    Clone a GitHub repository to a temporary directory using Django's temp directory.
-    Handles repositories that use Git LFS.
+    Check out a GitHub repository from the clone cache (see repo_cache.checkout_repo).
+
+    The first extraction of a repository makes a shallow, blob-filtered clone with
+    a sparse checkout of its *.tsx files; later ones fetch only the newest commit
+    into the same directory. The cache directory is shared between runs: read it
+    inside the `with` block, which holds its lock, and never delete it.
     
     Args:
         repo_url: URL of the GitHub repository to clone
         branch: Optional branch to checkout
         
     Returns:
-        tuple: (repo_dir, success, error_message)
-            repo_dir: Path to the temporary directory containing the cloned repository
+        A context manager yielding (repo_dir, success, error_message)
+            repo_dir: Path to the cached checkout of the repository
             success: Boolean indicating if the clone was successful
             error_message: String with error details if not successful
     """
-    # Use Django's temp directory for storage
-    base_temp_dir = os.path.join(settings.BASE_DIR, 'temp_repos')
-    os.makedirs(base_temp_dir, exist_ok=True)
-    
-    # Create a unique subdirectory for this clone
-    repo_name = repo_url.rstrip('/').split('/')[-1]
-    temp_dir = os.path.join(base_temp_dir, f"{repo_name}_{timezone.now().strftime('%Y%m%d_%H%M%S')}")
-    
-    
-    print(f"Cloning repository {repo_url} to {temp_dir}...")
-    
-    # Use tempfile to create a truly unique temporary directory
-    temp_dir = tempfile.mkdtemp(prefix=f"{repo_name}_", dir=base_temp_dir)
-
-    # Build the git clone command
-    clone_cmd = ['git', 'clone']
-    if branch:
-        clone_cmd.extend(['-b', branch])
-    clone_cmd.extend(['--recursive', repo_url, temp_dir])
-
-    # First, check if git-lfs is installed and install if needed
-    try:
-        lfs_version = subprocess.run(
-            ['git', 'lfs', 'version'],
-            capture_output=True,
-            text=True,
-            check=False
-        )
-        if lfs_version.returncode != 0:
-            print("Git LFS not found, attempting to install...")
-            try:
-                # Try brew installation first
-                brew_install = subprocess.run(
-                    ['brew', 'install', 'git-lfs'],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                if brew_install.returncode == 0:
-                    print("Git LFS installed via brew")
-                else:
-                    # If brew fails, try pip
-                    pip_install = subprocess.run(
-                        ['pip3', 'install', 'git-lfs'],
-                        capture_output=True,
-                        text=True,
-                        check=False
-                    )
-                    if pip_install.returncode == 0:
-                        print("Git LFS installed via pip")
-                    else:
-                        print("Warning: Could not install git-lfs automatically")
-            except Exception as e:
-                print(f"Warning: Error during git-lfs installation: {e}")
-    except Exception as e:
-        print(f"Warning: Error checking git-lfs: {e}")
-
-    # Run clone command and capture output
-    try:
-        # Initialize git-lfs globally before cloning
-        subprocess.run(['git', 'lfs', 'install'], check=False)
-        
-        clone_result = subprocess.run(
-            clone_cmd, 
-            capture_output=True, 
-            text=True,
-            check=False
-        )
-    except Exception as e:
-        error_message = f"Exception during git clone: {str(e)}"
-        print(error_message)
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        return None, False, error_message
-
-    # Check for the specific checkout failure message
-    if "Clone succeeded, but checkout failed" in clone_result.stderr:
-        print("Clone succeeded but checkout failed. Attempting to fix...")
-        try:
-            # Initialize Git LFS in the cloned repository
-            subprocess.run(
-                ['git', 'lfs', 'install'],
-                cwd=temp_dir,
-                check=False
-            )
-            
-            # Pull LFS files
-            subprocess.run(
-                ['git', 'lfs', 'pull'],
-                cwd=temp_dir,
-                check=False
-            )
-            
-            # Run git status to inspect the state
-            status_result = subprocess.run(
-                ['git', 'status'], 
-                cwd=temp_dir,
-                capture_output=True, 
-                text=True,
-                check=False
-            )
-            print(f"Git status output:\n{status_result.stdout}")
-
-            # Fetch all remote branches
-            subprocess.run(
-                ['git', 'fetch', '--all'],
-                cwd=temp_dir,
-                check=False
-            )
-            
-            # Reset to the latest state of the current branch
-            subprocess.run(
-                ['git', 'reset', '--hard', 'HEAD'],
-                cwd=temp_dir,
-                check=False
-            )
-            
-            # Clean the working directory
-            subprocess.run(
-                ['git', 'clean', '-fd'],
-                cwd=temp_dir,
-                check=False
-            )
-
-            # Attempt to fix the checkout
-            restore_result = subprocess.run(
-                ['git', 'restore', '--source=HEAD', ':/'],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            if restore_result.returncode == 0:
-                print("Successfully restored working directory")
-            else:
-                print(f"Warning: Restore command output: {restore_result.stderr}")
-                # Try alternative fix if restore fails
-                subprocess.run(
-                    ['git', 'checkout', '-f', 'HEAD'],
-                    cwd=temp_dir,
-                    check=False
-                )
-                
-            # Verify the fix worked by checking git status again
-            verify_status = subprocess.run(
-                ['git', 'status'],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            if "working tree clean" in verify_status.stdout:
-                print("Working directory is now clean")
-                
-                # Do one final LFS pull to ensure all files are present
-                subprocess.run(
-                    ['git', 'lfs', 'pull'],
-                    cwd=temp_dir,
-                    check=False
-                )
-            else:
-                print("Warning: Working directory may still have issues")
-                
-        except Exception as restore_error:
-            error_message = f"Failed to restore working directory: {restore_error}"
-            print(error_message)
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-            return None, False, error_message
-            
-    elif clone_result.returncode != 0:
-        error_message = f"Git clone failed: {clone_result.stderr}"
-        print(error_message)
-        # if os.path.exists(temp_dir):
-        #     shutil.rmtree(temp_dir, ignore_errors=True)
-        return None, False, error_message
-
-    # # Initialize Git LFS and pull LFS files in the cloned repo
-    # try:
-    #     subprocess.run(['git', 'lfs', 'install'], cwd=temp_dir, check=True)
-    #     subprocess.run(['git', 'lfs', 'pull'], cwd=temp_dir, check=True)
-    # except subprocess.CalledProcessError as e:
-    #     print(f"Warning: LFS operations failed: {e}")
-    # except Exception as e:
-    #     print(f"Unexpected error during LFS operations: {e}")
-
-    # Verify the clone was successful by checking .git directory
-    if not os.path.isdir(os.path.join(temp_dir, '.git')):
-        # shutil.rmtree(temp_dir, ignore_errors=True)
-        return None, False, "Git repository was not cloned properly"
-
-    return temp_dir, True, None
+    print(f"Checking out repository {repo_url} from the clone cache...")
+    return checkout_repo(repo_url, branch=branch)
 
 def find_tsx_files(repo_dir):
     """
@@ -311,10 +129,16 @@ def get_complexity_recommendations(complexity_type):
     }
     return recommendations.get(complexity_type, recommendations['medium'])
 
+# Tag names declared as @Component({ tag: 'tag-name' }) in TSX sources
+COMPONENT_TAG_PATTERN = re.compile(r"@Component\s*\(\s*\{[^}]*tag:\s*'([^']+)'")
+
 # Load pagination limit from .env
 load_dotenv()
 PAGINATION_LIMIT = int(os.getenv('GITHUB_PAGINATION_LIMIT', 10))
 
+# GitHub code search returns at most this many results for a query
+SEARCH_RESULT_LIMIT = 1000
+
 @login_required
 def tag_list_by_version(request):
     if request.user.role not in ['tag_manager', 'admin']:
@@ -442,73 +266,82 @@ def tag_delete(request, pk):
     return render(request, 'tag_manager_component/tag_confirm_delete.html', {'tag': tag})
 
 
+def clone_theme_type(rel_path, repo_url):
+    """Theme type of a TSX file in a local clone, from its path relative to the repository root."""
+    parts = rel_path.split(os.sep)
+    if "packages" in rel_path:
+        theme_type = parts[1] if len(parts) > 1 else ""
+    elif "src/components" in rel_path or "src/pages" in rel_path or "src/events" in rel_path or "src/validation" in rel_path:
+        theme_type = parts[2] if len(parts) > 2 else ""
+    else:
+        theme_type = ""
+
+    if "helix-web-components" in repo_url:
+        theme_type = f"helix-web-components>>{theme_type}" if theme_type else theme_type
+    elif "helix-extras" in repo_url:
+        theme_type = f"helix-extras>>{theme_type}" if theme_type else theme_type
+    return theme_type
+
+
 def extract_tags_from_tsx(directory, extractor, request):
     """
     Extracts tag names from @Component decorators in .tsx files within a directory.
+    Files whose blob SHA matches the previous run are skipped (see ExtractionState),
+    and tags of files that were deleted since are removed.
     :param directory: Directory to scan for .tsx files.
-    :param output_json: Path to save the JSON list of tag names.
+    :return: (number of .tsx files, ExtractionState of the run)
     """
-    
-    tag_pattern = re.compile(r"@Component\s*\(\s*\{[^}]*tag:\s*'([^']+)'", re.MULTILINE)
-
+    state = ExtractionState(extractor, request.user)
     tsx_count = 0
-    for root, _, files in os.walk(directory):
+    for root, dirs, files in os.walk(directory):
+        if '.git' in dirs:
+            dirs.remove('.git')
         for file in files:
             if file.endswith('.tsx'):
                 tsx_count += 1
                 file_path = os.path.join(root, file)
-                print(f"Processing file: {file_path}")
+                rel_path = os.path.relpath(file_path, directory)
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        matches = tag_pattern.findall(content)
-                        for tag in matches:
-                            rel_path = os.path.relpath(file_path, directory)
-                            parts = rel_path.split(os.sep)
-                            version = getattr(extractor, 'version_value', 'V1')
-                            if "packages" in rel_path:
-                                theme_type = parts[1] if len(parts) > 1 else ""
-                            elif "src/components" in rel_path or "src/pages" in rel_path or "src/events" in rel_path or "src/validation" in rel_path:
-                                theme_type = parts[2] if len(parts) > 2 else ""
-                            else:
-                                theme_type = ""
-
-                            if "helix-web-components" in extractor.repo_url:
-                                theme_type = f"helix-web-components>>{theme_type}" if theme_type else theme_type
-                            elif "helix-extras" in extractor.repo_url:
-                                theme_type = f"helix-extras>>{theme_type}" if theme_type else theme_type
-                            
-                            try:
-                                Tag.objects.get_or_create(
-                                    name=tag,
-                                    theme_type=theme_type,
-                                    defaults={
-                                        'path': rel_path,
-                                        'details': f'Auto-generated tag for {tag}',
-                                        'version': version,
-                                        'created_by': request.user,
-                                        'updated_by': request.user,
-                                        'complexity': 'simple',
-                                        'is_managed_by': 'automated',
-                                        'tags_extractor_id': extractor.id,
-                                        'theme_type': theme_type
-                                    }
-                                )
-                            except Exception as e:
-                                print(f"Error creating tag '{tag}': {str(e)}")
+                    with open(file_path, 'rb') as f:
+                        data = f.read()
                 except Exception as e:
                     print(f"Error reading {file_path}: {e}")
-    return tsx_count
+                    state.seen.add(rel_path)
+                    continue
+                sha = git_blob_sha(data)
+                if state.unchanged(rel_path, sha):
+                    continue
+                print(f"Processing file: {file_path}")
+                tags = COMPONENT_TAG_PATTERN.findall(data.decode('utf-8', 'replace'))
+                state.record(rel_path, sha, tags, clone_theme_type(rel_path, extractor.repo_url))
+    state.finish(complete=True)
+    return tsx_count, state
+
+def gitapi_theme_type(path, repo_url):
+    """Theme type of a TSX file found through the GitHub API, from its repository path."""
+    parts = path.split('/')
+    if "packages" in path:
+        theme_type = parts[1] if len(parts) > 1 else ""
+    elif "src/components" in path:
+        theme_type = parts[2] if len(parts) > 2 else ""
+    else:
+        theme_type = ""
+
+    if "cdp-lite-theme" in repo_url:
+        theme_type = f"cdp-lite-theme>>{theme_type}" if theme_type else theme_type
+    elif "hcp-galaxy-theme" in repo_url:
+        theme_type = f"hcp-galaxy-theme>>{theme_type}" if theme_type else theme_type
+    return theme_type
+
 
-    # Save tag list to JSON
-   
 def process_extractor_pages(request, extractor, start_page=1, update_db=True):
     """
     Processes .tsx files for a given TagsExtractor instance from start_page to total_pages.
     If update_db is True, updates start_page and imported fields in the DB.
     
-    Supports two extraction methods:
-    - GITAPI: Uses GitHub API to retrieve files (default)
+    Supports three extraction methods:
+    - GITAPI: Uses GitHub code search and GitHubClient to retrieve files (default)
+    - ARCHIVE: Streams the repository tarball in a single request (process_extractor_archive)
     - CLONE: Clones the repository locally and processes files
     
     Returns a tuple: (message, tags_found)
@@ -532,17 +365,14 @@ def process_extractor_pages(request, extractor, start_page=1, update_db=True):
     # If extraction method is CLONE, use the local clone approach directly
     if extractor.extraction_method == 'CLONE':
         print(f"Using local repository clone as requested by extraction_method: {extractor.extraction_method}")
-        repo_dir, clone_success, clone_error = clone_github_repo(extractor.repo_url)
-        
-        if not clone_success:
-            return f"Clone failed: {clone_error}", []
-        
-        # Process the local clone using extract_tags_from_tsx
-        
-        total_count = extract_tags_from_tsx(repo_dir, extractor, request)
-        # shutil.rmtree(repo_dir, ignore_errors=True)
+        with clone_github_repo(extractor.repo_url) as (repo_dir, clone_success, clone_error):
+            if not clone_success:
+                return f"Clone failed: {clone_error}", []
+            
+            # Process the local clone using extract_tags_from_tsx, while it is locked
+            total_count, state = extract_tags_from_tsx(repo_dir, extractor, request)
 
-        print(f"Found {total_count} TSX files in repository")
+        print(f"Found {total_count} TSX files in repository{state.summary()}")
         # Store the total TSX count in the description field temporarily
         tsx_count_info = f"TSX files found: {total_count}"
         extractor.description = tsx_count_info
@@ -554,46 +384,44 @@ def process_extractor_pages(request, extractor, start_page=1, update_db=True):
        
         return redirect('tags_extractor_detail', extractor_id=extractor.id)
     
+    if extractor.extraction_method == 'ARCHIVE':
+        return process_extractor_archive(request, extractor, owner, repo, update_db=update_db)
+    
     # Default to GITAPI method (GitHub API)
-    # Set up headers for GitHub API
-    headers = {}
-    if hasattr(settings, 'GITHUB_TOKEN') and settings.GITHUB_TOKEN:
-        headers['Authorization'] = f'token {settings.GITHUB_TOKEN}'
-    else:
+    client = GitHubClient()
+    if 'Authorization' not in client.session.headers:
         print("Warning: GitHub token not found in settings. API rate limits will be lower.")
     
-    repo_api_url = f'https://api.github.com/repos/{owner}/{repo}'
+    repo_api_url = client.url(f'repos/{owner}/{repo}')
     print(f"Checking repository: {repo_api_url}")
     try:
-        repo_resp = requests.get(repo_api_url, headers=headers, timeout=10)
-
-        print(repo_resp)
+        status_code, repo_json = client.get_json(repo_api_url)
         
-        if repo_resp.status_code == 404:
+        if status_code == 404:
             print(f'Repository not found: {owner}/{repo}. Please check if the repository exists and is public.')
             return f'Repository not found: {owner}/{repo}. Please check if the repository exists and is public.', []
-        elif repo_resp.status_code == 403:
+        elif status_code == 403:
             print('GitHub API rate limit exceeded. Please try again later or configure a GitHub token.')
             return 'GitHub API rate limit exceeded. Please try again later or configure a GitHub token.', []
-        elif repo_resp.status_code != 200:
-            error_msg = repo_resp.json().get('message', 'Unknown error') if repo_resp.content else 'Unknown error'
-            print(f'Cannot access repository: {error_msg} (Status code: {repo_resp.status_code})')
-            return f'Cannot access repository: {error_msg} (Status code: {repo_resp.status_code})', []
+        elif status_code != 200:
+            error_msg = repo_json.get('message', 'Unknown error')
+            print(f'Cannot access repository: {error_msg} (Status code: {status_code})')
+            return f'Cannot access repository: {error_msg} (Status code: {status_code})', []
+    except RateLimitExceeded as e:
+        return f'{e}. Please try again later.', []
     except requests.RequestException as e:
         print(f'Error connecting to GitHub API: {str(e)}')
         return f'Error connecting to GitHub API: {str(e)}', []
     
-    print(extractor.total_pages)
+    search_url = client.url('search/code')
+    search_query = f'repo:{owner}/{repo} extension:tsx'
     # Get total pages if not set
     if extractor.total_pages == 0:
         try:
-            search_url = f'https://api.github.com/search/code?q=repo:{owner}/{repo}+extension:tsx'
-            print(f"Searching for TSX files: {search_url}")
-            search_resp = requests.get(search_url, headers=headers, timeout=15)
+            print(f"Searching for TSX files: {search_query}")
+            status_code, search_json = client.get_json(search_url, params={'q': search_query})
             
-            if search_resp.status_code == 200:
-                search_json = search_resp.json()
-                print(f"GitHub search response: {search_json}")  # Debug: print full response
+            if status_code == 200:
                 total_count = search_json.get('total_count', 0)
                 print(f"Found {total_count} TSX files in repository")
                 # Store the total TSX count in the description field temporarily
@@ -608,124 +436,141 @@ def process_extractor_pages(request, extractor, start_page=1, update_db=True):
                 extractor.total_pages = max(1, total_pages)  # Ensure at least 1 page
                 if update_db:
                     extractor.save()
-            elif search_resp.status_code == 403:
+            elif status_code == 403:
                 return 'GitHub API rate limit exceeded while searching for TSX files. Please try again later.', []
             else:
-                error_msg = search_resp.json().get('message', 'Unknown error') if search_resp.content else 'Unknown error'
-                return f'Failed to search for TSX files: {error_msg} (Status code: {search_resp.status_code})', []
+                error_msg = search_json.get('message', 'Unknown error')
+                return f'Failed to search for TSX files: {error_msg} (Status code: {status_code})', []
+        except RateLimitExceeded as e:
+            return f'{e}. Please try again later.', []
         except requests.RequestException as e:
             return f'Error while searching for TSX files: {str(e)}', []
-    all_items = []
-    page = start_page
-    processed_page = page - 1
+    
+    # Each search page is fetched, its new or modified files downloaded concurrently and
+    # their tags saved before start_page moves on, so a run stopped by the rate limit resumes there
+    state = ExtractionState(extractor, request.user)
+    files_processed = 0
+    stopped_early = False
+    page = max(start_page, 1)
     while page <= extractor.total_pages:
-        search_url = f'https://api.github.com/search/code?q=repo:{owner}/{repo}+extension:tsx&per_page={PAGINATION_LIMIT}&page={page}'
-        print(f"Processing page {page}/{extractor.total_pages}: {search_url}")
-        
+        print(f"Processing page {page}/{extractor.total_pages}")
         try:
-            search_resp = requests.get(search_url, headers=headers, timeout=15)
-            
-            if search_resp.status_code == 200:
-                pass  # Continue with processing
-            elif search_resp.status_code == 403:
-                message = 'GitHub API rate limit exceeded while fetching TSX files. Please try again later.'
-                print(message)
-                break
-            else:
-                error_msg = search_resp.json().get('message', 'Unknown error') if search_resp.content else 'Unknown error'
-                message = f'Failed to fetch TSX files: {error_msg} (Status code: {search_resp.status_code})'
+            status_code, data = client.get_json(
+                search_url, params={'q': search_query, 'per_page': PAGINATION_LIMIT, 'page': page},
+            )
+            if status_code != 200:
+                error_msg = data.get('message', 'Unknown error')
+                message = f'Failed to fetch TSX files: {error_msg} (Status code: {status_code})'
                 print(message)
+                stopped_early = True
                 break
+            items = [item for item in data.get('items', []) if not state.unchanged(item['path'], item['sha'])]
+            results = client.fetch_many([item['url'] for item in items])
+        except RateLimitExceeded as e:
+            message = f'{e}. Click "Process Pending" to resume from page {page}.'
+            print(message)
+            stopped_early = True
+            break
         except requests.RequestException as e:
             message = f'Error while fetching TSX files: {str(e)}'
             print(message)
+            stopped_early = True
             break
-        data = search_resp.json()
-        items = data.get('items', [])
-        for item in items:
-            item['page_number'] = page
-        all_items.extend(items)
-        if update_db and page != processed_page:
+        
+        for item, (_, file_status, content, error) in zip(items, results):
+            if file_status != 200:
+                print(f"Could not fetch {item['path']}: {error or file_status}")
+                continue
+            files_processed += 1
+            tags = COMPONENT_TAG_PATTERN.findall(content)
+            tags_found.extend(tags)
+            state.record(item['path'], item['sha'], tags, gitapi_theme_type(item['path'], extractor.repo_url))
+        state.save()
+        if update_db:
             extractor.start_page = page
             extractor.save()
-            processed_page = page
         page += 1
-    # Extract TSX count from description if available
+    
+    # Files missing from the listing were deleted only if this run listed every page, and
+    # code search returned all of them (it stops at SEARCH_RESULT_LIMIT results)
     tsx_count = None
     if extractor.description and "TSX files found:" in extractor.description:
         match = re.search(r"TSX files found: (\d+)", extractor.description)
         if match:
             tsx_count = int(match.group(1))
-    
-    if not all_items:
-        message = 'No .tsx files found in the repository.'
-    else:
-        for item in all_items:
-            file_url = item['url']
-            file_resp = requests.get(file_url, headers=headers)
-            if file_resp.status_code == 200:
-                file_content_url = file_resp.json().get('download_url')
-                if file_content_url:
-                    content_resp = requests.get(file_content_url)
-                    if content_resp.status_code == 200:
-                        content = content_resp.text
-                        tags = re.findall(r"@Component\s*\(\s*{[^}]*tag:\s*'([^']+)'", content)
-                        tags_found.extend(tags)
-                        path_parts = item['path'].split('/')
-                        theme_type = path_parts[1] if len(path_parts) > 1 else 'default'
-
-                        rel_path = item['path']
-                        parts = rel_path.split(os.sep)
-                        version = getattr(extractor, 'version_value', 'V1')
-                        # src/components/ms-config-manager/plumbing/helper.spec.tsx
-                        
-                        if "packages" in rel_path:
-                            theme_type = parts[1] if len(parts) > 1 else ""
-                        elif "src/components" in rel_path:
-                            # version = 'V2'
-                            theme_type = parts[2] if len(parts) > 2 else ""
-                        else:
-                            theme_type = ""
-                      
-
-                        if "cdp-lite-theme" in extractor.repo_url:
-                            theme_type = f"cdp-lite-theme>>{theme_type}" if theme_type else theme_type
-                        elif "hcp-galaxy-theme" in extractor.repo_url:
-                            theme_type = f"hcp-galaxy-theme>>{theme_type}" if theme_type else theme_type
-
-                        for tag in tags:
-                            try:
-                                Tag.objects.get_or_create(
-                                    name=tag,
-                                    theme_type=theme_type,
-                                    defaults={
-                                        'path': f"{item['path']}",
-                                        'details': f'Auto-generated tag for {tag}',
-                                        'version': getattr(extractor, 'version_value', 'V1'),
-                                        'created_by': request.user,
-                                        'updated_by': request.user,
-                                        'complexity': 'simple',
-                                        'is_managed_by': 'automated',
-                                        'tags_extractor_id': extractor.id,
-                                        'theme_type': theme_type
-                                    }
-                                )
-                            except Exception as e:
-                                print(f"Error creating tag '{tag}': {str(e)}")
-        if tags_found:
+    complete = (start_page <= 1 and not stopped_early and tsx_count is not None
+                and len(state.seen) >= tsx_count and tsx_count <= SEARCH_RESULT_LIMIT)
+    state.finish(complete=complete)
+    
+    # A run that stopped early keeps the error message
+    if not stopped_early:
+        if not files_processed and state.skipped:
+            message = f"No changes in {state.skipped} TSX files since the last extraction.{state.summary()}"
+        elif not files_processed:
+            message = 'No .tsx files found in the repository.'
+        elif tags_found:
             tsx_count_info = f" from {tsx_count} TSX files" if tsx_count else ""
-            message = f"Extracted {len(tags_found)} tags{tsx_count_info}: {', '.join(tags_found)}"
+            message = f"Extracted {len(tags_found)} tags{tsx_count_info}{state.summary()}: {', '.join(tags_found)}"
         else:
             tsx_count_info = f"No tags found in {tsx_count} TSX files." if tsx_count else "No tags found in .tsx files."
-            message = tsx_count_info
+            message = tsx_count_info + state.summary()
     if update_db:
         extractor.description = message
-        extractor.start_page = extractor.total_pages
-        extractor.imported = True
+        if not stopped_early:
+            extractor.start_page = extractor.total_pages
+            extractor.imported = True
         extractor.save()
     print(f"I M HERE {message} >> {tsx_count}")
     return message, tags_found
 
+def process_extractor_archive(request, extractor, owner, repo, update_db=True):
+    """
+    Extract tags from one download of the repository tarball, without code search:
+    the archive is streamed and the @Component pattern run on each *.tsx entry.
+    Returns a tuple: (message, tags_found)
+    """
+    client = GitHubClient()
+    state = ExtractionState(extractor, request.user)
+    tags_found = []
+    tsx_count = 0
+    try:
+        for path, data in client.iter_archive_files(owner, repo, suffix='.tsx'):
+            tsx_count += 1
+            # Hash the bytes as stored: the blob SHA of re-encoded text differs for invalid UTF-8
+            sha = git_blob_sha(data)
+            if state.unchanged(path, sha):
+                continue
+            content = data.decode('utf-8', 'replace')
+            tags = COMPONENT_TAG_PATTERN.findall(content)
+            tags_found.extend(tags)
+            state.record(path, sha, tags, gitapi_theme_type(path, extractor.repo_url))
+    except GitHubError as e:
+        if e.status_code == 404:
+            return f'Repository not found: {owner}/{repo}. Please check if the repository exists and is public.', []
+        return str(e), []
+    except RateLimitExceeded as e:
+        return f'{e}. Please try again later.', []
+    except (requests.RequestException, tarfile.TarError) as e:
+        return f'Error while downloading the repository archive: {str(e)}', []
+    finally:
+        # Keep the files processed before a failure, so the next run skips them
+        state.save()
+    state.finish(complete=True)
+    
+    if tags_found:
+        message = f"Extracted {len(tags_found)} tags from {tsx_count} TSX files{state.summary()}: {', '.join(tags_found)}"
+    elif tsx_count:
+        message = f"No tags found in {tsx_count} TSX files.{state.summary()}"
+    else:
+        message = 'No .tsx files found in the repository.'
+    print(message)
+    if update_db:
+        extractor.description = f"TSX files found: {tsx_count}"
+        extractor.total_pages = 0
+        extractor.imported = True
+        extractor.save()
+    return message, tags_found
+
 # In tags_extractor_create, replace the main logic with a call to process_extractor_pages
 @login_required
 def tags_extractor_create(request):
@@ -800,6 +645,13 @@ def process_pending_items(request, extractor_id):
         extractor.start_page = 0
         extractor.imported = False
         extractor.save()
+    elif extractor.imported:
+        # Re-run of a finished extraction: list the repository again from the first page.
+        # Files whose blob SHA didn't change since the last run are skipped.
+        extractor.start_page = 1
+        extractor.total_pages = 0
+        extractor.imported = False
+        extractor.save()
     
     # Process the extractor
     result = process_extractor_pages(request, extractor, start_page=extractor.start_page, update_db=True)
@@ -856,6 +708,9 @@ def tags_extractor_edit(request, extractor_id):
             extractor = form.save(commit=False)
             extractor.description = new_description
             extractor.save()
+            if 'repo_url' in form.changed_data:
+                # File SHAs of the old repository say nothing about the new one
+                extractor.extracted_files.all().delete()
             
             messages.success(request, 'Tags extractor updated successfully.')
             return redirect('tags_extractor_detail', extractor_id=extractor_id)
@@ -921,7 +776,7 @@ def tags_extractor_detail(request, extractor_id):
             tsx_count = int(match.group(1))
     
     # Map internal extraction_method values to display values
-    extraction_method_display = 'API' if extractor.extraction_method == 'GITAPI' else 'CLONE'
+    extraction_method_display = {'GITAPI': 'API', 'ARCHIVE': 'ARCHIVE'}.get(extractor.extraction_method, 'CLONE')
     
     context = {
         'extractor': extractor,
@@ -936,6 +791,65 @@ def tags_extractor_detail(request, extractor_id):
     
     return render(request, 'tag_manager_component/tags_extractor_detail.html', context)
 
+def group_mappings_by_v1(v1_names):
+    """Load the TagMapper rows of `v1_names` in one query as {v1_name: [TagMapper, ...]}, in id order."""
+    mappings_by_v1 = defaultdict(list)
+    for mapping in TagMapper.objects.filter(v1_component_name__in=v1_names).order_by('id'):
+        mappings_by_v1[mapping.v1_component_name].append(mapping)
+    return mappings_by_v1
+
+
+def save_tag_mappings(submitted, mappings_by_v1):
+    """
+    Apply the mappings submitted on the tag mapper screen, writing only what changed.
+
+    submitted: {v1_name: ([v2_name, ...], weight)}, the complete desired mappings of each V1 tag
+    mappings_by_v1: the stored mappings, as returned by group_mappings_by_v1
+
+    A V1 tag's rows are matched to the submitted V2 names: rows for names no longer
+    listed (and duplicate rows) are deleted, kept rows whose weight changed are
+    updated, and new names are created with the usage count of the tag's first
+    existing mapping. Returns (created, updated, deleted) row counts.
+    """
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    to_delete = []
+    for v1_name, (v2_names, weight) in submitted.items():
+        existing = {}
+        for mapping in mappings_by_v1.get(v1_name, []):
+            if mapping.v2_component_name in existing:
+                to_delete.append(mapping.id)
+            else:
+                existing[mapping.v2_component_name] = mapping
+        existing_usage = mappings_by_v1[v1_name][0].used_in_website if mappings_by_v1.get(v1_name) else 0
+        
+        for v2_name in dict.fromkeys(v2_names):
+            mapping = existing.pop(v2_name, None)
+            if mapping is None:
+                to_create.append(TagMapper(
+                    v1_component_name=v1_name,
+                    v2_component_name=v2_name,
+                    weight=weight,
+                    used_in_website=existing_usage,
+                ))
+            elif mapping.weight != weight:
+                mapping.weight = weight
+                mapping.updated_at = now
+                to_update.append(mapping)
+        to_delete.extend(mapping.id for mapping in existing.values())
+    
+    if to_delete:
+        TagMapper.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        TagMapper.objects.bulk_update(to_update, ['weight', 'updated_at'], batch_size=500)
+    if to_create:
+        # bulk_create sends no post_save, so refresh the cached mapping count here
+        TagMapper.objects.bulk_create(to_create, batch_size=500)
+        invalidate_counts()
+    return len(to_create), len(to_update), len(to_delete)
+
+
 @login_required
 def tag_mapper(request):
     if request.user.role not in ['tag_manager', 'admin']:
@@ -957,62 +871,47 @@ def tag_mapper(request):
 
     
         
+    v1_tags = list(v1_tags)
     v2_tags = Tag.objects.filter(version='V2').order_by('name')
-    # Build current mapping: {v1_name: [v2_name, ...]}
+    
+    # All mappings of the listed V1 tags in one query, grouped by V1 name
+    mappings_by_v1 = group_mappings_by_v1([v1.name for v1 in v1_tags])
+    
+    if request.method == 'POST':
+        submitted = {}
+        for v1 in v1_tags:
+            v2_names = request.POST.get(f'v2_component_names_{v1.id}', '').strip()
+            weight = request.POST.get(f'weight_{v1.id}', '1')
+            submitted[v1.name] = (
+                [v.strip() for v in v2_names.split(',') if v.strip()],
+                int(weight) if weight.isdigit() else 1,
+            )
+        with transaction.atomic():
+            save_tag_mappings(submitted, mappings_by_v1)
+        messages.success(request, 'Mappings updated successfully.')
+        return redirect('tag_mapper')
+    
+    # Build current mapping: {v1_name: [{'v2_name': ..., 'weight': ..., 'used_in_website': ...}, ...]}
     v1_to_v2_map = {}
     for v1 in v1_tags:
-        mappings = TagMapper.objects.filter(v1_component_name=v1.name)
+        mappings = mappings_by_v1.get(v1.name)
         # If no mappings exist, use the tag's own data from Tag
-        if not mappings.exists():
-            tag_obj = v1
+        if not mappings:
             v1_to_v2_map[v1.name] = [{
             'v2_name': '',  # No mapped V2 name
             'weight': '',   # No weight
-            'used_in_website': tag_obj.used_in_website
+            'used_in_website': v1.used_in_website
             }]
             continue
         v1_to_v2_map[v1.name] = [{'v2_name': m.v2_component_name, 'weight': m.weight, 'used_in_website': m.used_in_website} for m in mappings]
     
-  
     message = None
-    if request.method == 'POST':
-        with transaction.atomic():
-            for v1 in v1_tags:
-                v2_names = request.POST.get(f'v2_component_names_{v1.id}', '').strip()
-                weight = request.POST.get(f'weight_{v1.id}', '1')
-                
-                # Get the used_in_website count from existing mappings before deleting
-                existing_usage = 0
-                existing_mapping = TagMapper.objects.filter(v1_component_name=v1.name).first()
-                if existing_mapping:
-                    existing_usage = existing_mapping.used_in_website
-                
-                # Remove old mappings for this v1
-                TagMapper.objects.filter(v1_component_name=v1.name).delete()
-                
-                if v2_names:
-                    for v2_name in [v.strip() for v in v2_names.split(',') if v.strip()]:
-                        # Create new mapping with preserved usage count
-                        TagMapper.objects.create(
-                            v1_component_name=v1.name,
-                            v2_component_name=v2_name,
-                            weight=int(weight) if weight.isdigit() else 1,
-                            used_in_website=existing_usage
-                        )
-            messages.success(request, 'Mappings updated successfully.')
-            return redirect('tag_mapper')
-        # Refresh mapping after update
-        for v1 in v1_tags:
-            mappings = TagMapper.objects.filter(v1_component_name=v1.name)
-            v1_to_v2_map[v1.name] = [{'v2_name': m.v2_component_name, 'weight': m.weight, 'used_in_website': m.used_in_website} for m in mappings]
     # Helper for template to get mapping list
     def get_item(d, key):
         return d.get(key, [])
-    total_v1_tags = v1_tags.count() 
+    total_v1_tags = len(v1_tags)
     total_mappings = sum(len(v) for v in v1_to_v2_map.values())
     pending_mappings = total_v1_tags - len([k for k, v in v1_to_v2_map.items() if v])
-    print("v1_to_v2_map")
-    print(v1_to_v2_map)
     return render(request, 'tag_manager_component/tag_mapper.html', {
         'v1_tags': v1_tags,
         'v2_tags': v2_tags,
@@ -1048,136 +947,132 @@ def tag_mapper_create(request):
         form = TagMapperForm()
     return render(request, 'tag_manager/tag_mapper_form.html', {'form': form})
 
-@login_required
-def export_v1_tags(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="v1_tags.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['name', 'path', 'details', 'version', 'complexity', 'is_managed_by', 'theme_type'])
-    for tag in Tag.objects.filter(version='V1').order_by('name'):
-        writer.writerow([
-            tag.name, tag.path, tag.details, tag.version,
-            tag.complexity, tag.is_managed_by, tag.theme_type
-        ])
-    return response
+TAG_EXPORT_FIELDS = ['name', 'path', 'details', 'version', 'complexity', 'is_managed_by', 'theme_type']
 
-@login_required
-def export_v2_tags(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="v2_tags.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['name', 'path', 'details', 'version', 'complexity', 'is_managed_by', 'theme_type'])
-    for tag in Tag.objects.filter(version='V2').order_by('name'):
-        writer.writerow([
-            tag.name, tag.path, tag.details, tag.version,
-            tag.complexity, tag.is_managed_by, tag.theme_type
-        ])
-    return response
+# Columns of the non-mapped and all-tags exports, in file order
+TAG_SUMMARY_FIELDS = ['name', 'version', 'theme_type', 'path', 'details']
 
-@login_required
-def export_tag_mapper_records(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="tag_mapper_records.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['V1 Component Name', 'V2 Component Name', 'Weight'])
 
-    for record in TagMapper.objects.all():
-        writer.writerow([record.v1_component_name, record.v2_component_name, record.weight])
+def iter_tag_rows(queryset, fields):
+    """Stream value tuples of `fields` from `queryset` with a single query."""
+    return queryset.values_list(*fields).iterator(chunk_size=EXPORT_BATCH_SIZE)
 
-    return response
 
-@login_required
-def export_non_tag_mapper_records(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="non_tag_mapper_records.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Tag Name', 'Version', 'Theme Type', 'Path', 'Details'])
+def iter_rows_with_repo_url(queryset):
+    """TAG_SUMMARY_FIELDS rows of `queryset` followed by the tag's repo URL ('N/A' without an extractor)."""
+    for *row, repo_url in iter_tag_rows(queryset, TAG_SUMMARY_FIELDS + ['tags_extractor__repo_url']):
+        yield [*row, repo_url if repo_url is not None else 'N/A']
 
-    mapped_tags = TagMapper.objects.values_list('v1_component_name', flat=True)
-    non_mapped_tags = Tag.objects.exclude(name__in=mapped_tags)
 
-    for tag in non_mapped_tags:
-        writer.writerow([tag.name, tag.version, tag.theme_type, tag.path, tag.details])
+def load_mapped_attributes():
+    """All mappings in one query, as {v1_name: 'v2_name (Weight: w), ...'}."""
+    mapped = defaultdict(list)
+    for v1_name, v2_name, weight in TagMapper.objects.order_by('id').values_list(
+        'v1_component_name', 'v2_component_name', 'weight',
+    ).iterator(chunk_size=EXPORT_BATCH_SIZE):
+        mapped[v1_name].append(f"{v2_name} (Weight: {weight})")
+    return {v1_name: ', '.join(attributes) for v1_name, attributes in mapped.items()}
 
-    return response
 
-@login_required
-def export_non_tag_mapper_v1_records(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="non_tag_mapper_v1_records.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Tag Name', 'Version', 'Theme Type', 'Path', 'Details'])
+def non_mapped_tags(queryset):
+    """Tags of `queryset` whose name isn't the V1 name of any mapping."""
+    return queryset.exclude(name__in=TagMapper.objects.values('v1_component_name'))
 
-    mapped_tags = TagMapper.objects.values_list('v1_component_name', flat=True)
-    non_mapped_v1_tags = Tag.objects.filter(version='V1').exclude(name__in=mapped_tags)
 
-    for tag in non_mapped_v1_tags:
-        writer.writerow([tag.name, tag.version, tag.theme_type, tag.path, tag.details])
+@login_required
+def export_v1_tags(request):
+    rows = iter_tag_rows(Tag.objects.filter(version='V1').order_by('name'), TAG_EXPORT_FIELDS)
+    return streaming_csv_response('v1_tags.csv', TAG_EXPORT_FIELDS, rows)
 
-    return response
+@login_required
+def export_v2_tags(request):
+    rows = iter_tag_rows(Tag.objects.filter(version='V2').order_by('name'), TAG_EXPORT_FIELDS)
+    return streaming_csv_response('v2_tags.csv', TAG_EXPORT_FIELDS, rows)
 
 @login_required
-def export_non_tag_mapper_v1_records_with_repo(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="non_tag_mapper_v1_records_with_repo.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Tag Name', 'Version', 'Theme Type', 'Path', 'Details', 'Repo URL'])
+def export_tag_mapper_records(request):
+    rows = iter_tag_rows(TagMapper.objects.order_by('id'), ['v1_component_name', 'v2_component_name', 'weight'])
+    return streaming_csv_response(
+        'tag_mapper_records.csv', ['V1 Component Name', 'V2 Component Name', 'Weight'], rows,
+    )
 
-    mapped_tags = TagMapper.objects.values_list('v1_component_name', flat=True)
-    non_mapped_v1_tags = Tag.objects.filter(version='V1').exclude(name__in=mapped_tags)
+@login_required
+def export_non_tag_mapper_records(request):
+    rows = iter_tag_rows(non_mapped_tags(Tag.objects.order_by('id')), TAG_SUMMARY_FIELDS)
+    return streaming_csv_response(
+        'non_tag_mapper_records.csv', ['Tag Name', 'Version', 'Theme Type', 'Path', 'Details'], rows,
+    )
 
-    for tag in non_mapped_v1_tags:
-        repo_url = tag.tags_extractor.repo_url if tag.tags_extractor else 'N/A'
-        writer.writerow([tag.name, tag.version, tag.theme_type, tag.path, tag.details, repo_url])
+@login_required
+def export_non_tag_mapper_v1_records(request):
+    rows = iter_tag_rows(non_mapped_tags(Tag.objects.filter(version='V1').order_by('id')), TAG_SUMMARY_FIELDS)
+    return streaming_csv_response(
+        'non_tag_mapper_v1_records.csv', ['Tag Name', 'Version', 'Theme Type', 'Path', 'Details'], rows,
+    )
 
-    return response
+@login_required
+def export_non_tag_mapper_v1_records_with_repo(request):
+    rows = iter_rows_with_repo_url(non_mapped_tags(Tag.objects.filter(version='V1').order_by('id')))
+    return streaming_csv_response(
+        'non_tag_mapper_v1_records_with_repo.csv',
+        ['Tag Name', 'Version', 'Theme Type', 'Path', 'Details', 'Repo URL'], rows,
+    )
 
 @login_required
 def auto_map_v1_to_v2_tags(request):
     if request.user.role not in ['tag_manager', 'admin']:
         return HttpResponse('Unauthorized', status=403)
     v1_tags = Tag.objects.filter(version='V1').order_by('name')
-    v2_tags = Tag.objects.filter(version='V2').order_by('name')
-    mappings_created = 0
-    for v1 in v1_tags:
-        best_match = None
-        best_score = 0.0
-        for v2 in v2_tags:
-            score = SequenceMatcher(None, v1.name, v2.name).ratio()
-            if score > best_score:
-                best_score = score
-                best_match = v2
-        if best_match and best_score > 0.7:
-            TagMapper.objects.update_or_create(
-                v1_component_name=v1.name.strip(),
-                v2_component_name=best_match.name.strip(),
-                defaults={'weight': int(best_score * 100)}
-            )
-            best_match.details = f"Auto-mapped to V1: {v1.name} (score: {best_score:.2f})"
-            best_match.save()
-            mappings_created += 1
+    v2_tags = list(Tag.objects.filter(version='V2').order_by('name'))
+    v2_by_name = {}
+    for v2 in v2_tags:
+        v2_by_name.setdefault(v2.name, v2)
+    
+    # Best V2 match per V1 tag, exact-scored among the n-gram index's top candidates
+    matches = list(best_matches([v1.name for v1 in v1_tags], [v2.name for v2 in v2_tags]))
+    weights = {(v1_name.strip(), v2_name.strip()): int(score * 100) for v1_name, v2_name, score in matches}
+    
+    with transaction.atomic():
+        # Upsert the mappings: update the weight of existing pairs, create the rest
+        to_update = []
+        existing_pairs = set()
+        for mapping in TagMapper.objects.filter(v1_component_name__in={v1_name for v1_name, _ in weights}):
+            pair = (mapping.v1_component_name, mapping.v2_component_name)
+            if pair in weights:
+                existing_pairs.add(pair)
+                mapping.weight = weights[pair]
+                to_update.append(mapping)
+        TagMapper.objects.bulk_update(to_update, ['weight'], batch_size=500)
+        TagMapper.objects.bulk_create(
+            [TagMapper(v1_component_name=v1_name, v2_component_name=v2_name, weight=weight)
+             for (v1_name, v2_name), weight in weights.items() if (v1_name, v2_name) not in existing_pairs],
+            batch_size=500,
+        )
+        
+        # Note the match on the V2 tags; when several V1 tags match one V2 tag, the last one wins
+        matched_v2 = {}
+        for v1_name, v2_name, score in matches:
+            v2 = v2_by_name[v2_name]
+            v2.details = f"Auto-mapped to V1: {v1_name} (score: {score:.2f})"
+            matched_v2[v2.pk] = v2
+        Tag.objects.bulk_update(matched_v2.values(), ['details'], batch_size=500)
+    invalidate_counts()
+    
     message = f"Auto-mapped V1 tags to V2 tags based on similarity checks."
     messages.success(request, message)
     return redirect('tag_mapper')
 
 @login_required
 def export_all_tags_with_mapped_attributes_and_repo(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="all_tags_with_mapped_attributes_and_repo.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Tag Name', 'Version', 'Theme Type', 'Path', 'Details', 'Mapped Attributes', 'Repo URL'])
-
-    tags = Tag.objects.select_related('tags_extractor').all()
-
-    for tag in tags:
-        mapped_attributes = ', '.join(
-            [f"{mapper.v2_component_name} (Weight: {mapper.weight})" for mapper in TagMapper.objects.filter(v1_component_name=tag.name)]
-        )
-        repo_url = tag.tags_extractor.repo_url if tag.tags_extractor else 'N/A'
-        writer.writerow([tag.name, tag.version, tag.theme_type, tag.path, tag.details, mapped_attributes, repo_url])
-
-    return response
-
+    mapped_attributes = load_mapped_attributes()
+    rows = (
+        [*row[:5], mapped_attributes.get(row[0], ''), row[5]]
+        for row in iter_rows_with_repo_url(Tag.objects.order_by('id'))
+    )
+    return streaming_csv_response(
+        'all_tags_with_mapped_attributes_and_repo.csv',
+        ['Tag Name', 'Version', 'Theme Type', 'Path', 'Details', 'Mapped Attributes', 'Repo URL'], rows,
+    )
 
 @login_required
 def complexity_mapping_upload(request):
@@ -1261,6 +1156,10 @@ def complexity_mapping_upload(request):
                         else:
                             updated_count += tags_updated
                 
+                # Queryset updates don't send save signals; the cached site complexity inputs depend on tag complexity
+                if updated_count > 0:
+                    invalidate_counts()
+                
                 # Show results
                 if updated_count > 0:
                     messages.success(request, f'Successfully updated complexity for {updated_count} tags.')
@@ -1459,8 +1358,49 @@ def complexity_parameter_config(request):
     return render(request, 'tag_manager_component/complexity_parameter_config.html', context)
 
 
+@login_required
+def simulate_complexity_parameters(request):
+    """
+    What-if check for complexity_parameter_config: classify every site against candidate
+    thresholds and return the resulting distribution and the sites that would change class.
+    Nothing is saved.
+
+    POST body (JSON): {"simple": {"number_of_pages": 20, ...}, "medium": {...}, "complex": {...}}
+    Levels and fields that are left out keep their saved values.
+    """
+    if request.user.role not in ['tag_manager', 'admin']:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    try:
+        payload = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Request body must be JSON'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Expected an object keyed by complexity type'}, status=400)
+
+    candidate_thresholds = {}
+    for complexity_type, thresholds in payload.items():
+        if complexity_type not in COMPLEXITY_ORDER or not isinstance(thresholds, dict):
+            return JsonResponse({'error': f'Unknown complexity type "{complexity_type}"'}, status=400)
+        candidate_thresholds[complexity_type] = {}
+        for field, value in thresholds.items():
+            if field not in COMPLEXITY_FEATURES:
+                return JsonResponse({'error': f'Unknown parameter "{field}"'}, status=400)
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                value = -1
+            if value < 0:
+                return JsonResponse({'error': f'{complexity_type}.{field} must be a non-negative integer'}, status=400)
+            candidate_thresholds[complexity_type][field] = value
+
+    return JsonResponse(simulate_complexity(candidate_thresholds))
+
+
 # Utility: Determine website complexity by comparing site data to config thresholds
-def get_website_complexity(site_data, return_config=False):
+def get_website_complexity(site_data, return_config=False, evaluator=None):
     """
     Determine the complexity type ('simple', 'medium', 'complex') for a website
     based on its values and the thresholds in ComplexityParameter.
@@ -1469,69 +1409,13 @@ def get_website_complexity(site_data, return_config=False):
     
     site_data: dict with keys like 'number_of_pages', 'number_of_helix_v2_compatible', etc.
     return_config: if True, returns tuple (complexity, config_data), otherwise just complexity
+    evaluator: optional ComplexityEvaluator; defaults to the cached one compiled from ComplexityParameter
     """
-
-    print("GET WEBSITE COMPLEXITY")
-    print(site_data)
-    print(f"Return config: {return_config}")  # Debug line to see if config is requested
-    # Get all configurations
-    configs = {c.complexity_type: c for c in ComplexityParameter.objects.all()}
-    if not configs:
-        return (None, None) if return_config else None
-    
-    def site_matches_config(site, config):
-        """
-        Check if a site matches or is within the configuration thresholds.
-        A site matches if its values are less than or equal to the config thresholds.
-        """
-      
-        checks = [
-            int(site.get('number_of_pages', 0)) <= getattr(config, 'number_of_pages', 0) if getattr(config, 'number_of_pages', 0) > 0 else True,
-            int(site.get('number_of_helix_v2_compatible', 0)) <= getattr(config, 'number_of_helix_v2_compatible', 0) if getattr(config, 'number_of_helix_v2_compatible', 0) > 0 else True,
-            int(site.get('number_of_helix_v2_non_compatible', 0)) <= getattr(config, 'number_of_helix_v2_non_compatible', 0) if getattr(config, 'number_of_helix_v2_non_compatible', 0) > 0 else True,
-            int(site.get('number_of_custom_components', 0)) <= getattr(config, 'number_of_custom_components', 0) if getattr(config, 'number_of_custom_components', 0) > 0 else True,
-            int(site.get('total_simple_components', 0)) <= getattr(config, 'total_simple_components', 0) if getattr(config, 'total_simple_components', 0) > 0 else True,
-            int(site.get('total_medium_components', 0)) <= getattr(config, 'total_medium_components', 0) if getattr(config, 'total_medium_components', 0) > 0 else True,
-            int(site.get('total_complex_components', 0)) <= getattr(config, 'total_complex_components', 0) if getattr(config, 'total_complex_components', 0) > 0 else True,
-        ]
-        print("CHECKS")
-        print(checks)  # Debug line to see the checks being performed
-        return all(checks)
-    
-    def config_to_dict(config):
-        """Convert ComplexityParameter object to dictionary for storage"""
-        return {
-            'complexity_type': config.complexity_type,
-            'number_of_pages': config.number_of_pages,
-            'number_of_helix_v2_compatible': config.number_of_helix_v2_compatible,
-            'number_of_helix_v2_non_compatible': config.number_of_helix_v2_non_compatible,
-            'number_of_custom_components': config.number_of_custom_components,
-            'total_simple_components': config.total_simple_components,
-            'total_medium_components': config.total_medium_components,
-            'total_complex_components': config.total_complex_components,
-            'created_at': config.created_at.isoformat() if config.created_at else None,
-            'updated_at': config.updated_at.isoformat() if config.updated_at else None,
-        }
-    
-    # Check configurations in order: simple → medium → complex
-    complexity_order = ['simple', 'medium', 'complex']
-    
-    for complexity_type in complexity_order:
-        if complexity_type in configs:
-            config = configs[complexity_type]
-            if site_matches_config(site_data, config):
-                print(f"Site matches {complexity_type} configuration")
-                if return_config:
-                    return complexity_type, config_to_dict(config)
-                return complexity_type
-    
-    # If no configuration matches, default to complex
-    print("Site doesn't match any configuration, defaulting to complex")
+    if evaluator is None:
+        evaluator = get_complexity_evaluator()
+    complexity, config_data = evaluator.evaluate(site_data)
     if return_config:
-        # Return complex config if available, otherwise default config
-        if 'complex' in configs:
-            return 'complex', config_to_dict(configs['complex'])
-        return 'complex', {'complexity_type': 'complex', 'reason': 'default_fallback'}
-    return 'complex'
+        return complexity, config_data
+    return complexity
 
  
\ No newline at end of file